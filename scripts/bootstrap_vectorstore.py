@@ -163,8 +163,8 @@ async def populate_db(
                 )
             )
             vectors = {
-                VectorNames.TITLE_SUMMARY.value: title_summary_vectorized,
-                VectorNames.TITLE_CONTENT.value: title_content_vectorized,
+                VectorNames.TITLE_SUMMARY.value: title_summary_vectorized.tolist(),
+                VectorNames.TITLE_CONTENT.value: title_content_vectorized.tolist(),
             }
             uuid_upserted: uuid.UUID | str = batch.add_object(
                 properties=reference_news.model_dump(),
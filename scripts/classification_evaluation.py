@@ -2,48 +2,71 @@
 
 import json
 import tempfile
-from collections.abc import Iterator
+from collections.abc import Callable
 from pathlib import Path
 from typing import Literal
 
 import mlflow
+import numpy as np
 import pandas as pd
 from beir.retrieval.evaluation import EvaluateRetrieval
+from numpy.typing import NDArray
 from sklearn.metrics import (
     ConfusionMatrixDisplay,
+    PrecisionRecallDisplay,
     RocCurveDisplay,
     classification_report,
     log_loss,
 )
+from sklearn.model_selection import StratifiedKFold
 from tqdm import tqdm
 
 from cpeq_infolettre_automatique.classification_algo import (
     KnNewsClassifier,
+    LogisticRegressionNewsClassifier,
     MaxMeanScoresNewsClassifier,
     MaxPoolingNewsClassifier,
     MaxScoreNewsClassifier,
+    TrainData,
 )
 from cpeq_infolettre_automatique.config import (
+    LexicalFilterConfig,
     NewsRelevancyClassifierConfig,
     Relevance,
     Rubric,
     VectorNames,
+    VectorSnapshotConfig,
     VectorstoreConfig,
 )
+from cpeq_infolettre_automatique.cross_validation import (
+    ClassifierConfig,
+    Splitter,
+    cross_validate,
+)
 from cpeq_infolettre_automatique.dependencies import (
     get_embedding_model,
     get_openai_client,
     get_vectorstore_client,
 )
+from cpeq_infolettre_automatique.in_memory_vectorstore import (
+    HybridSearchIndex,
+    InMemoryVectorstore,
+)
+from cpeq_infolettre_automatique.lexical_filter import LexicalRelevancyFilter
 from cpeq_infolettre_automatique.news_classifier import (
     NewsRelevancyClassifier,
     NewsRubricClassifier,
 )
 from cpeq_infolettre_automatique.schemas import News
+from cpeq_infolettre_automatique.vector_snapshot import VectorSnapshotStore
 from cpeq_infolettre_automatique.vectorstore import Vectorstore
 
 
-class ClassificationEvaluation:
+THRESHOLDS = np.round(np.arange(0.01, 1.0, 0.01), 2)
+"""The relevance thresholds of the news filtering sweep."""
+
+
+class ClassificationEvaluation:  # noqa: PLR0904
     """Classification Evaluation Module."""
 
     def __init__(
@@ -122,6 +145,39 @@ class ClassificationEvaluation:
             color="darkorange",
         )
 
+    def precision_recall_curve(self) -> PrecisionRecallDisplay:
+        """Precision Recall Curve Display."""
+        return PrecisionRecallDisplay.from_predictions(
+            [int(true_pred == Relevance.PERTINENT.value) for true_pred in self.y_true],
+            self.relevant_probs,
+            name=f"{Relevance.PERTINENT.value} vs the rest",
+            color="darkorange",
+        )
+
+    @property
+    def relevant_probs(self) -> NDArray[np.float64]:
+        """Relevant Probabilities."""
+        return np.array([
+            scores.get(Relevance.PERTINENT.value, 0.0) for scores in self.results.values()
+        ])
+
+    def threshold_sweep(self, thresholds: NDArray[np.float64]) -> pd.DataFrame:
+        """Metrics of the news filtering at each threshold of the relevant probability."""
+        relevant = np.array([true_pred == Relevance.PERTINENT.value for true_pred in self.y_true])
+        predicted = self.relevant_probs[:, None] >= thresholds[None, :]
+        nb_true_positives = (predicted & relevant[:, None]).sum(axis=0)
+        nb_predicted = predicted.sum(axis=0)
+        precision = nb_true_positives / np.maximum(nb_predicted, 1)
+        recall = nb_true_positives / max(int(relevant.sum()), 1)
+        return pd.DataFrame({
+            "threshold": thresholds,
+            "precision": precision,
+            "recall": recall,
+            "f1": 2 * precision * recall / np.maximum(precision + recall, np.finfo(float).tiny),
+            "accuracy": (predicted == relevant[:, None]).mean(axis=0),
+            "filtered_out": 1 - nb_predicted / max(len(relevant), 1),
+        })
+
     def classification_accuracy(self) -> dict[str, float]:
         """Accuracy."""
         classification_report = self.classification_report()
@@ -235,73 +291,47 @@ class ClassificationEvaluation:
         return metrics
 
 
-def leave_one_out_rubric_classification_dataset_generator(
-    vectorstore: Vectorstore,
-    *,
-    vector_name: VectorNames,
-) -> Iterator[tuple[list[tuple[News, str, list[float]]], tuple[News, str, list[float]]]]:
-    """Get Dataset."""
-    news_vectors = vectorstore.read_many_with_vectors(vector_name=vector_name)
-    for i in range(len(news_vectors)):
-        train_news_vector = news_vectors[:i] + news_vectors[i + 1 :]
-        train_news_class_vector = [
-            (news, news.rubric.value if news.rubric is not None else Rubric.AUTRE.value, vector)
-            for news, vector in train_news_vector
-        ]
-        test_news_vector = news_vectors[i]
-        test_news_class_vector = (
-            test_news_vector[0],
-            test_news_vector[0].rubric.value
-            if test_news_vector[0].rubric is not None
-            else Rubric.AUTRE.value,
-            test_news_vector[1],
-        )
-        yield train_news_class_vector, test_news_class_vector
+def rubric_class(news: News) -> str:
+    """Get the class of a reference news for the rubric classification."""
+    return news.rubric.value if news.rubric is not None else Rubric.AUTRE.value
+
 
+def relevance_class(news: News) -> str:
+    """Get the class of a reference news for the news filtering."""
+    return Relevance.AUTRE.value if news.rubric == Rubric.AUTRE else Relevance.PERTINENT.value
 
-def leave_one_out_news_filtering_dataset_generator(
+
+def read_reference_dataset(
     vectorstore: Vectorstore,
     *,
     vector_name: VectorNames,
-) -> Iterator[tuple[list[tuple[News, str, list[float]]], tuple[News, str, list[float]]]]:
-    """Get Dataset."""
-    news_vectors = vectorstore.read_many_with_vectors(vector_name=vector_name)
-    for i in range(len(news_vectors)):
-        train_news_vector = news_vectors[:i] + news_vectors[i + 1 :]
-        train_news_class_vector = [
-            (
-                news,
-                Relevance.AUTRE.value
-                if news.rubric == Rubric.AUTRE
-                else Relevance.PERTINENT.value,
-                vector,
-            )
-            for news, vector in train_news_vector
-        ]
-        test_news_vector = news_vectors[i]
-        test_news_class_vector = (
-            test_news_vector[0],
-            Relevance.AUTRE.value
-            if test_news_vector[0].rubric == Rubric.AUTRE
-            else Relevance.PERTINENT.value,
-            test_news_vector[1],
-        )
-        yield train_news_class_vector, test_news_class_vector
+    to_class: Callable[[News], str],
+) -> tuple[list[News], TrainData]:
+    """Get Dataset.
+
+    The embeddings are the float32 reference vectors matrix, one row per reference news.
+    """
+    news_list, reference_vectors = vectorstore.read_vectors(vector_name).validate()
+    return news_list, ([to_class(news) for news in news_list], reference_vectors.vectors)
 
 
-async def run_classifiers_experiment(  # noqa: PLR0914
+def get_target_names(
     experiment_type: Literal["rubric-classification", "news-filtering"],
-    run_type: VectorNames,
-    news_classifiers: list[NewsRelevancyClassifier | NewsRubricClassifier],
-    vectorstore: Vectorstore,
-) -> None:
-    """Run Experiment."""
+) -> list[str]:
+    """Get the sorted classes of an experiment."""
     if experiment_type == "rubric-classification":
         target_names = [rubric.value for rubric in Rubric]
     else:
         target_names = [relevance.value for relevance in Relevance]
     target_names.sort()
+    return target_names
+
 
+def get_parent_run(
+    experiment_type: Literal["rubric-classification", "news-filtering"],
+    run_type: VectorNames,
+) -> tuple[str, str | None]:
+    """Get the experiment id and the id of the existing parent run of the fields, if any."""
     experiment_name = f"cpeq-{experiment_type}"
 
     experiment = mlflow.get_experiment_by_name(experiment_name)
@@ -315,56 +345,139 @@ async def run_classifiers_experiment(  # noqa: PLR0914
     parent_run_id = None
     if not parent_run.empty:
         parent_run_id = parent_run["run_id"][0]
+    return experiment_id, parent_run_id
+
+
+def log_news_classifier_evaluation(
+    experiment_type: Literal["rubric-classification", "news-filtering"],
+    run_type: VectorNames,
+    news_classifier: NewsRelevancyClassifier | NewsRubricClassifier,
+    news_list: list[News],
+    test_classes: list[str],
+    predicted_probs: list[dict[str, float]],
+) -> None:
+    """Log the evaluation of the held-out predictions of a classifier in the active run."""
+    q_rels = {str(i): {test_class: 1} for i, test_class in enumerate(test_classes)}
+    results = {str(i): probs for i, probs in enumerate(predicted_probs)}
+    target_names = get_target_names(experiment_type)
+    y_pred = []
+    wrong_preds: list[tuple[str, dict[str, dict[str, float]]]] = []
+    for test_news, test_class, probs in zip(news_list, test_classes, predicted_probs, strict=True):
+        prediction = news_classifier.predict_from_probs(probs)
+        y_pred.append(prediction.value)
+        if prediction.value != test_class:
+            wrong_preds.append((
+                test_news.title,
+                {
+                    "actual": {test_class: probs.get(test_class, 0.0)},
+                    "pred": {prediction.value: probs[prediction.value]},
+                },
+            ))
+
+    run_classification_evaluation(q_rels, results, y_pred, target_names, wrong_preds)
+    if experiment_type == "news-filtering":
+        run_threshold_sweep_evaluation(q_rels, results, y_pred, target_names)
+    mlflow.log_params(news_classifier.model_info)
+    mlflow.log_param("fields", run_type.value)
+
+
+async def run_classifiers_experiment(
+    experiment_type: Literal["rubric-classification", "news-filtering"],
+    run_type: VectorNames,
+    news_classifiers: list[NewsRelevancyClassifier | NewsRubricClassifier],
+    vectorstore: Vectorstore,
+) -> None:
+    """Run Experiment.
+
+    Each reference news is classified by a classifier fitted on the other reference news. The
+    classifiers with a closed form compute all the leave-one-out predictions at once.
+    """
+    experiment_id, parent_run_id = get_parent_run(experiment_type, run_type)
+    news_list, train_data = read_reference_dataset(
+        vectorstore,
+        vector_name=run_type,
+        to_class=rubric_class if experiment_type == "rubric-classification" else relevance_class,
+    )
     with mlflow.start_run(
         run_id=parent_run_id, run_name=run_type.value, experiment_id=experiment_id
-    ) as parent_run:
+    ):
         for news_classifier in tqdm(news_classifiers):
             with mlflow.start_run(
                 experiment_id=experiment_id,
                 nested=True,
             ) as child_run:  # noqa: F841
-                q_rels = {}
-                results = {}
-                y_pred = []
-                wrong_preds: list[tuple[str, dict[str, dict[str, float]]]] = []
-                dataset_generator = (
-                    leave_one_out_rubric_classification_dataset_generator
-                    if experiment_type == "rubric-classification"
-                    else leave_one_out_news_filtering_dataset_generator
+                predicted_probs = await news_classifier.leave_one_out_probs(news_list, train_data)
+                log_news_classifier_evaluation(
+                    experiment_type,
+                    run_type,
+                    news_classifier,
+                    news_list,
+                    train_data[0],
+                    predicted_probs,
                 )
-                for i, dataset in tqdm(
-                    enumerate(dataset_generator(vectorstore, vector_name=run_type))
-                ):
-                    train_news_class_vector, test_news_class_vector = dataset
-                    test_news, test_class, test_embedding = test_news_class_vector
-                    ids_to_keep = [
-                        Vectorstore.create_uuid(news) for news, _, _ in train_news_class_vector
-                    ]
-                    train_class_vector = [
-                        (class_, embedding) for _, class_, embedding in train_news_class_vector
-                    ]
-                    news_classifier.model.setup(train_class_vector)
-                    q_rels[str(i)] = {test_class: 1}
-                    probs = await news_classifier.predict_probs(
-                        news=test_news, embedding=test_embedding, ids_to_keep=ids_to_keep
-                    )
-                    results[str(i)] = probs
-                    prediction = await news_classifier.predict(
-                        news=test_news, embedding=test_embedding, ids_to_keep=ids_to_keep
-                    )
-                    y_pred.append(prediction.value)
-                    if prediction.value != test_class:
-                        wrong_preds.append((
-                            test_news.title,
-                            {
-                                "actual": {test_class: probs.get(test_class, 0.0)},
-                                "pred": {prediction.value: probs[prediction.value]},
-                            },
-                        ))
 
-                run_classification_evaluation(q_rels, results, y_pred, target_names, wrong_preds)
-                mlflow.log_params(news_classifier.model_info)
-                mlflow.log_param("fields", run_type.value)
+
+def run_cross_validation_experiment(
+    experiment_type: Literal["rubric-classification", "news-filtering"],
+    run_type: VectorNames,
+    classifier_configs: list[ClassifierConfig],
+    vectorstore: Vectorstore,
+    *,
+    splitter: Splitter = "stratified-k-fold",
+    nb_folds: int = 5,
+    max_workers: int | None = None,
+) -> None:
+    """Run Cross Validation Experiment.
+
+    All the folds of all the classifiers are evaluated before logging the runs to MLflow.
+    """
+    news_list, train_data = read_reference_dataset(
+        vectorstore,
+        vector_name=run_type,
+        to_class=rubric_class if experiment_type == "rubric-classification" else relevance_class,
+    )
+    predicted_probs = cross_validate(
+        classifier_configs,
+        run_type,
+        train_data,
+        splitter=splitter,
+        nb_folds=nb_folds,
+        max_workers=max_workers,
+    )
+
+    experiment_id, parent_run_id = get_parent_run(experiment_type, run_type)
+    with mlflow.start_run(
+        run_id=parent_run_id, run_name=run_type.value, experiment_id=experiment_id
+    ):
+        for classifier_config, fold_probs in zip(classifier_configs, predicted_probs, strict=True):
+            model = classifier_config.classifier_type(
+                vectorstore, vector_name=run_type, **classifier_config.parameters
+            )
+            news_classifier: NewsRelevancyClassifier | NewsRubricClassifier
+            classifier_probs = fold_probs
+            if experiment_type == "rubric-classification":
+                news_classifier = NewsRubricClassifier(model=model)
+            else:
+                news_classifier = NewsRelevancyClassifier(
+                    model=model, news_relevancy_classifier_config=NewsRelevancyClassifierConfig()
+                )
+                classifier_probs = [
+                    news_classifier.to_relevance_probs(probs) for probs in fold_probs
+                ]
+            with mlflow.start_run(experiment_id=experiment_id, nested=True):
+                log_news_classifier_evaluation(
+                    experiment_type,
+                    run_type,
+                    news_classifier,
+                    news_list,
+                    train_data[0],
+                    classifier_probs,
+                )
+                mlflow.log_params({
+                    "splitter": splitter,
+                    "nb_folds": len(news_list) if splitter == "leave-one-out" else nb_folds,
+                    **classifier_config.parameters,
+                })
 
 
 def run_classification_evaluation(
@@ -410,6 +523,72 @@ def run_classification_evaluation(
     mlflow.log_figure(fig, "roc_curve.png", save_kwargs={"bbox_inches": "tight"})
 
 
+def run_threshold_sweep_evaluation(
+    q_rels: dict[str, dict[str, int]],
+    results: dict[str, dict[str, float]],
+    y_pred: list[str],
+    target_names: list[str],
+    thresholds: NDArray[np.float64] = THRESHOLDS,
+) -> None:
+    """Run Threshold Sweep Evaluation.
+
+    The metrics of every threshold are derived from the same relevant probabilities, and logged
+    with the threshold in percent as step.
+    """
+    classification_evaluation = ClassificationEvaluation(q_rels, results, y_pred, target_names)
+    threshold_sweep = classification_evaluation.threshold_sweep(thresholds)
+    for row in threshold_sweep.itertuples(index=False):
+        step = round(row.threshold * 100)
+        for metric_name in ("precision", "recall", "f1", "accuracy", "filtered_out"):
+            mlflow.log_metric(f"threshold_{metric_name}", getattr(row, metric_name), step=step)
+    best_row = threshold_sweep.loc[threshold_sweep["f1"].idxmax()]
+    mlflow.log_metrics({"best_f1_threshold": best_row["threshold"], "best_f1": best_row["f1"]})
+    mlflow.log_table(threshold_sweep, "threshold_sweep.json")
+
+    fig = classification_evaluation.precision_recall_curve().figure_
+
+    mlflow.log_figure(fig, "precision_recall_curve.png", save_kwargs={"bbox_inches": "tight"})
+
+
+def run_lexical_filter_experiment(
+    vectorstore: Vectorstore,
+    *,
+    vector_name: VectorNames,
+    recall_targets: list[float],
+    nb_folds: int = 5,
+) -> None:
+    """Evaluate the lexical filter on held-out folds of the reference news, for each recall target."""
+    news_list = vectorstore.read_vectors(vector_name).to_news()
+    labels = np.array([news.rubric != Rubric.AUTRE for news in news_list])
+
+    experiment_name = "cpeq-lexical-filtering"
+    experiment = mlflow.get_experiment_by_name(experiment_name)
+    experiment_id = (
+        mlflow.create_experiment(experiment_name)
+        if experiment is None
+        else experiment.experiment_id
+    )
+    for recall_target in tqdm(recall_targets):
+        kept = np.zeros(len(news_list), dtype=bool)
+        folds = StratifiedKFold(n_splits=nb_folds, shuffle=True, random_state=42)
+        for train_indexes, test_indexes in folds.split(news_list, labels):
+            lexical_filter = LexicalRelevancyFilter(
+                LexicalFilterConfig(recall_target=recall_target)
+            )
+            lexical_filter.fit([news_list[i] for i in train_indexes])
+            kept[test_indexes] = (
+                lexical_filter.scores([news_list[i] for i in test_indexes])
+                >= lexical_filter.threshold
+            )
+        with mlflow.start_run(experiment_id=experiment_id):
+            mlflow.log_param("recall_target", recall_target)
+            mlflow.log_metrics({
+                "relevant_recall": float(kept[labels].mean()),
+                "autre_dropped": float((~kept[~labels]).mean()),
+                "embeddings_saved": float((~kept).mean()),
+            })
+
+
 async def prepare_news_classifiers_experiment(
     experiment_type: Literal["rubric-classification", "news-filtering"],
     run_type: VectorNames,
@@ -422,11 +601,17 @@ async def prepare_news_classifiers_experiment(
     embedding_model = get_embedding_model(openai_client)
     for vectorstore_client in get_vectorstore_client():
         try:
-            vectorstore = Vectorstore(
+            # The in-memory index answers all the leave-one-out searches in one batch.
+            vectorstore = InMemoryVectorstore(
                 embedding_model=embedding_model,
                 vectorstore_client=vectorstore_client,
                 vectorstore_config=vectorstore_config,
+                hybrid_search_index=HybridSearchIndex.from_collection(
+                    vectorstore_client.collections.get(collection_name)
+                ),
             )
+            # The logistic regression has no closed-form leave-one-out: it would be refitted once
+            # per news, so it is only evaluated by `prepare_cross_validation_experiment`.
             news_classifier_models = [
                 MaxMeanScoresNewsClassifier(vectorstore=vectorstore, vector_name=run_type),
                 KnNewsClassifier(vectorstore=vectorstore, vector_name=run_type),
@@ -441,16 +626,14 @@ async def prepare_news_classifiers_experiment(
                 ])
 
             elif experiment_type == "news-filtering":
-                for news_classifier in news_classifier_models:
-                    for threshold in [0.3, 0.45, 0.4, 0.45, 0.5]:
-                        news_classifiers.append(  # noqa: PERF401
-                            NewsRelevancyClassifier(
-                                model=news_classifier,
-                                news_relevancy_classifier_config=NewsRelevancyClassifierConfig(
-                                    threshold=threshold
-                                ),
-                            )
-                        )
+                # The other thresholds are evaluated from the same probabilities by the sweep.
+                news_classifiers.extend([
+                    NewsRelevancyClassifier(
+                        model=model,
+                        news_relevancy_classifier_config=NewsRelevancyClassifierConfig(),
+                    )
+                    for model in news_classifier_models
+                ])
             await run_classifiers_experiment(
                 experiment_type, run_type, news_classifiers, vectorstore
             )
@@ -458,6 +641,52 @@ async def prepare_news_classifiers_experiment(
             vectorstore_client.close()
 
 
+def prepare_cross_validation_experiment(
+    experiment_type: Literal["rubric-classification", "news-filtering"],
+    run_type: VectorNames,
+    collection_name: str,
+    *,
+    splitter: Splitter = "stratified-k-fold",
+    nb_folds: int = 5,
+) -> None:
+    """Cross-validate the embedding classifiers, which can be fitted in other processes."""
+    vectorstore_config = VectorstoreConfig(collection_name=collection_name)
+
+    openai_client = get_openai_client()
+    embedding_model = get_embedding_model(openai_client)
+    for vectorstore_client in get_vectorstore_client():
+        try:
+            vectorstore = Vectorstore(
+                embedding_model=embedding_model,
+                vectorstore_client=vectorstore_client,
+                vectorstore_config=vectorstore_config,
+                vector_snapshot_store=VectorSnapshotStore(VectorSnapshotConfig()),
+            )
+            classifier_configs = [
+                ClassifierConfig(MaxPoolingNewsClassifier, {}),
+                *(
+                    ClassifierConfig(KnNewsClassifier, {"n_neighbors": n_neighbors})
+                    for n_neighbors in [2, 4, 8]
+                ),
+                *(
+                    ClassifierConfig(
+                        LogisticRegressionNewsClassifier, {"regularization": regularization}
+                    )
+                    for regularization in [0.1, 1.0, 10.0]
+                ),
+            ]
+            run_cross_validation_experiment(
+                experiment_type,
+                run_type,
+                classifier_configs,
+                vectorstore,
+                splitter=splitter,
+                nb_folds=nb_folds,
+            )
+        finally:
+            vectorstore_client.close()
+
+
 if __name__ == "__main__":
     import asyncio
 
@@ -489,3 +718,23 @@ if __name__ == "__main__":
             collection_name="ClassificationEvaluation",
         )
     )
+    prepare_cross_validation_experiment(
+        experiment_type="rubric-classification",
+        run_type=VectorNames.TITLE_SUMMARY,
+        collection_name="ClassificationEvaluation",
+    )
+    prepare_cross_validation_experiment(
+        experiment_type="rubric-classification",
+        run_type=VectorNames.TITLE_CONTENT,
+        collection_name="ClassificationEvaluation",
+    )
+    prepare_cross_validation_experiment(
+        experiment_type="news-filtering",
+        run_type=VectorNames.TITLE_SUMMARY,
+        collection_name="ClassificationEvaluation",
+    )
+    prepare_cross_validation_experiment(
+        experiment_type="news-filtering",
+        run_type=VectorNames.TITLE_CONTENT,
+        collection_name="ClassificationEvaluation",
+    )
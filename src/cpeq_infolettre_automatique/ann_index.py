@@ -0,0 +1,208 @@
+"""Approximate nearest neighbour index of normalized float32 vectors."""
+
+import math
+from typing import Self
+
+import numpy as np
+from numpy.typing import NDArray
+from sklearn.cluster import KMeans
+
+
+QUERY_BATCH_SIZE = 1024
+"""The number of queries compared at once to all the vectors by an exact search."""
+
+
+class IvfIndex:
+    """Inverted file index: the vectors are grouped by their nearest k-means centroid.
+
+    Note:
+        A search only compares the queries to the vectors of the `n_probes` lists whose centroids
+        are the most similar to them, so about `n_probes / n_lists` of the vectors are scanned.
+        Increasing `n_probes` increases the recall, `n_probes >= n_lists` being an exact search.
+        Without a given number of lists, an index of at most `exact_search_max_size` vectors has a
+        single list, so that its searches are exact, and larger indexes have `sqrt(n)` lists: a
+        search then scans about `n_probes * sqrt(n)` vectors.
+        The similarities are cosine similarities. The vectors are stored contiguously, sorted by
+        list, and `offsets[i]:offsets[i + 1]` are the rows of the list `i`.
+    """
+
+    def __init__(
+        self, n_lists: int | None = None, n_probes: int = 8, exact_search_max_size: int = 10_000
+    ) -> None:
+        """Initialize an empty index.
+
+        Args:
+            n_lists: The number of lists. If None, a single list up to `exact_search_max_size`
+                vectors, and the square root of the number of vectors above.
+            n_probes: The number of lists scanned by a search.
+            exact_search_max_size: The maximal number of vectors searched exactly when `n_lists`
+                is None.
+        """
+        self.n_lists = n_lists
+        self.n_probes = n_probes
+        self.exact_search_max_size = exact_search_max_size
+        self.centroids = np.empty((0, 0), dtype=np.float32)
+        self.vectors = np.empty((0, 0), dtype=np.float32)
+        self.positions = np.empty(0, dtype=np.int64)
+        self.assignments = np.empty(0, dtype=np.int64)
+        self.offsets = np.zeros(1, dtype=np.int64)
+
+    def __len__(self) -> int:
+        """Get the number of indexed vectors."""
+        return len(self.positions)
+
+    def fit(self, vectors: NDArray[np.float32]) -> Self:
+        """Cluster the vectors into lists and index them.
+
+        Args:
+            vectors: The vectors matrix, one row per vector. Their position is their row.
+
+        Returns:
+            The index.
+        """
+        normalized_vectors = self.normalize_rows(vectors)
+        n_distinct_vectors = len(np.unique(normalized_vectors, axis=0))
+        n_lists = min(
+            self.n_lists or self.default_n_lists(len(normalized_vectors)), n_distinct_vectors
+        )
+        if n_lists <= 1:
+            self.centroids = self.normalize_rows(
+                normalized_vectors.mean(axis=0, keepdims=True)
+                if len(normalized_vectors)
+                else np.zeros((1, vectors.shape[1]), dtype=np.float32)
+            )
+        else:
+            kmeans = KMeans(n_clusters=n_lists, n_init=1, random_state=42).fit(normalized_vectors)
+            self.centroids = self.normalize_rows(kmeans.cluster_centers_.astype(np.float32))
+
+        self.vectors = np.empty((0, vectors.shape[1]), dtype=np.float32)
+        self.positions = np.empty(0, dtype=np.int64)
+        self.assignments = np.empty(0, dtype=np.int64)
+        self._insert(normalized_vectors)
+        return self
+
+    def default_n_lists(self, n_vectors: int) -> int:
+        """Get the number of lists of an index without a given number of lists.
+
+        Args:
+            n_vectors: The number of vectors of the index.
+
+        Returns:
+            1 up to `exact_search_max_size` vectors, the square root of the number of vectors above.
+        """
+        if n_vectors <= self.exact_search_max_size:
+            return 1
+        return max(round(math.sqrt(n_vectors)), 1)
+
+    def search(
+        self, queries: NDArray[np.float32], k: int
+    ) -> tuple[NDArray[np.int64], NDArray[np.float32]]:
+        """Search the approximate nearest neighbours of each query.
+
+        Args:
+            queries: The queries matrix, one row per query.
+            k: The number of neighbours of each query.
+
+        Returns:
+            The positions of the neighbours of each query, by decreasing similarity, and their
+            cosine similarities. Missing neighbours have position -1 and similarity -inf.
+        """
+        normalized_queries = self.normalize_rows(queries)
+        n_probes = min(max(self.n_probes, 1), len(self.centroids))
+        if n_probes == len(self.centroids):
+            # Every list is probed: the search is exact, one product per batch of queries.
+            results = [
+                self.top_k(batch @ self.vectors.T, self.positions, k)
+                for batch in np.array_split(
+                    normalized_queries, max(-(-len(queries) // QUERY_BATCH_SIZE), 1)
+                )
+            ]
+            return (
+                np.concatenate([positions for positions, _ in results]),
+                np.concatenate([similarities for _, similarities in results]),
+            )
+
+        probed_lists = np.argpartition(
+            -(normalized_queries @ self.centroids.T), n_probes - 1, axis=1
+        )[:, :n_probes]
+        positions = np.empty((len(queries), k), dtype=np.int64)
+        similarities = np.empty((len(queries), k), dtype=np.float32)
+        for i, (query, lists) in enumerate(zip(normalized_queries, probed_lists, strict=True)):
+            rows = [slice(self.offsets[list_], self.offsets[list_ + 1]) for list_ in lists]
+            candidate_similarities = np.concatenate([self.vectors[row] @ query for row in rows])
+            candidate_positions = np.concatenate([self.positions[row] for row in rows])
+            query_positions, query_similarities = self.top_k(
+                candidate_similarities[None, :], candidate_positions, k
+            )
+            positions[i], similarities[i] = query_positions[0], query_similarities[0]
+        return positions, similarities
+
+    @staticmethod
+    def top_k(
+        similarities: NDArray[np.float32], positions: NDArray[np.int64], k: int
+    ) -> tuple[NDArray[np.int64], NDArray[np.float32]]:
+        """Select the `k` most similar candidates of each query.
+
+        Args:
+            similarities: The similarities matrix, one row per query and one column per candidate.
+            positions: The position of each candidate.
+            k: The number of neighbours of each query.
+
+        Returns:
+            The positions of the neighbours of each query, by decreasing similarity, and their
+            similarities. Missing neighbours have position -1 and similarity -inf.
+        """
+        top_positions = np.full((len(similarities), k), -1, dtype=np.int64)
+        top_similarities = np.full((len(similarities), k), -np.inf, dtype=np.float32)
+        n_neighbours = min(k, similarities.shape[1])
+        if n_neighbours == 0:
+            return top_positions, top_similarities
+        best = np.argpartition(-similarities, n_neighbours - 1, axis=1)[:, :n_neighbours]
+        best_similarities = np.take_along_axis(similarities, best, axis=1)
+        order = np.argsort(-best_similarities, axis=1, kind="stable")
+        top_positions[:, :n_neighbours] = positions[np.take_along_axis(best, order, axis=1)]
+        top_similarities[:, :n_neighbours] = np.take_along_axis(best_similarities, order, axis=1)
+        return top_positions, top_similarities
+
+    @staticmethod
+    def normalize_rows(vectors: NDArray[np.float32]) -> NDArray[np.float32]:
+        """L2-normalize the rows of a matrix.
+
+        Args:
+            vectors: The matrix.
+
+        Returns:
+            The float32 matrix of unit rows, the null rows staying null.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        normalized_vectors: NDArray[np.float32] = vectors / np.maximum(
+            norms, np.finfo(np.float32).tiny
+        )
+        return normalized_vectors
+
+    @staticmethod
+    def compute_offsets(assignments: NDArray[np.int64], n_lists: int) -> NDArray[np.int64]:
+        """Compute the first row of each list in the sorted vectors.
+
+        Args:
+            assignments: The sorted list of each vector.
+            n_lists: The number of lists.
+
+        Returns:
+            The offsets of the lists, followed by the number of vectors.
+        """
+        offsets: NDArray[np.int64] = np.searchsorted(assignments, np.arange(n_lists + 1))
+        return offsets
+
+    def _insert(self, normalized_vectors: NDArray[np.float32]) -> None:
+        new_assignments = np.argmax(normalized_vectors @ self.centroids.T, axis=1)
+        new_positions = np.arange(len(self), len(self) + len(normalized_vectors))
+        assignments = np.concatenate([self.assignments, new_assignments])
+        order = np.argsort(assignments, kind="stable")
+        self.vectors = np.ascontiguousarray(
+            np.concatenate([self.vectors, normalized_vectors])[order]
+        )
+        self.positions = np.concatenate([self.positions, new_positions])[order]
+        self.assignments = assignments[order]
+        self.offsets = self.compute_offsets(self.assignments, len(self.centroids))
@@ -11,9 +11,15 @@ from fastapi import BackgroundTasks, Depends, FastAPI
 from fastapi.responses import Response
 
 from cpeq_infolettre_automatique.dependencies import (
+    EmbeddingModelDependency,
     HttpClientDependency,
+    NewsCacheDependency,
+    NewsClassifiersDependency,
     OneDriveDependency,
+    PublishedNewsIndexDependency,
+    SourcePriorsDependency,
     VectorstoreClientDependency,
+    VectorstoreExecutorDependency,
     get_service,
 )
 from cpeq_infolettre_automatique.schemas import AddNewsBody
@@ -34,13 +40,23 @@ async def lifespan(app: FastAPI) -> AsyncIterator[None]:  # noqa: ARG001
     HttpClientDependency.setup()
     OneDriveDependency.setup()
     VectorstoreClientDependency.setup()
-    # TODO(Olivier Belhumeur): Add News Classifier setup here when deploying to production.
+    EmbeddingModelDependency.setup()
+    VectorstoreExecutorDependency.setup()
+    NewsCacheDependency.setup()
+    PublishedNewsIndexDependency.setup()
+    SourcePriorsDependency.setup()
+    NewsClassifiersDependency.setup()
 
     yield
 
     # Shutdown events.
     await HttpClientDependency.teardown()
+    await EmbeddingModelDependency.teardown()
+    VectorstoreExecutorDependency.teardown()
     VectorstoreClientDependency.teardown()
+    NewsCacheDependency.teardown()
+    PublishedNewsIndexDependency.teardown()
+    SourcePriorsDependency.teardown()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -71,6 +87,20 @@ def generate_newsletter(
     )
 
 
+@app.post("/reload-classifiers")
+def reload_classifiers() -> Response:
+    """Fit the news classifiers again once the reference collection changed.
+
+    Returns:
+        A message indicating that the classifiers were reloaded.
+
+    Note:
+        The requests in progress keep using the previous classifiers.
+    """
+    NewsClassifiersDependency.reload()
+    return Response(content="Les classificateurs ont été rechargés.")
+
+
 @app.post("/add-news")
 async def add_news(body: AddNewsBody, service: Annotated[Service, Depends(get_service)]) -> None:
     """Endpoint to manually add a news to this week's newsletter."""
@@ -1,18 +1,30 @@
 """Implementation of NewsClassifier."""
 
+import asyncio
+import logging
 import uuid
+from collections import Counter
 from collections.abc import Sequence
 from typing import Any
 
 import numpy as np
-from scipy.special import softmax
+from numpy.typing import NDArray
+from scipy.optimize import minimize_scalar
+from scipy.special import log_softmax, softmax
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.neighbors import KNeighborsClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import StratifiedKFold
 
+from cpeq_infolettre_automatique.ann_index import IvfIndex
 from cpeq_infolettre_automatique.config import Rubric, VectorNames
+from cpeq_infolettre_automatique.embedding_model import Embedding, EmbeddingMatrix
+from cpeq_infolettre_automatique.in_memory_vectorstore import InMemoryVectorstore
 from cpeq_infolettre_automatique.schemas import News
-from cpeq_infolettre_automatique.vectorstore import Vectorstore
+from cpeq_infolettre_automatique.vectorstore import SearchHits, Vectorstore
+
+
+TrainData = tuple[list[str], EmbeddingMatrix]
+"""The label of each training news, and their embeddings matrix."""
 
 
 class NewsClassifier:
@@ -24,21 +36,39 @@ class NewsClassifier:
         This should only take inputs and outputs, and be agnnostic of the value predicted.
     """
 
+    fitted_attributes: tuple[str, ...] = ()
+
     def __init__(
-        self, vectorstore: Vectorstore, *, vector_name: VectorNames, **kwargs: Any
+        self, vectorstore: Vectorstore | None, *, vector_name: VectorNames, **kwargs: Any
     ) -> None:
         """Initialize the NewsClassifier with the vectorstore.
 
         Args:
-        vectorstore: The vectorstore to use for classification.
+        vectorstore: The vectorstore to use for classification. None if the classifier is only
+            given its training data and the embeddings of the news.
         """
-        self.vectorstore = vectorstore
+        self._vectorstore = vectorstore
         self.vector_name = vector_name
 
+    @property
+    def vectorstore(self) -> Vectorstore:
+        """Get the vectorstore used to read the training data, embed and search the news.
+
+        Raises:
+            RuntimeError: If the classifier was created without a vectorstore.
+        """
+        if self._vectorstore is None:
+            error_msg = (
+                f"The {type(self).__name__} has no vectorstore: its training data and the "
+                "embeddings of the news must be given."
+            )
+            raise RuntimeError(error_msg)
+        return self._vectorstore
+
     async def predict_probs(
         self,
         news: News,
-        embedding: list[float] | None = None,
+        embedding: Embedding | None = None,
         ids_to_keep: Sequence[str | uuid.UUID] | None = None,
     ) -> dict[str, float]:
         """Predict the rubric of the given news.
@@ -52,20 +82,58 @@ class NewsClassifier:
             The rubric class of the news with their associated probabilities. Sorted by decreasing probability.
         """
         predicted_scores = await self.predict_scores(news, embedding, ids_to_keep)
+        return self.scores_to_probs(predicted_scores)
 
-        if len(predicted_scores) == 0:
-            predicted_scores[Rubric.AUTRE.value] = 1.0
+    async def predict_probs_many(
+        self,
+        news_list: Sequence[News],
+        embeddings: EmbeddingMatrix | None = None,
+        ids_to_keep: Sequence[str | uuid.UUID] | None = None,
+    ) -> list[dict[str, float]]:
+        """Predict the rubric of many news.
 
-        sorted_probs = dict(
-            sorted(predicted_scores.items(), key=lambda rubric_prob: rubric_prob[1], reverse=True)
+        Args:
+            news_list: The news to classify a new Rubric from.
+            embeddings: The embeddings matrix, one row per news.
+            ids_to_keep: The list of News ids to keep to perform the the classification.
+
+        Returns:
+            The rubric classes of each news with their associated probabilities. Sorted by decreasing probability.
+        """
+        predicted_scores = await self.predict_scores_many(news_list, embeddings, ids_to_keep)
+        return [self.scores_to_probs(scores) for scores in predicted_scores]
+
+    async def predict_scores_many(
+        self,
+        news_list: Sequence[News],
+        embeddings: EmbeddingMatrix | None = None,
+        ids_to_keep: Sequence[str | uuid.UUID] | None = None,
+    ) -> list[dict[str, float]]:
+        """Predict the rubric scores of many news. Runs `predict_scores` concurrently by default.
+
+        Args:
+            news_list: The news to classify a new Rubric from.
+            embeddings: The embeddings matrix, one row per news.
+            ids_to_keep: The list of News ids to keep to perform the the classification.
+
+        Returns:
+            The rubric scores of each news.
+        """
+        return list(
+            await asyncio.gather(
+                *(
+                    self.predict_scores(
+                        news, embeddings[i] if embeddings is not None else None, ids_to_keep
+                    )
+                    for i, news in enumerate(news_list)
+                )
+            )
         )
-        normalized_rubric_scores = self.softmax_scores(sorted_probs)
-        return normalized_rubric_scores
 
     async def predict_scores(
         self,
         news: News,
-        embedding: list[float] | None = None,
+        embedding: Embedding | None = None,
         ids_to_keep: Sequence[str | uuid.UUID] | None = None,
     ) -> dict[str, float]:
         """Predict the rubric of the given news.
@@ -80,9 +148,190 @@ class NewsClassifier:
         """
         raise NotImplementedError
 
-    def setup(self, train_data: list[tuple[str, list[float]]] | None = None) -> None:
+    def setup(self, train_data: TrainData | None = None) -> None:
         """Setup the predictor."""
 
+    async def leave_one_out_scores(
+        self, news_list: Sequence[News], train_data: TrainData
+    ) -> list[dict[str, float]]:
+        """Score each training news with the classifier fitted on the other training news.
+
+        Note:
+            The classifier is fitted once per news, the implementations with a closed form
+            override this. The classifier is left fitted on all the training news.
+
+        Args:
+            news_list: The training news, in the order of the training data.
+            train_data: The label and the embedding of each training news.
+
+        Returns:
+            The rubric scores of each training news.
+        """
+        labels, embeddings = self.read_train_data(train_data)
+        ids = [Vectorstore.create_uuid(news) for news in news_list]
+        positions = np.arange(len(news_list))
+        scores = []
+        for i, news in enumerate(news_list):
+            self.setup(([*labels[:i], *labels[i + 1 :]], embeddings[positions != i]))
+            [news_scores] = await self.predict_scores_many(
+                [news], embeddings[i : i + 1], [*ids[:i], *ids[i + 1 :]]
+            )
+            scores.append(news_scores)
+        self.setup((labels, embeddings))
+        return scores
+
+    def get_fitted_state(self) -> dict[str, Any]:
+        """Get the state learned by `setup`, to persist the fitted classifier.
+
+        Returns:
+            The fitted attributes of the classifier.
+        """
+        return {name: getattr(self, name) for name in self.fitted_attributes}
+
+    def set_fitted_state(self, state: dict[str, Any]) -> None:
+        """Restore the state learned by `setup`, instead of fitting the classifier again.
+
+        Args:
+            state: The fitted attributes of the classifier, as returned by `get_fitted_state`.
+        """
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    def read_train_data(self, train_news: TrainData | None = None) -> TrainData:
+        """Get the labels and the embeddings matrix of the training data.
+
+        Args:
+            train_news: The training data. All the reference news with a rubric are read from the vectorstore if None.
+
+        Returns:
+            The label of each training news, and their embeddings matrix.
+        """
+        if train_news is not None:
+            labels, embeddings = train_news
+            return labels, np.asarray(embeddings, dtype=np.float32)
+        reference_vectors = self.vectorstore.read_vectors(
+            self.vector_name, return_properties=("rubric",)
+        )
+        has_rubric = [rubric is not None for rubric in reference_vectors.properties["rubric"]]
+        labels = [
+            rubric for rubric in reference_vectors.properties["rubric"] if rubric is not None
+        ]
+        if all(has_rubric):
+            return labels, reference_vectors.vectors
+        return labels, reference_vectors.vectors[np.asarray(has_rubric, dtype=bool)]
+
+    async def search_many(
+        self,
+        news_list: Sequence[News],
+        embeddings: EmbeddingMatrix | None = None,
+        ids_to_keep: Sequence[str | uuid.UUID] | None = None,
+        return_properties: Sequence[str] | None = None,
+    ) -> list[SearchHits]:
+        """Search the reference news similar to each news in a single batch of queries.
+
+        Args:
+            news_list: The news to search for.
+            embeddings: The embeddings matrix, one row per news. The news are embedded if None.
+            ids_to_keep: The list of News ids to keep to perform the the classification.
+            return_properties: The properties of the reference news to retrieve. All the properties if None.
+
+        Returns:
+            The hits of each news.
+        """
+        queries = [
+            Vectorstore.create_query(news, vector_name=self.vector_name) for news in news_list
+        ]
+        if embeddings is None:
+            embeddings = await self.vectorstore.embedding_model.embed_many(queries)
+        return await self.vectorstore.hybrid_search_many(
+            queries, embeddings, self.vector_name, ids_to_keep, return_properties
+        )
+
+    async def search_leave_one_out(
+        self, news_list: Sequence[News], embeddings: EmbeddingMatrix
+    ) -> list[SearchHits]:
+        """Search the reference news similar to each reference news, except the news itself.
+
+        Note:
+            With an InMemoryVectorstore, the self-hits are masked in a single batch of queries.
+            Otherwise each news is searched among the ids of the other news, one query each.
+
+        Args:
+            news_list: The reference news.
+            embeddings: The embeddings matrix, one row per news.
+
+        Returns:
+            The hits of each news, with their `rubric` property.
+        """
+        queries = [
+            Vectorstore.create_query(news, vector_name=self.vector_name) for news in news_list
+        ]
+        ids = [Vectorstore.create_uuid(news) for news in news_list]
+        if isinstance(self.vectorstore, InMemoryVectorstore):
+            return await self.vectorstore.hybrid_search_many(
+                queries,
+                embeddings,
+                self.vector_name,
+                return_properties=("rubric",),
+                excluded_ids=ids,
+            )
+        search_hits = await asyncio.gather(
+            *(
+                self.vectorstore.hybrid_search_many(
+                    [query],
+                    embeddings[i : i + 1],
+                    self.vector_name,
+                    [*ids[:i], *ids[i + 1 :]],
+                    ("rubric",),
+                )
+                for i, query in enumerate(queries)
+            )
+        )
+        return [hits for [hits] in search_hits]
+
+    @staticmethod
+    def group_by_rubric(
+        hits: SearchHits,
+    ) -> tuple[list[str], NDArray[np.intp], NDArray[np.float64]]:
+        """Group the scores of the hits by rubric, ignoring the hits without a rubric.
+
+        Args:
+            hits: The hits of a news, with their `rubric` property.
+
+        Returns:
+            The rubrics in the order of their best hit, the rubric index of each hit, and the score of each hit.
+        """
+        has_rubric = np.array(
+            [rubric is not None for rubric in hits.properties["rubric"]], dtype=bool
+        )
+        rubrics = np.array(
+            [rubric for rubric in hits.properties["rubric"] if rubric is not None], dtype=str
+        )
+        labels, first_indexes, inverse = np.unique(rubrics, return_index=True, return_inverse=True)
+        order = np.argsort(first_indexes)
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        grouped_rubrics: list[str] = labels[order].tolist()
+        return grouped_rubrics, rank[inverse], hits.scores[has_rubric].astype(np.float64)
+
+    def scores_to_probs(self, predicted_scores: dict[str, float]) -> dict[str, float]:
+        """Convert the scores of the rubrics to probabilities.
+
+        Args:
+            predicted_scores: The scores of the rubrics.
+
+        Returns:
+            The probabilities of the rubrics, sorted by decreasing probability.
+        """
+        if len(predicted_scores) == 0:
+            predicted_scores[Rubric.AUTRE.value] = 1.0
+
+        sorted_probs = dict(
+            sorted(predicted_scores.items(), key=lambda rubric_prob: rubric_prob[1], reverse=True)
+        )
+        normalized_rubric_scores = self.softmax_scores(sorted_probs)
+        return normalized_rubric_scores
+
     @staticmethod
     def softmax_scores(scores: dict[str, float], temperature: float = 1.0) -> dict[str, float]:
         """Compute the softmax of a list of numbers."""
@@ -98,7 +347,7 @@ class MaxMeanScoresNewsClassifier(NewsClassifier):
     async def predict_scores(
         self,
         news: News,
-        embedding: list[float] | None = None,
+        embedding: Embedding | None = None,
         ids_to_keep: Sequence[str | uuid.UUID] | None = None,
     ) -> dict[str, float]:
         """Retrieve Rubric classification scores for a news.
@@ -111,30 +360,62 @@ class MaxMeanScoresNewsClassifier(NewsClassifier):
         Returns:
             The rubric class of the news with their associated probabilities. Sorted by decreasing probability.
         """
-        query = Vectorstore.create_query(news, vector_name=self.vector_name)
-        if embedding is None:
-            embedding = await self.vectorstore.embedding_model.embed(text_description=query)
+        [rubric_avg_scores] = await self.predict_scores_many(
+            [news], embedding.reshape(1, -1) if embedding is not None else None, ids_to_keep
+        )
+        return rubric_avg_scores
+
+    async def predict_scores_many(
+        self,
+        news_list: Sequence[News],
+        embeddings: EmbeddingMatrix | None = None,
+        ids_to_keep: Sequence[str | uuid.UUID] | None = None,
+    ) -> list[dict[str, float]]:
+        """Retrieve Rubric classification scores for many news with a single batch of queries.
+
+        Args:
+            news_list: The news to classify a new Rubric from.
+            embeddings: The embeddings matrix, one row per news.
+            ids_to_keep: The list of News ids to keep to perform the the classification.
 
-        news_scores = await self.vectorstore.hybrid_search(
-            query, embedding, self.vector_name, ids_to_keep
+        Returns:
+            The mean score of the hits of each rubric, for each news.
+        """
+        search_hits = await self.search_many(
+            news_list, embeddings, ids_to_keep, return_properties=("rubric",)
         )
+        return [self.mean_scores(hits) for hits in search_hits]
 
-        predicted_fields = [
-            news_item.rubric.value for news_item, _ in news_scores if news_item.rubric is not None
-        ]
-        list_scores: dict[str, list[float]] = {
-            predicted_field: [] for predicted_field in predicted_fields
-        }
-        for news_item, score in news_scores:
-            if news_item.rubric is not None:
-                list_scores[news_item.rubric.value].append(score)
+    async def leave_one_out_scores(
+        self, news_list: Sequence[News], train_data: TrainData
+    ) -> list[dict[str, float]]:
+        """Score each reference news with the hits of the other reference news.
 
-        rubric_avg_scores: dict[str, float] = dict.fromkeys(predicted_fields, 0.0)
-        for rubric, scores in list_scores.items():
-            if len(scores) > 0:
-                rubric_avg_scores[rubric] = np.mean(scores, dtype=float)
+        Args:
+            news_list: The reference news, in the order of the training data.
+            train_data: The label and the embedding of each reference news. The labels are
+                ignored, the rubrics being read from the hits.
 
-        return rubric_avg_scores
+        Returns:
+            The mean score of the hits of each rubric, for each news.
+        """
+        search_hits = await self.search_leave_one_out(news_list, train_data[1])
+        return [self.mean_scores(hits) for hits in search_hits]
+
+    @staticmethod
+    def mean_scores(hits: SearchHits) -> dict[str, float]:
+        """Compute the mean score of the hits of each rubric.
+
+        Args:
+            hits: The hits of a news.
+
+        Returns:
+            The mean score of each rubric.
+        """
+        rubrics, groups, scores = NewsClassifier.group_by_rubric(hits)
+        sums = np.bincount(groups, weights=scores, minlength=len(rubrics))
+        counts = np.bincount(groups, minlength=len(rubrics))
+        return dict(zip(rubrics, (sums / np.maximum(counts, 1)).tolist(), strict=True))
 
 
 class MaxScoreNewsClassifier(NewsClassifier):
@@ -143,7 +424,7 @@ class MaxScoreNewsClassifier(NewsClassifier):
     async def predict_scores(
         self,
         news: News,
-        embedding: list[float] | None = None,
+        embedding: Embedding | None = None,
         ids_to_keep: Sequence[str | uuid.UUID] | None = None,
     ) -> dict[str, float]:
         """Retrieve Rubric classification scores for a news.
@@ -156,164 +437,401 @@ class MaxScoreNewsClassifier(NewsClassifier):
         Returns:
             list[tuple[Rubric, float]]: A list of tuples containing the Rubric and the classification score.
         """
-        query = Vectorstore.create_query(news, vector_name=self.vector_name)
-        if embedding is None:
-            embedding = await self.vectorstore.embedding_model.embed(text_description=query)
-
-        news_scores = await self.vectorstore.hybrid_search(
-            query, embedding, self.vector_name, ids_to_keep
+        [prediction_scores] = await self.predict_scores_many(
+            [news], embedding.reshape(1, -1) if embedding is not None else None, ids_to_keep
         )
-        predicted_fields = [
-            news_item.rubric.value for news_item, _ in news_scores if news_item.rubric is not None
-        ]
+        return prediction_scores
 
-        prediction_scores: dict[str, float] = dict.fromkeys(predicted_fields, 0.0)
+    async def predict_scores_many(
+        self,
+        news_list: Sequence[News],
+        embeddings: EmbeddingMatrix | None = None,
+        ids_to_keep: Sequence[str | uuid.UUID] | None = None,
+    ) -> list[dict[str, float]]:
+        """Retrieve Rubric classification scores for many news with a single batch of queries.
 
-        for news_item, score in news_scores:
-            if news_item.rubric is not None:
-                prediction_scores[news_item.rubric.value] = max(
-                    prediction_scores[news_item.rubric.value], score
-                )
+        Args:
+            news_list: The news to classify a new Rubric from.
+            embeddings: The embeddings matrix, one row per news.
+            ids_to_keep: The list of News ids to keep to perform the the classification.
 
-        return prediction_scores
+        Returns:
+            The maximum score of the hits of each rubric, for each news.
+        """
+        search_hits = await self.search_many(
+            news_list, embeddings, ids_to_keep, return_properties=("rubric",)
+        )
+        return [self.max_scores(hits) for hits in search_hits]
 
+    async def leave_one_out_scores(
+        self, news_list: Sequence[News], train_data: TrainData
+    ) -> list[dict[str, float]]:
+        """Score each reference news with the hits of the other reference news.
 
-class MaxPoolingNewsClassifier(NewsClassifier):
-    """Classify news based on the maximum pooling of the rubric embeddings."""
+        Args:
+            news_list: The reference news, in the order of the training data.
+            train_data: The label and the embedding of each reference news. The labels are
+                ignored, the rubrics being read from the hits.
 
-    def setup(self, train_news: list[tuple[str, list[float]]] | None = None) -> None:
-        """Setup the classifier.
+        Returns:
+            The maximum score of the hits of each rubric, for each news.
+        """
+        search_hits = await self.search_leave_one_out(news_list, train_data[1])
+        return [self.max_scores(hits) for hits in search_hits]
+
+    @staticmethod
+    def max_scores(hits: SearchHits) -> dict[str, float]:
+        """Compute the maximum score of the hits of each rubric.
 
         Args:
-            train_news: The training data to use for classification.
+            hits: The hits of a news.
+
+        Returns:
+            The maximum score of each rubric.
         """
-        if train_news is None:
-            news_vectors = self.vectorstore.read_many_with_vectors(vector_name=self.vector_name)
-            train_news = [
-                (news_vector[0].rubric.value, news_vector[1])
-                for news_vector in news_vectors
-                if news_vector[0].rubric is not None
-            ]
-        self.labels = list({train_news_item[0] for train_news_item in train_news})
-        labels_embeddings: dict[str, list[list[float]]] = {label: [] for label in self.labels}
+        rubrics, groups, scores = NewsClassifier.group_by_rubric(hits)
+        maximums = np.zeros(len(rubrics), dtype=np.float64)
+        np.maximum.at(maximums, groups, scores)
+        return dict(zip(rubrics, maximums.tolist(), strict=True))
 
-        for label, embedding in train_news:
-            labels_embeddings[label].append(embedding)
 
-        self.label_average_embeddings = {
-            label: np.mean(embeddings, axis=0) for label, embeddings in labels_embeddings.items()
-        }
+class EmbeddingNewsClassifier(NewsClassifier):
+    """Interface for the NewsClassifiers scoring the embeddings of the news against fitted labels.
+
+    Note:
+        Implementations fit `labels` in `setup` and implement `predict_score_matrix`, which scores
+        all the news at once, one column per label.
+    """
+
+    labels: list[str]
 
     async def predict_scores(
         self,
         news: News,
-        embedding: list[float] | None = None,
+        embedding: Embedding | None = None,
         ids_to_keep: Sequence[str | uuid.UUID] | None = None,
     ) -> dict[str, float]:
         """Retrieve Rubric classification scores for a news.
 
         Args:
             news: The news to classify a new Rubric from.
-            embedding: The embedding of the item.
-            ids_to_keep: The list of News ids to keep to perform the the classification.
+            embedding: The embedding of the news.
+            ids_to_keep: Ignored, the classifier only uses the news it was fitted on.
 
         Returns:
-            list[tuple[Rubric, float]]: A list of tuples containing the Rubric and the classification score.
+            The score of each rubric.
         """
-        query = Vectorstore.create_query(news, vector_name=self.vector_name)
-        if embedding is None:
-            embedding = await self.vectorstore.embedding_model.embed(text_description=query)
+        [scores] = await self.predict_scores_many(
+            [news], embedding.reshape(1, -1) if embedding is not None else None, ids_to_keep
+        )
+        return scores
+
+    async def predict_scores_many(
+        self,
+        news_list: Sequence[News],
+        embeddings: EmbeddingMatrix | None = None,
+        ids_to_keep: Sequence[str | uuid.UUID] | None = None,
+    ) -> list[dict[str, float]]:
+        """Retrieve Rubric classification scores for many news with a single matrix computation.
+
+        Args:
+            news_list: The news to classify a new Rubric from.
+            embeddings: The embeddings matrix, one row per news.
+            ids_to_keep: Ignored, the classifier only uses the news it was fitted on.
+
+        Returns:
+            The score of each rubric, for each news.
+        """
+        score_matrix = self.predict_score_matrix(await self.embed_many(news_list, embeddings))
+        return [dict(zip(self.labels, scores, strict=True)) for scores in score_matrix.tolist()]
+
+    async def predict_probs_many(
+        self,
+        news_list: Sequence[News],
+        embeddings: EmbeddingMatrix | None = None,
+        ids_to_keep: Sequence[str | uuid.UUID] | None = None,
+    ) -> list[dict[str, float]]:
+        """Predict the rubric of many news with a single matrix computation and a row-wise softmax.
+
+        Args:
+            news_list: The news to classify a new Rubric from.
+            embeddings: The embeddings matrix, one row per news.
+            ids_to_keep: Ignored, the classifier only uses the news it was fitted on.
+
+        Returns:
+            The rubric classes of each news with their associated probabilities. Sorted by decreasing probability.
+        """
+        if not self.labels:
+            return [self.scores_to_probs({}) for _ in news_list]
+        score_matrix = self.predict_score_matrix(await self.embed_many(news_list, embeddings))
+        probs_matrix = softmax(score_matrix, axis=1)
+        orders = np.argsort(-score_matrix, axis=1, kind="stable")
+        return [
+            {self.labels[i]: probs[i] for i in order}
+            for probs, order in zip(probs_matrix.tolist(), orders.tolist(), strict=True)
+        ]
+
+    async def embed_many(
+        self, news_list: Sequence[News], embeddings: EmbeddingMatrix | None = None
+    ) -> NDArray[np.float32]:
+        """Get the embeddings matrix of the news, embedding them concurrently if needed.
 
-        label_scores: dict[str, float] = dict.fromkeys(self.labels, 0.0)
+        Args:
+            news_list: The news.
+            embeddings: The embeddings matrix, one row per news. The news are embedded if None.
+
+        Returns:
+            The embeddings matrix, one row per news.
+        """
+        if embeddings is None:
+            embeddings = await self.vectorstore.embedding_model.embed_many([
+                Vectorstore.create_query(news, vector_name=self.vector_name) for news in news_list
+            ])
+        return np.asarray(embeddings, dtype=np.float32).reshape(len(news_list), -1)
+
+    def predict_score_matrix(self, embeddings: NDArray[np.float32]) -> NDArray[np.float64]:
+        """Score the embeddings against each label.
 
-        for label, label_embeddings in self.label_average_embeddings.items():
-            similarity = cosine_similarity([embedding], [label_embeddings])[0][0]
-            label_scores[label] = similarity
+        Args:
+            embeddings: The embeddings matrix, one row per news.
 
-        return label_scores
+        Returns:
+            The scores matrix, one row per news and one column per label.
+        """
+        raise NotImplementedError
 
+    def to_leave_one_out_scores(
+        self, score_matrix: NDArray[np.float64], label_indexes: NDArray[np.intp]
+    ) -> list[dict[str, float]]:
+        """Get the scores of each training news from its leave-one-out scores matrix.
 
-class KnNewsClassifier(NewsClassifier):
-    """Classify news based on the K-Nearest Neighbors algorithm."""
+        Args:
+            score_matrix: The leave-one-out scores matrix, one row per training news.
+            label_indexes: The index of the label of each training news in `labels`.
+
+        Returns:
+            The score of each label, for each news. The label of a news is missing if no other
+            training news has it, as it would be for a classifier fitted without the news.
+        """
+        singletons = np.bincount(label_indexes, minlength=len(self.labels))[label_indexes] == 1
+        return [
+            {
+                label: score
+                for j, (label, score) in enumerate(zip(self.labels, scores, strict=True))
+                if not (singleton and j == label_index)
+            }
+            for scores, label_index, singleton in zip(
+                score_matrix.tolist(), label_indexes.tolist(), singletons.tolist(), strict=True
+            )
+        ]
+
+
+class MaxPoolingNewsClassifier(EmbeddingNewsClassifier):
+    """Classify news based on the maximum pooling of the rubric embeddings."""
+
+    fitted_attributes = ("labels", "label_average_embeddings")
+
+    def setup(self, train_news: TrainData | None = None) -> None:
+        """Setup the classifier.
+
+        Args:
+            train_news: The training data to use for classification.
+        """
+        labels, embeddings = self.read_train_data(train_news)
+        self.labels = sorted(set(labels))
+        label_array = np.asarray(labels)
+
+        self.label_average_embeddings = {
+            label: embeddings[label_array == label].mean(axis=0) for label in self.labels
+        }
+
+    async def leave_one_out_scores(
+        self, news_list: Sequence[News], train_data: TrainData
+    ) -> list[dict[str, float]]:
+        """Score each training news against the averages of the other training news, in closed form.
+
+        Note:
+            The average embedding of the label of each news is recomputed without the news by
+            subtracting it from the sum of the embeddings of the label.
+
+        Args:
+            news_list: The training news, in the order of the training data.
+            train_data: The label and the embedding of each training news.
+
+        Returns:
+            The rubric scores of each training news.
+        """
+        labels, embeddings = self.read_train_data(train_data)
+        self.setup((labels, embeddings))
+        label_indexes = np.searchsorted(self.labels, labels)
+        counts = np.bincount(label_indexes, minlength=len(self.labels))
+        sums = np.zeros((len(self.labels), embeddings.shape[1]))
+        np.add.at(sums, label_indexes, embeddings)
+
+        own_centroids = (sums[label_indexes] - embeddings) / np.maximum(
+            counts[label_indexes] - 1, 1
+        )[:, None]
+        score_matrix = self.predict_score_matrix(embeddings)
+        score_matrix[np.arange(len(labels)), label_indexes] = np.sum(
+            self.normalize_rows(embeddings) * self.normalize_rows(own_centroids), axis=1
+        )
+        return self.to_leave_one_out_scores(score_matrix, label_indexes)
+
+    def predict_score_matrix(self, embeddings: NDArray[np.float32]) -> NDArray[np.float64]:
+        """Compute the cosine similarities of the embeddings with the average embedding of each label.
+
+        Args:
+            embeddings: The embeddings matrix, one row per news.
+
+        Returns:
+            The scores matrix, one row per news and one column per label.
+        """
+        centroids = np.stack([self.label_average_embeddings[label] for label in self.labels])
+        similarities: NDArray[np.float64] = (
+            self.normalize_rows(embeddings) @ self.normalize_rows(centroids).T
+        ).astype(np.float64)
+        return similarities
+
+    @staticmethod
+    def normalize_rows(matrix: NDArray[np.float32]) -> NDArray[np.float32]:
+        """Normalize the rows of a matrix to unit length.
+
+        Args:
+            matrix: The matrix.
+
+        Returns:
+            The normalized matrix.
+        """
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        normalized_matrix: NDArray[np.float32] = matrix / np.maximum(
+            norms, np.finfo(np.float32).tiny
+        )
+        return normalized_matrix
+
+
+class KnNewsClassifier(EmbeddingNewsClassifier):
+    """Classify news based on the K-Nearest Neighbors algorithm.
+
+    Note:
+        The neighbours are searched in an IVF index of the normalized float32 reference vectors.
+        By default, the search is exact up to `exact_search_max_size` reference news. Above, the
+        index has `sqrt(n)` lists and a prediction scans about `n_probes * sqrt(n)` reference
+        news, the neighbours being approximate. `n_probes >= n_lists` gives the exact neighbours.
+    """
+
+    fitted_attributes = ("labels", "label_indexes", "index")
 
     def __init__(
         self,
-        vectorstore: Vectorstore,
+        vectorstore: Vectorstore | None,
         vector_name: VectorNames,
         n_neighbors: int = 4,
+        n_lists: int | None = None,
+        n_probes: int = 8,
+        exact_search_max_size: int = 10_000,
     ) -> None:
         """Initialize the NewsClassifier with the vectorstore.
 
         Args:
-            vectorstore: The vectorstore to use for classification.
+            vectorstore: The vectorstore to use for classification. None if the classifier is
+                only given its training data and the embeddings of the news.
             n_neighbors: The number of neighbors to use for classification.
+            n_lists: The number of lists of the index. If None, a single list up to
+                `exact_search_max_size` reference news, and their square root above.
+            n_probes: The number of lists scanned for each news.
+            exact_search_max_size: The maximal number of reference news searched exactly when
+                `n_lists` is None.
         """
         super().__init__(vectorstore, vector_name=vector_name)
         self.n_neighbors = n_neighbors
         self.labels: list[str] = []
-        self.classifier = KNeighborsClassifier(n_neighbors=self.n_neighbors, metric="cosine")
+        self.label_indexes = np.empty(0, dtype=np.int64)
+        self.index = IvfIndex(
+            n_lists=n_lists, n_probes=n_probes, exact_search_max_size=exact_search_max_size
+        )
 
-    def setup(self, train_news: list[tuple[str, list[float]]] | None = None) -> None:
+    def setup(self, train_news: TrainData | None = None) -> None:
         """Setup the classifier.
 
         Args:
             train_news: The training data to use for classification.
         """
-        if train_news is None:
-            news_vectors = self.vectorstore.read_many_with_vectors(self.vector_name)
-            train_news = [
-                (news_vector[0].rubric.value, news_vector[1])
-                for news_vector in news_vectors
-                if news_vector[0].rubric is not None
-            ]
-
-        x = [train_news_item[1] for train_news_item in train_news]
-        y = [train_news_item[0] for train_news_item in train_news]
+        y, x = self.read_train_data(train_news)
 
         self.labels = sorted(set(y))
+        self.label_indexes = np.searchsorted(self.labels, y).astype(np.int64)
+        self.index.fit(x)
 
-        self.classifier.fit(x, y)
+    def predict_score_matrix(self, embeddings: NDArray[np.float32]) -> NDArray[np.float64]:
+        """Predict the fraction of the nearest neighbours of each label for all the embeddings at once.
 
-    async def predict_scores(
-        self,
-        news: News,
-        embedding: list[float] | None = None,
-        ids_to_keep: Sequence[str | uuid.UUID] | None = None,
-    ) -> dict[str, float]:
-        """Retrieve Rubric classification scores for a news.
+        Args:
+            embeddings: The embeddings matrix, one row per news.
+
+        Returns:
+            The scores matrix, one row per news and one column per label.
+        """
+        positions, _ = self.index.search(embeddings, self.n_neighbors)
+        return self.neighbour_fractions(positions)
+
+    async def leave_one_out_scores(
+        self, news_list: Sequence[News], train_data: TrainData
+    ) -> list[dict[str, float]]:
+        """Score each training news with its nearest neighbours among the other training news.
+
+        Note:
+            The neighbours are searched in the index of all the training news, skipping the news
+            itself, so the index is fitted once instead of once per news.
 
         Args:
-            news: The news to classify a new Rubric from.
-            embedding: The embedding of the news.
-            ids_to_keep: The list of News ids to keep to perform the the classification.
+            news_list: The training news, in the order of the training data.
+            train_data: The label and the embedding of each training news.
 
         Returns:
-            list[tuple[Rubric, float]]: A list of tuples containing the Rubric and the classification score.
+            The rubric scores of each training news.
         """
-        query = Vectorstore.create_query(news, vector_name=self.vector_name)
-        if embedding is None:
-            embedding = await self.vectorstore.embedding_model.embed(text_description=query)
+        labels, embeddings = self.read_train_data(train_data)
+        self.setup((labels, embeddings))
+        positions, _ = self.index.search(embeddings, self.n_neighbors + 1)
+        positions[positions == np.arange(len(positions))[:, None]] = -1
+        return self.to_leave_one_out_scores(
+            self.neighbour_fractions(positions), self.label_indexes
+        )
 
-        probs = self.classifier.predict_proba([embedding])
+    def neighbour_fractions(self, positions: NDArray[np.int64]) -> NDArray[np.float64]:
+        """Compute the fraction of the first `n_neighbors` neighbours of each news with each label.
 
-        label_probs = dict(zip(self.labels, probs[0], strict=True))
+        Args:
+            positions: The positions of the neighbours of each news, -1 for the missing ones.
 
-        return label_probs
+        Returns:
+            The scores matrix, one row per news and one column per label.
+        """
+        found = positions >= 0
+        found &= np.cumsum(found, axis=1) <= self.n_neighbors
+        rows = np.broadcast_to(np.arange(len(positions))[:, None], positions.shape)
+        counts = np.zeros((len(positions), len(self.labels)))
+        np.add.at(counts, (rows[found], self.label_indexes[positions[found]]), 1.0)
+        probs: NDArray[np.float64] = counts / np.maximum(found.sum(axis=1, keepdims=True), 1)
+        return probs
 
 
-class RandomForestNewsClassifier(NewsClassifier):
+class RandomForestNewsClassifier(EmbeddingNewsClassifier):
     """Classify news based on the RandomForest algorithm."""
 
+    fitted_attributes = ("labels", "classifier")
+
     def __init__(
         self,
-        vectorstore: Vectorstore,
+        vectorstore: Vectorstore | None,
         vector_name: VectorNames,
         n_estimators: int = 100,
     ) -> None:
         """Initialize the NewsClassifier with the vectorstore.
 
         Args:
-            vectorstore: The vectorstore to use for classification.
+            vectorstore: The vectorstore to use for classification. None if the classifier is
+                only given its training data and the embeddings of the news.
             n_estimators: The number of estimators to use for classification.
         """
         super().__init__(vectorstore, vector_name=vector_name)
@@ -321,42 +839,161 @@ class RandomForestNewsClassifier(NewsClassifier):
         self.labels: list[str] = []
         self.classifier = RandomForestClassifier(n_estimators=self.n_estimators)
 
-    def setup(self, train_news: list[tuple[str, list[float]]] | None = None) -> None:
+    def setup(self, train_news: TrainData | None = None) -> None:
         """Setup the classifier."""
-        if train_news is None:
-            news_vectors = self.vectorstore.read_many_with_vectors(self.vector_name)
-            train_news = [
-                (news_vector[0].rubric.value, news_vector[1])
-                for news_vector in news_vectors
-                if news_vector[0].rubric is not None
-            ]
-        x = [train_news_item[1] for train_news_item in train_news]
-        y = [train_news_item[0] for train_news_item in train_news]
+        y, x = self.read_train_data(train_news)
 
         self.labels = sorted(set(y))
         self.classifier.fit(x, y)
 
-    async def predict_scores(
+    def predict_score_matrix(self, embeddings: NDArray[np.float32]) -> NDArray[np.float64]:
+        """Predict the probability of each label for all the embeddings at once.
+
+        Args:
+            embeddings: The embeddings matrix, one row per news.
+
+        Returns:
+            The scores matrix, one row per news and one column per label.
+        """
+        probs: NDArray[np.float64] = self.classifier.predict_proba(embeddings)
+        return probs
+
+
+class LogisticRegressionNewsClassifier(EmbeddingNewsClassifier):
+    """Classify news with a multinomial logistic regression calibrated by temperature scaling.
+
+    Note:
+        The temperature minimizes the log loss of the cross-validated logits and is folded into
+        the coefficients, so predicting is a single product with a (labels x dimensions) matrix
+        and the fitted state is only the coefficients and intercepts.
+    """
+
+    fitted_attributes = ("labels", "coefficients", "intercepts")
+
+    def __init__(
         self,
-        news: News,
-        embedding: list[float] | None = None,
-        ids_to_keep: Sequence[str | uuid.UUID] | None = None,
-    ) -> dict[str, float]:
-        """Retrieve Rubric classification scores for a news.
+        vectorstore: Vectorstore | None,
+        vector_name: VectorNames,
+        regularization: float = 1.0,
+        n_folds: int = 5,
+    ) -> None:
+        """Initialize the NewsClassifier with the vectorstore.
 
         Args:
-            news: The news to classify a new Rubric from.
-            ids_to_keep: The list of News ids to keep to perform the the classification.
+            vectorstore: The vectorstore to use for classification. None if the classifier is
+                only given its training data and the embeddings of the news.
+            regularization: The inverse of the L2 regularization strength.
+            n_folds: The number of cross-validation folds used to fit the temperature.
+        """
+        super().__init__(vectorstore, vector_name=vector_name)
+        self.regularization = regularization
+        self.n_folds = n_folds
+        self.labels: list[str] = []
+        self.coefficients = np.empty((0, 0), dtype=np.float32)
+        self.intercepts = np.empty(0, dtype=np.float32)
+
+    def setup(self, train_news: TrainData | None = None) -> None:
+        """Setup the classifier.
+
+        Args:
+            train_news: The training data to use for classification.
+        """
+        y, x = self.read_train_data(train_news)
+
+        self.labels = sorted(set(y))
+        if len(self.labels) < 2:  # noqa: PLR2004
+            self.coefficients = np.zeros((len(self.labels), x.shape[1]), dtype=np.float32)
+            self.intercepts = np.zeros(len(self.labels), dtype=np.float32)
+            return
+
+        classifier = LogisticRegression(C=self.regularization, max_iter=1000).fit(x, y)
+        coefficients, intercepts = self.to_multinomial(classifier.coef_, classifier.intercept_)
+        temperature = self.fit_temperature(x, y)
+        self.coefficients = (coefficients / temperature).astype(np.float32)
+        self.intercepts = (intercepts / temperature).astype(np.float32)
+
+    def fit_temperature(self, x: NDArray[np.float32], y: list[str]) -> float:
+        """Fit the temperature minimizing the log loss of the cross-validated logits.
+
+        Note:
+            Only the news of the labels with at least `n_folds` examples are split in folds. The
+            news of the rarer labels are in every training fold, so that every fold model knows
+            all the labels, and the temperature is fitted on the held-out logits of the others.
+
+        Args:
+            x: The embeddings matrix of the training news.
+            y: The label of each training news.
 
         Returns:
-            list[tuple[Rubric, float]]: A list of tuples containing the Rubric and the classification score.
+            The temperature dividing the logits, 1 if no label has enough news to cross-validate.
+        """
+        labels = np.asarray(y)
+        label_counts = Counter(y)
+        is_frequent = np.array([label_counts[label] >= self.n_folds for label in y], dtype=bool)
+        if self.n_folds < 2 or not is_frequent.any():  # noqa: PLR2004
+            logging.warning(
+                "No label has %s news to cross-validate, the %s is not calibrated.",
+                self.n_folds,
+                type(self).__name__,
+            )
+            return 1.0
+
+        frequent_indexes = np.flatnonzero(is_frequent)
+        rare_indexes = np.flatnonzero(~is_frequent)
+        held_out_indexes: list[NDArray[np.intp]] = []
+        held_out_decisions: list[NDArray[np.float64]] = []
+        folds = StratifiedKFold(n_splits=self.n_folds, shuffle=True, random_state=42)
+        for train_folds, test_folds in folds.split(frequent_indexes, labels[frequent_indexes]):
+            train_indexes = np.concatenate([frequent_indexes[train_folds], rare_indexes])
+            test_indexes = frequent_indexes[test_folds]
+            model = LogisticRegression(C=self.regularization, max_iter=1000).fit(
+                x[train_indexes], labels[train_indexes]
+            )
+            held_out_indexes.append(test_indexes)
+            held_out_decisions.append(model.decision_function(x[test_indexes]))
+        decisions = np.concatenate(held_out_decisions)
+        logits = decisions if decisions.ndim == 2 else np.outer(decisions, [-0.5, 0.5])  # noqa: PLR2004
+        label_indexes = np.searchsorted(self.labels, labels[np.concatenate(held_out_indexes)])
+
+        def log_loss(log_temperature: float) -> float:
+            log_probs = log_softmax(logits / np.exp(log_temperature), axis=1)
+            return float(-log_probs[np.arange(len(label_indexes)), label_indexes].mean())
+
+        result = minimize_scalar(log_loss, bounds=(-3.0, 3.0), method="bounded")
+        return float(np.exp(result.x))
+
+    @staticmethod
+    def to_multinomial(
+        coefficients: NDArray[np.float64], intercepts: NDArray[np.float64]
+    ) -> tuple[NDArray[np.float64], NDArray[np.float64]]:
+        """Get one row of coefficients per label, even for the single row of a binary problem.
+
+        Args:
+            coefficients: The fitted coefficients.
+            intercepts: The fitted intercepts.
+
+        Returns:
+            The coefficients and intercepts whose softmax gives the probabilities of the labels.
         """
-        query = Vectorstore.create_query(news, vector_name=self.vector_name)
-        if embedding is None:
-            embedding = await self.vectorstore.embedding_model.embed(text_description=query)
+        if coefficients.shape[0] > 1:
+            return coefficients, intercepts
+        # The softmax of (-z / 2, z / 2) is the sigmoid of z.
+        return np.vstack([-coefficients / 2, coefficients / 2]), np.hstack([
+            -intercepts / 2,
+            intercepts / 2,
+        ])
 
-        probs = self.classifier.predict_proba([embedding])
+    def predict_score_matrix(self, embeddings: NDArray[np.float32]) -> NDArray[np.float64]:
+        """Compute the calibrated logits of each label for all the embeddings at once.
 
-        label_probs = dict(zip(self.labels, probs[0], strict=True))
+        Args:
+            embeddings: The embeddings matrix, one row per news.
 
-        return label_probs
+        Returns:
+            The logits matrix, one row per news and one column per label. Their softmax gives the
+            calibrated probabilities.
+        """
+        logits: NDArray[np.float64] = (embeddings @ self.coefficients.T + self.intercepts).astype(
+            np.float64
+        )
+        return logits
@@ -0,0 +1,130 @@
+"""Persistent store of the fitted state of the news classifiers."""
+
+import hashlib
+import json
+import logging
+import pickle  # noqa: S403
+import tempfile
+from pathlib import Path
+from typing import Any
+
+from cpeq_infolettre_automatique.config import ClassifierArtifactConfig
+
+
+ARTIFACT_FORMAT_VERSION = 2
+
+
+class ClassifierArtifactStore:
+    """Store of fitted classifiers, keyed by their type, configuration and training collection.
+
+    Note:
+        An artifact is the pickled fitted state of a classifier. Its key changes with the classifier
+        type and arguments, the named vector and the fingerprint of the collection, so a stale
+        artifact is never loaded and the classifier is trained again. Saving an artifact removes
+        the artifacts of the same classifier trained on a previous state of the collection.
+        Artifacts are written by the application itself and must not come from an untrusted source.
+    """
+
+    def __init__(self, classifier_artifact_config: ClassifierArtifactConfig) -> None:
+        """Initialize the store.
+
+        Args:
+            classifier_artifact_config: The classifier artifact configuration.
+        """
+        self.classifier_artifact_config = classifier_artifact_config
+
+    @staticmethod
+    def key(
+        classifier_type: str,
+        classifier_kwargs: dict[str, Any],
+        vector_name: str,
+        collection_fingerprint: str,
+    ) -> str:
+        """Compute the key of an artifact.
+
+        Args:
+            classifier_type: The type of the classifier.
+            classifier_kwargs: The arguments of the classifier.
+            vector_name: The named vector the classifier is trained on.
+            collection_fingerprint: The fingerprint of the training collection.
+
+        Returns:
+            The key of the artifact, made of the classifier type, the hash of the classifier
+            configuration and the hash of the collection fingerprint.
+        """
+        description = json.dumps(
+            {
+                "version": ARTIFACT_FORMAT_VERSION,
+                "classifier_type": classifier_type,
+                "classifier_kwargs": classifier_kwargs,
+                "vector_name": vector_name,
+            },
+            sort_keys=True,
+            default=str,
+        )
+        description_hash = hashlib.sha256(description.encode("utf-8")).hexdigest()[:16]
+        fingerprint_hash = hashlib.sha256(collection_fingerprint.encode("utf-8")).hexdigest()[:16]
+        return f"{classifier_type}-{description_hash}-{fingerprint_hash}"
+
+    def path(self, key: str) -> Path:
+        """Get the path of an artifact.
+
+        Args:
+            key: The key of the artifact.
+
+        Returns:
+            The path of the artifact.
+        """
+        return Path(self.classifier_artifact_config.directory, f"{key}.pkl")
+
+    def load(self, key: str) -> dict[str, Any] | None:
+        """Load the fitted state of a classifier.
+
+        Args:
+            key: The key of the artifact.
+
+        Returns:
+            The fitted state, or None if there is no artifact for the key.
+        """
+        path = self.path(key)
+        if not path.exists():
+            return None
+        try:
+            with path.open("rb") as file:
+                state: dict[str, Any] = pickle.load(file)  # noqa: S301
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            logging.exception("The classifier artifact %s cannot be loaded, it is ignored.", path)
+            return None
+        return state
+
+    def save(self, key: str, state: dict[str, Any]) -> None:
+        """Save the fitted state of a classifier, and remove its superseded artifacts.
+
+        Args:
+            key: The key of the artifact.
+            state: The fitted state.
+        """
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path: Path | None = None
+        try:
+            with tempfile.NamedTemporaryFile(
+                dir=path.parent, prefix=f"{path.stem}.", suffix=".tmp", delete=False
+            ) as file:
+                temporary_path = Path(file.name)
+                pickle.dump(state, file, protocol=pickle.HIGHEST_PROTOCOL)
+            temporary_path.replace(path)
+        finally:
+            if temporary_path is not None:
+                temporary_path.unlink(missing_ok=True)
+
+        classifier_key = key.rsplit("-", 1)[0]
+        for superseded_path in path.parent.glob(f"{classifier_key}-*.pkl"):
+            if superseded_path != path:
+                logging.info("Removing the superseded classifier artifact %s.", superseded_path)
+                superseded_path.unlink(missing_ok=True)
+
+    def clear(self) -> None:
+        """Remove all the artifacts, so that the classifiers are trained again."""
+        for path in Path(self.classifier_artifact_config.directory).glob("*.pkl"):
+            path.unlink(missing_ok=True)
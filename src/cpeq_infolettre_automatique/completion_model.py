@@ -1,7 +1,7 @@
 """Completion Models implementation."""
 
 from abc import ABC, abstractmethod
-from typing import Literal
+from typing import Any, Literal
 
 from openai import AsyncOpenAI
 from openai.types.chat import (
@@ -38,6 +38,16 @@ class CompletionModel(ABC):
     async def complete_message(self, user_message: str, system_prompt: str | None) -> str:
         """Predict the completion for the given data."""
 
+    @abstractmethod
+    async def complete_structured_message(
+        self,
+        user_message: str,
+        system_prompt: str | None,
+        response_schema: dict[str, Any],
+        schema_name: str,
+    ) -> str:
+        """Predict a completion for the given data that follows the given JSON schema."""
+
 
 class OpenAICompletionModel(CompletionModel):
     """OpenAI completion model implementation."""
@@ -67,15 +77,47 @@ class OpenAICompletionModel(CompletionModel):
         Raises:
             ValueError: If the completion model returns an empty response.
         """
-        messages: list[ChatCompletionMessageParam] = []
-        if system_prompt is not None:
-            messages.append(ChatCompletionSystemMessageParam(role="system", content=system_prompt))
-        messages.append(ChatCompletionUserMessageParam(role="user", content=user_message))
+        chat_response = await self.client.chat.completions.create(
+            messages=self.format_messages(user_message, system_prompt),
+            model=self.model,
+            temperature=self.temperature,
+        )
+
+        content: str | None = chat_response.choices[0].message.content
+        if content is None:
+            error_msg = "The completion model returned an empty response"
+            raise ValueError(error_msg)
+        return content
+
+    async def complete_structured_message(
+        self,
+        user_message: str,
+        system_prompt: str | None,
+        response_schema: dict[str, Any],
+        schema_name: str,
+    ) -> str:
+        """Predict a completion for the given data that follows the given JSON schema.
+
+        Args:
+            user_message: The user message to complete.
+            system_prompt: The system prompt to use for completion, optional.
+            response_schema: The JSON schema the completion must follow.
+            schema_name: The name of the JSON schema.
 
+        Returns:
+            The completion message, a JSON document following the schema.
+
+        Raises:
+            ValueError: If the completion model returns an empty response.
+        """
         chat_response = await self.client.chat.completions.create(
-            messages=messages,
+            messages=self.format_messages(user_message, system_prompt),
             model=self.model,
             temperature=self.temperature,
+            response_format={
+                "type": "json_schema",
+                "json_schema": {"name": schema_name, "schema": response_schema, "strict": True},
+            },
         )
 
         content: str | None = chat_response.choices[0].message.content
@@ -83,3 +125,22 @@ class OpenAICompletionModel(CompletionModel):
             error_msg = "The completion model returned an empty response"
             raise ValueError(error_msg)
         return content
+
+    @staticmethod
+    def format_messages(
+        user_message: str, system_prompt: str | None
+    ) -> list[ChatCompletionMessageParam]:
+        """Format the messages sent to the OpenAI API.
+
+        Args:
+            user_message: The user message to complete.
+            system_prompt: The system prompt to use for completion, optional.
+
+        Returns:
+            The list of messages.
+        """
+        messages: list[ChatCompletionMessageParam] = []
+        if system_prompt is not None:
+            messages.append(ChatCompletionSystemMessageParam(role="system", content=system_prompt))
+        messages.append(ChatCompletionUserMessageParam(role="user", content=user_message))
+        return messages
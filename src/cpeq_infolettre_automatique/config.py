@@ -20,6 +20,7 @@ ClassificationAlgos = Literal[
     "MaxPoolingNewsClassifier",
     "KnNewsClassifier",
     "RandomForestNewsClassifier",
+    "LogisticRegressionNewsClassifier",
 ]
 
 
@@ -90,6 +91,7 @@ class EmbeddingModelConfig(BaseModel):
     ] = "text-embedding-3-large"
     token_encoding: Literal["cl100k_base", "p50k_base", "r50k_base", "gpt2"] = "cl100k_base"
     max_tokens: Literal[8192] = 8192
+    cache_size: int = max(config("EMBEDDING_MODEL_CACHE_SIZE", 2048, cast=int), 0)
 
 
 class VectorstoreConfig(BaseModel):
@@ -108,6 +110,11 @@ class VectorstoreConfig(BaseModel):
     batch_size: int = max(config("BATCH_SIZE", 5, cast=int), 1)
     concurrent_requests: int = max(config("CONCURRENT_REQUESTS", 2, cast=int), 1)
     minimal_score: float = config("VECTORSTORE_MINIMUM_SCORE", 0.0, cast=float)
+    max_concurrent_queries: int = max(config("VECTORSTORE_MAX_CONCURRENT_QUERIES", 8, cast=int), 1)
+    backend: Literal["weaviate", "in_memory"] = config("VECTORSTORE_BACKEND", "weaviate", cast=str)
+    metadata_ttl_seconds: float = max(
+        config("VECTORSTORE_METADATA_TTL_SECONDS", 60.0, cast=float), 0.0
+    )
 
 
 class CompletionModelConfig(BaseModel):
@@ -118,7 +125,14 @@ class CompletionModelConfig(BaseModel):
 
 
 class NewsRelevancyClassifierConfig(BaseModel):
-    """Configuration for the news relevancy classifier."""
+    """Configuration for the news relevancy classifier.
+
+    Notes:
+        With a positive `cascade_margin`, the news are first classified by the cheap
+        `cascade_model_name` embedding classifier, and only the news whose relevance probability is
+        within `cascade_margin` of `threshold` are classified by `classification_model_name`, which
+        must be a different model.
+    """
 
     classification_model_name: ClassificationAlgos = config(
         "NEWS_RELEVANCY_CLASSIFIER_MODEL_NAME", "MaxPoolingNewsClassifier", cast=str
@@ -127,6 +141,29 @@ class NewsRelevancyClassifierConfig(BaseModel):
         "NEWS_RELEVANCY_CLASSIFIER_VECTOR_NAME", "title_content", cast=VectorNames
     )
     threshold: float = config("NEWS_RELEVANCY_CLASSIFIER_THRESHOLD", 0.50, cast=float)
+    cascade_model_name: ClassificationAlgos = config(
+        "NEWS_RELEVANCY_CLASSIFIER_CASCADE_MODEL_NAME",
+        "LogisticRegressionNewsClassifier",
+        cast=str,
+    )
+    cascade_margin: float = max(
+        config("NEWS_RELEVANCY_CLASSIFIER_CASCADE_MARGIN", 0.0, cast=float), 0.0
+    )
+
+
+class LexicalFilterConfig(BaseModel):
+    """Configuration for the lexical filter of the scraped news, applied before any embedding.
+
+    Notes:
+        The minimal score of a kept news is chosen so that a fraction `recall_target` of the
+        relevant reference news are kept, according to `nb_folds`-fold cross-validated scores.
+    """
+
+    enabled: bool = config("LEXICAL_FILTER_ENABLED", default=False, cast=bool)
+    recall_target: float = min(
+        max(config("LEXICAL_FILTER_RECALL_TARGET", 0.99, cast=float), 0.0), 1.0
+    )
+    nb_folds: int = max(config("LEXICAL_FILTER_NB_FOLDS", 5, cast=int), 2)
 
 
 class NewsRubricClassifierConfig(BaseModel):
@@ -140,9 +177,104 @@ class NewsRubricClassifierConfig(BaseModel):
     )
 
 
+class KnClassifierConfig(BaseModel):
+    """Configuration for the index of the K-Nearest Neighbors classifiers.
+
+    Notes:
+        With `n_lists` at 0, the search is exact up to `exact_search_max_size` reference news, and
+        the index has the square root of the number of reference news as lists above.
+    """
+
+    n_lists: int | None = max(config("KN_CLASSIFIER_N_LISTS", 0, cast=int), 0) or None
+    n_probes: int = max(config("KN_CLASSIFIER_N_PROBES", 8, cast=int), 1)
+    exact_search_max_size: int = max(
+        config("KN_CLASSIFIER_EXACT_SEARCH_MAX_SIZE", 10000, cast=int), 0
+    )
+
+
 class SummaryGeneratorConfig(BaseModel):
     """Configuration for the summary generator."""
 
     vector_name: VectorNames = config(
         "SUMMARY_GENERATOR_VECTOR_NAME", "title_content", cast=VectorNames
     )
+    batch_size: int = max(config("SUMMARY_GENERATOR_BATCH_SIZE", 8, cast=int), 1)
+
+
+class NewsClustererConfig(BaseModel):
+    """Configuration for the clustering of news covering the same story."""
+
+    vector_name: VectorNames = config(
+        "NEWS_CLUSTERER_VECTOR_NAME", "title_content", cast=VectorNames
+    )
+    similarity_threshold: float = config("NEWS_CLUSTERER_SIMILARITY_THRESHOLD", 0.92, cast=float)
+
+
+class NewsProducerConfig(BaseModel):
+    """Configuration for the news producer.
+
+    Notes:
+        News whose content is at most `extractive_summary_max_tokens` tokens long are not sent to
+        the completion model: their cleaned content is used as summary. Set to 0 to always use the
+        completion model.
+    """
+
+    extractive_summary_max_tokens: int = max(
+        config("NEWS_PRODUCER_EXTRACTIVE_SUMMARY_MAX_TOKENS", 120, cast=int), 0
+    )
+    token_encoding: Literal["cl100k_base", "p50k_base", "r50k_base", "gpt2"] = "cl100k_base"
+
+
+class NewsCacheConfig(BaseModel):
+    """Configuration for the cache of produced news."""
+
+    path: str = config("NEWS_CACHE_PATH", "data/news_cache.sqlite3", cast=str)
+    max_age_days: int = max(config("NEWS_CACHE_MAX_AGE_DAYS", 90, cast=int), 1)
+    max_entries: int = max(config("NEWS_CACHE_MAX_ENTRIES", 10000, cast=int), 1)
+
+
+class PublishedNewsIndexConfig(BaseModel):
+    """Configuration for the near-duplicate index of previously published news.
+
+    Notes:
+        The MinHash signatures have `nb_permutations` values, split into `nb_bands` LSH bands.
+        `nb_permutations` must be a multiple of `nb_bands`.
+    """
+
+    path: str = config("PUBLISHED_NEWS_INDEX_PATH", "data/published_news_index.npz", cast=str)
+    nb_permutations: int = config("PUBLISHED_NEWS_INDEX_NB_PERMUTATIONS", 128, cast=int)
+    nb_bands: int = config("PUBLISHED_NEWS_INDEX_NB_BANDS", 32, cast=int)
+    shingle_size: int = max(config("PUBLISHED_NEWS_INDEX_SHINGLE_SIZE", 3, cast=int), 1)
+    similarity_threshold: float = config(
+        "PUBLISHED_NEWS_INDEX_SIMILARITY_THRESHOLD", 0.8, cast=float
+    )
+
+
+class SourcePriorsConfig(BaseModel):
+    """Configuration for the relevance rates of the news sources.
+
+    Notes:
+        A source prefix is the domain of a link followed by at most `max_depth` path segments. The
+        rate of the domain alone is only used when `domain_fallback` is enabled, so that the unseen
+        sections of a general domain are not skipped.
+    """
+
+    enabled: bool = config("SOURCE_PRIORS_ENABLED", default=False, cast=bool)
+    path: str = config("SOURCE_PRIORS_PATH", "data/source_priors.sqlite3", cast=str)
+    max_depth: int = max(config("SOURCE_PRIORS_MAX_DEPTH", 2, cast=int), 0)
+    min_observations: int = max(config("SOURCE_PRIORS_MIN_OBSERVATIONS", 20, cast=int), 1)
+    max_relevance_rate: float = config("SOURCE_PRIORS_MAX_RELEVANCE_RATE", 0.02, cast=float)
+    audit_rate: float = min(max(config("SOURCE_PRIORS_AUDIT_RATE", 0.1, cast=float), 0.0), 1.0)
+    domain_fallback: bool = config("SOURCE_PRIORS_DOMAIN_FALLBACK", default=False, cast=bool)
+
+
+class VectorSnapshotConfig(BaseModel):
+    """Configuration for the snapshots of the reference vectors."""
+
+    directory: str = config("VECTOR_SNAPSHOT_DIRECTORY", "data/vector_snapshots", cast=str)
+
+
+class ClassifierArtifactConfig(BaseModel):
+    """Configuration for the store of fitted classifiers."""
+
+    directory: str = config("CLASSIFIER_ARTIFACT_DIRECTORY", "data/classifier_artifacts", cast=str)
@@ -0,0 +1,157 @@
+"""Cross-validation of the embedding classifiers in a process pool."""
+
+import multiprocessing
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Literal, NamedTuple
+
+import numpy as np
+from numpy.typing import NDArray
+from scipy.special import softmax
+from sklearn.model_selection import BaseCrossValidator, KFold, LeaveOneOut, StratifiedKFold
+
+from cpeq_infolettre_automatique.classification_algo import EmbeddingNewsClassifier, TrainData
+from cpeq_infolettre_automatique.config import VectorNames
+
+
+class ClassifierConfig(NamedTuple):
+    """An EmbeddingNewsClassifier type and its parameters, sent to the cross-validation workers."""
+
+    classifier_type: type[EmbeddingNewsClassifier]
+    parameters: dict[str, Any]
+
+
+Splitter = Literal["k-fold", "stratified-k-fold", "leave-one-out"]
+
+
+# The reference dataset of a cross-validation worker process, set by `attach_reference_dataset`.
+WORKER_DATASET: dict[str, Any] = {}
+
+
+def create_splitter(splitter: Splitter, nb_folds: int) -> BaseCrossValidator:
+    """Create the cross-validation splitter.
+
+    Args:
+        splitter: The kind of splitter.
+        nb_folds: The number of folds, ignored by the leave-one-out splitter.
+
+    Returns:
+        The splitter, shuffling the news with a fixed seed.
+    """
+    if splitter == "leave-one-out":
+        return LeaveOneOut()
+    if splitter == "k-fold":
+        return KFold(n_splits=nb_folds, shuffle=True, random_state=42)
+    return StratifiedKFold(n_splits=nb_folds, shuffle=True, random_state=42)
+
+
+def attach_reference_dataset(vectors_path: Path, labels: list[str]) -> None:
+    """Open the reference vectors matrix of a worker process, shared through the page cache.
+
+    Args:
+        vectors_path: The path of the `.npy` reference vectors matrix.
+        labels: The label of each reference news.
+    """
+    WORKER_DATASET["vectors"] = np.load(vectors_path, mmap_mode="r", allow_pickle=False)
+    WORKER_DATASET["labels"] = np.asarray(labels)
+
+
+def evaluate_fold(
+    classifier_config: ClassifierConfig,
+    vector_name: VectorNames,
+    test_indexes: NDArray[np.intp],
+) -> tuple[list[str], NDArray[np.float64]]:
+    """Fit a classifier on the news outside a fold and predict the probabilities of the fold.
+
+    Note:
+        The training news are selected with a mask over the reference vectors matrix of the
+        worker. The classifier has no vectorstore, its training data and embeddings being given.
+
+    Args:
+        classifier_config: The classifier to fit.
+        vector_name: The named vector of the reference vectors.
+        test_indexes: The positions of the news of the fold.
+
+    Returns:
+        The labels of the fitted classifier, and the probabilities of each news of the fold, one
+        column per label.
+    """
+    vectors: NDArray[np.float32] = WORKER_DATASET["vectors"]
+    labels: NDArray[np.str_] = WORKER_DATASET["labels"]
+    train_mask = np.ones(len(labels), dtype=bool)
+    train_mask[test_indexes] = False
+    classifier = classifier_config.classifier_type(
+        None, vector_name=vector_name, **classifier_config.parameters
+    )
+    classifier.setup((labels[train_mask].tolist(), vectors[train_mask]))
+    probs: NDArray[np.float64] = softmax(
+        classifier.predict_score_matrix(vectors[test_indexes]), axis=1
+    )
+    return classifier.labels, probs
+
+
+def cross_validate(
+    classifier_configs: list[ClassifierConfig],
+    vector_name: VectorNames,
+    train_data: TrainData,
+    *,
+    splitter: Splitter = "stratified-k-fold",
+    nb_folds: int = 5,
+    max_workers: int | None = None,
+) -> list[list[dict[str, float]]]:
+    """Predict the probabilities of each news with each classifier fitted outside its fold.
+
+    Note:
+        The folds of all the classifiers are evaluated in a process pool. The vectors matrix is
+        saved once and memory-mapped by the workers, so that it is neither pickled for each fold
+        nor copied in each process.
+
+    Args:
+        classifier_configs: The classifiers to cross-validate.
+        vector_name: The named vector of the training data.
+        train_data: The label and the embedding of each news.
+        splitter: The kind of splitter.
+        nb_folds: The number of folds, ignored by the leave-one-out splitter.
+        max_workers: The number of worker processes. The number of processors if None.
+
+    Returns:
+        For each classifier, the probabilities of each news, sorted by decreasing probability.
+    """
+    labels, vectors = train_data
+    folds = [
+        test_indexes
+        for _, test_indexes in create_splitter(splitter, nb_folds).split(vectors, labels)
+    ]
+    predicted_probs: list[list[dict[str, float]]] = [
+        [{} for _ in labels] for _ in classifier_configs
+    ]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        vectors_path = Path(tmp_dir, "vectors.npy")
+        np.save(vectors_path, np.asarray(vectors, dtype=np.float32))
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=attach_reference_dataset,
+            initargs=(vectors_path, labels),
+        ) as executor:
+            futures = {
+                executor.submit(evaluate_fold, classifier_config, vector_name, test_indexes): (
+                    i,
+                    test_indexes,
+                )
+                for i, classifier_config in enumerate(classifier_configs)
+                for test_indexes in folds
+            }
+            for future in as_completed(futures):
+                i, test_indexes = futures[future]
+                fold_labels, fold_probs = future.result()
+                for position, probs in zip(test_indexes, fold_probs.tolist(), strict=True):
+                    predicted_probs[i][position] = dict(
+                        sorted(
+                            zip(fold_labels, probs, strict=True),
+                            key=lambda label_prob: label_prob[1],
+                            reverse=True,
+                        )
+                    )
+    return predicted_probs
@@ -1,7 +1,9 @@
 """Depencies injection functions for the Service class."""
 
+import threading
 from collections.abc import Iterator
-from typing import Annotated, Any, cast
+from concurrent.futures import ThreadPoolExecutor
+from typing import Annotated, Any, NamedTuple, cast
 
 import httpx
 import weaviate
@@ -12,41 +14,65 @@ from O365.drive import Folder
 from openai import AsyncOpenAI
 
 from cpeq_infolettre_automatique.classification_algo import (
+    EmbeddingNewsClassifier,
     KnNewsClassifier,
+    LogisticRegressionNewsClassifier,
     MaxMeanScoresNewsClassifier,
     MaxPoolingNewsClassifier,
     MaxScoreNewsClassifier,
     NewsClassifier,
     RandomForestNewsClassifier,
+    TrainData,
 )
+from cpeq_infolettre_automatique.classifier_artifacts import ClassifierArtifactStore
 from cpeq_infolettre_automatique.completion_model import (
     CompletionModel,
     OpenAICompletionModel,
 )
 from cpeq_infolettre_automatique.config import (
     ClassificationAlgos,
+    ClassifierArtifactConfig,
     CompletionModelConfig,
     EmbeddingModelConfig,
+    KnClassifierConfig,
+    LexicalFilterConfig,
+    NewsCacheConfig,
+    NewsClustererConfig,
+    NewsProducerConfig,
     NewsRelevancyClassifierConfig,
     NewsRubricClassifierConfig,
     OneDriveConfig,
+    PublishedNewsIndexConfig,
+    SourcePriorsConfig,
     SummaryGeneratorConfig,
     VectorNames,
+    VectorSnapshotConfig,
     VectorstoreConfig,
 )
 from cpeq_infolettre_automatique.embedding_model import (
     EmbeddingModel,
     OpenAIEmbeddingModel,
 )
+from cpeq_infolettre_automatique.in_memory_vectorstore import (
+    HybridSearchIndex,
+    InMemoryVectorstore,
+)
+from cpeq_infolettre_automatique.lexical_filter import LexicalRelevancyFilter
+from cpeq_infolettre_automatique.news_cache import NewsCache
 from cpeq_infolettre_automatique.news_classifier import (
+    CascadeNewsRelevancyClassifier,
     NewsRelevancyClassifier,
     NewsRubricClassifier,
 )
+from cpeq_infolettre_automatique.news_clusterer import NewsClusterer
 from cpeq_infolettre_automatique.news_producer import NewsProducer
+from cpeq_infolettre_automatique.published_news_index import PublishedNewsIndex
 from cpeq_infolettre_automatique.repositories import NewsRepository, OneDriveNewsRepository
 from cpeq_infolettre_automatique.service import Service
+from cpeq_infolettre_automatique.source_priors import SourcePriors
 from cpeq_infolettre_automatique.summary_generator import SummaryGenerator
 from cpeq_infolettre_automatique.utils import get_or_create_subfolder, prepare_dates
+from cpeq_infolettre_automatique.vector_snapshot import VectorSnapshotStore
 from cpeq_infolettre_automatique.vectorstore import Vectorstore
 from cpeq_infolettre_automatique.webscraper_io_client import WebscraperIoClient
 
@@ -205,6 +231,264 @@ class VectorstoreClientDependency(ApiDependency):
         cls.vectorstore_client.close()
 
 
+class EmbeddingModelDependency(ApiDependency):
+    """Dependency class for the Singleton embedding model, shared so that its cache is shared."""
+
+    openai_client: AsyncOpenAI
+    embedding_model: EmbeddingModel
+
+    @classmethod
+    def setup(cls) -> None:
+        """Setup dependency."""
+        cls.openai_client = get_openai_client()
+        cls.embedding_model = get_embedding_model(cls.openai_client)
+
+    def __call__(self) -> EmbeddingModel:
+        """Calls the dependency.
+
+        Returns:
+            The embedding model.
+        """
+        return self.embedding_model
+
+    @classmethod
+    async def teardown(cls) -> None:
+        """Free resources held by the class."""
+        await cls.openai_client.close()
+
+
+class VectorstoreExecutorDependency(ApiDependency):
+    """Dependency class for the Singleton thread pool running the blocking Vectorstore queries."""
+
+    executor: ThreadPoolExecutor
+
+    @classmethod
+    def setup(cls) -> None:
+        """Setup dependency."""
+        cls.executor = ThreadPoolExecutor(
+            max_workers=VectorstoreConfig().max_concurrent_queries,
+            thread_name_prefix="vectorstore",
+        )
+
+    def __call__(self) -> ThreadPoolExecutor:
+        """Calls the dependency.
+
+        Returns:
+            The Vectorstore thread pool.
+        """
+        return self.executor
+
+    @classmethod
+    def teardown(cls) -> None:
+        """Free resources held by the class."""
+        cls.executor.shutdown(wait=True, cancel_futures=True)
+
+
+class NewsCacheDependency(ApiDependency):
+    """Dependency class for the Singleton cache of produced news."""
+
+    news_cache: NewsCache
+
+    @classmethod
+    def setup(cls) -> None:
+        """Setup dependency."""
+        cls.news_cache = NewsCache(NewsCacheConfig())
+        cls.news_cache.setup()
+
+    def __call__(self) -> NewsCache:
+        """Calls the dependency.
+
+        Returns:
+            The cache of produced news.
+        """
+        return self.news_cache
+
+    @classmethod
+    def teardown(cls) -> None:
+        """Free resources held by the class."""
+        cls.news_cache.teardown()
+
+
+class PublishedNewsIndexDependency(ApiDependency):
+    """Dependency class for the Singleton index of previously published news."""
+
+    published_news_index: PublishedNewsIndex
+
+    @classmethod
+    def setup(cls) -> None:
+        """Setup dependency."""
+        cls.published_news_index = PublishedNewsIndex(PublishedNewsIndexConfig())
+        cls.published_news_index.setup()
+
+    def __call__(self) -> PublishedNewsIndex:
+        """Calls the dependency.
+
+        Returns:
+            The index of previously published news.
+        """
+        return self.published_news_index
+
+    @classmethod
+    def teardown(cls) -> None:
+        """Free resources held by the class."""
+        cls.published_news_index.save()
+
+
+class SourcePriorsDependency(ApiDependency):
+    """Dependency class for the Singleton relevance rates of the news sources."""
+
+    source_priors: SourcePriors
+
+    @classmethod
+    def setup(cls) -> None:
+        """Setup dependency."""
+        cls.source_priors = SourcePriors(SourcePriorsConfig())
+        cls.source_priors.setup()
+
+    def __call__(self) -> SourcePriors:
+        """Calls the dependency.
+
+        Returns:
+            The relevance rates of the news sources.
+        """
+        return self.source_priors
+
+    @classmethod
+    def teardown(cls) -> None:
+        """Free resources held by the class."""
+        cls.source_priors.teardown()
+
+
+class NewsClassifiers(NamedTuple):
+    """The hybrid search index and the news classifiers fitted on it, swapped together on reload."""
+
+    hybrid_search_index: HybridSearchIndex | None
+    news_rubric_classifier: NewsRubricClassifier
+    news_relevancy_classifier: NewsRelevancyClassifier
+    lexical_filter: LexicalRelevancyFilter | None
+
+
+class NewsClassifiersDependency(ApiDependency):
+    """Dependency class for the Singleton hybrid search index and fitted news classifiers.
+
+    Note:
+        The index is only loaded when the `in_memory` Vectorstore backend is configured. The
+        classifiers are fitted, or loaded from their artifacts, once at startup. Must be set up
+        after the Vectorstore and embedding model dependencies. `reload` builds a new index and
+        fits the classifiers on it, then swaps both with a single assignment, the requests in
+        progress keeping the previous ones. If fitting fails, the previous index and classifiers
+        are kept.
+    """
+
+    news_classifiers: NewsClassifiers
+    reload_lock = threading.Lock()
+
+    @classmethod
+    def setup(cls) -> None:
+        """Setup dependency."""
+        cls.news_classifiers = cls.create_news_classifiers(cls.create_hybrid_search_index())
+
+    @classmethod
+    def reload(cls) -> None:
+        """Reload the hybrid search index and the classifiers after the reference collection changed.
+
+        Note:
+            The vector snapshots and the classifier artifacts are removed first, so the classifiers
+            are fitted on the reference collection read again. The lock only prevents concurrent
+            reloads, the readers never wait for it.
+        """
+        with cls.reload_lock:
+            VectorSnapshotStore(VectorSnapshotConfig()).remove(VectorstoreConfig().collection_name)
+            ClassifierArtifactStore(ClassifierArtifactConfig()).clear()
+            cls.news_classifiers = cls.create_news_classifiers(cls.create_hybrid_search_index())
+
+    @staticmethod
+    def create_hybrid_search_index() -> HybridSearchIndex | None:
+        """Load the reference collection in a new index.
+
+        Returns:
+            The index of the reference news, or None if the Weaviate backend is configured.
+        """
+        vectorstore_config = VectorstoreConfig()
+        if vectorstore_config.backend != "in_memory":
+            return None
+        collection = VectorstoreClientDependency.vectorstore_client.collections.get(
+            vectorstore_config.collection_name
+        )
+        return HybridSearchIndex.from_collection(collection)
+
+    @staticmethod
+    def create_news_classifiers(hybrid_search_index: HybridSearchIndex | None) -> NewsClassifiers:
+        """Create the classifiers on an application-wide Vectorstore.
+
+        Args:
+            hybrid_search_index: The index of the reference news the classifiers search, or None
+                if the Weaviate backend is configured.
+
+        Returns:
+            The fitted news classifiers.
+        """
+        vectorstore = get_vectorstore(
+            vectorstore_client=VectorstoreClientDependency.vectorstore_client,
+            embedding_model=EmbeddingModelDependency.embedding_model,
+            executor=VectorstoreExecutorDependency.executor,
+            hybrid_search_index=hybrid_search_index,
+        )
+        # Both classifiers read the vectors of a single pass over the collection.
+        news_classifiers = NewsClassifiers(
+            hybrid_search_index=hybrid_search_index,
+            news_rubric_classifier=get_news_rubric_classifier(vectorstore),
+            news_relevancy_classifier=get_news_relevancy_classifier(vectorstore),
+            lexical_filter=get_lexical_filter(vectorstore),
+        )
+        vectorstore.invalidate_collection_metadata()
+        return news_classifiers
+
+    def __call__(self) -> NewsClassifiers:
+        """Calls the dependency.
+
+        Returns:
+            The fitted news classifiers.
+        """
+        return self.news_classifiers
+
+    @classmethod
+    def get_hybrid_search_index(cls) -> HybridSearchIndex | None:
+        """Get the hybrid search index the classifiers were fitted on.
+
+        Returns:
+            The index of the reference news, or None if the Weaviate backend is configured.
+        """
+        return cls.news_classifiers.hybrid_search_index
+
+    @classmethod
+    def get_rubric_classifier(cls) -> NewsRubricClassifier:
+        """Get the fitted NewsRubricClassifier.
+
+        Returns:
+            The NewsRubricClassifier.
+        """
+        return cls.news_classifiers.news_rubric_classifier
+
+    @classmethod
+    def get_relevancy_classifier(cls) -> NewsRelevancyClassifier:
+        """Get the fitted NewsRelevancyClassifier.
+
+        Returns:
+            The NewsRelevancyClassifier.
+        """
+        return cls.news_classifiers.news_relevancy_classifier
+
+    @classmethod
+    def get_lexical_filter(cls) -> LexicalRelevancyFilter | None:
+        """Get the fitted LexicalRelevancyFilter.
+
+        Returns:
+            The LexicalRelevancyFilter, or None if the lexical filter is disabled.
+        """
+        return cls.news_classifiers.lexical_filter
+
+
 def get_webscraperio_client(
     http_client: Annotated[httpx.AsyncClient, Depends(HttpClientDependency())],
 ) -> WebscraperIoClient:
@@ -274,18 +558,32 @@ def get_vectorstore_client() -> Iterator[weaviate.WeaviateClient]:
 
 def get_vectorstore(
     vectorstore_client: Annotated[weaviate.WeaviateClient, Depends(VectorstoreClientDependency())],
-    embedding_model: Annotated[EmbeddingModel, Depends(get_embedding_model)],
+    embedding_model: Annotated[EmbeddingModel, Depends(EmbeddingModelDependency())],
+    executor: Annotated[ThreadPoolExecutor, Depends(VectorstoreExecutorDependency())],
+    hybrid_search_index: Annotated[
+        HybridSearchIndex | None, Depends(NewsClassifiersDependency.get_hybrid_search_index)
+    ],
 ) -> Vectorstore:
     """Gets a Vectorstore instance.
 
     Returns:
-        A Vectorstore instance with the provided dependencies.
+        A Vectorstore instance with the provided dependencies, answering the queries in memory if
+        the hybrid search index is loaded.
     """
     vectorstore_config = VectorstoreConfig()
+    if hybrid_search_index is not None:
+        return InMemoryVectorstore(
+            embedding_model=embedding_model,
+            vectorstore_client=vectorstore_client,
+            vectorstore_config=vectorstore_config,
+            hybrid_search_index=hybrid_search_index,
+        )
     return Vectorstore(
         vectorstore_client=vectorstore_client,
         embedding_model=embedding_model,
         vectorstore_config=vectorstore_config,
+        executor=executor,
+        vector_snapshot_store=VectorSnapshotStore(VectorSnapshotConfig()),
     )
 
 
@@ -326,7 +624,8 @@ def create_news_classifier(
     vectorstore: Vectorstore,
     vector_name: VectorNames,
     classifier_type: ClassificationAlgos,
-    train_data: list[tuple[str, list[float]]] | None = None,
+    train_data: TrainData | None = None,
+    classifier_artifact_store: ClassifierArtifactStore | None = None,
     **kwargs: Any,
 ) -> NewsClassifier:
     """Create a NewsClassifier based on the classifier_type.
@@ -336,15 +635,11 @@ def create_news_classifier(
         vector_name: The name of the vector to use for classification.
         classifier_type: The type of classifier to create.
         train_data: The training data to use for classification.
+        classifier_artifact_store: The store of fitted classifiers. When training on the
+            vectorstore, the fitted classifier is loaded from the store if it is up to date, and
+            saved to the store otherwise.
         **kwargs: The arguments to pass to the classifier.
 
-    Notes:
-        Current implementation of news classifiers dependency retrains a new model
-        each API Call. It is not scallable nor robust, but as a tradeoff, it offers
-        simplicity and works as is, without external dependencies. (I.E. path pointing to weights and biases)
-
-        # TODO(Olivier Belhumeur): This will require more work when deployed to production.
-
     Returns:
         The NewsClassifier.
 
@@ -358,13 +653,33 @@ def create_news_classifier(
         "MaxPoolingNewsClassifier": MaxPoolingNewsClassifier,
         "KnNewsClassifier": KnNewsClassifier,
         "RandomForestNewsClassifier": RandomForestNewsClassifier,
+        "LogisticRegressionNewsClassifier": LogisticRegressionNewsClassifier,
     }
+    if classifier_type == "KnNewsClassifier":
+        kwargs = {**KnClassifierConfig().model_dump(), **kwargs}
     if classifier_type in model_dict:
         model = model_dict[classifier_type](vectorstore, vector_name=vector_name, **kwargs)
     else:
         error_msg = f"Unknown classifier type: {classifier_type}"
         raise ValueError(error_msg)
-    model.setup(train_data)
+    if train_data is not None or classifier_artifact_store is None:
+        model.setup(train_data)
+        return model
+
+    artifact_key = ClassifierArtifactStore.key(
+        classifier_type,
+        kwargs,
+        vector_name.value,
+        collection_fingerprint=(
+            f"{vectorstore.collection_name}-{vectorstore.get_collection_fingerprint()}"
+        ),
+    )
+    fitted_state = classifier_artifact_store.load(artifact_key)
+    if fitted_state is not None:
+        model.set_fitted_state(fitted_state)
+    else:
+        model.setup()
+        classifier_artifact_store.save(artifact_key, model.get_fitted_state())
     return model
 
 
@@ -381,6 +696,7 @@ def get_news_rubric_classifier(
         vectorstore=vectorstore,
         classifier_type=news_rubric_classifier_config.classification_model_name,
         vector_name=news_rubric_classifier_config.vector_name,
+        classifier_artifact_store=ClassifierArtifactStore(ClassifierArtifactConfig()),
     )
     return NewsRubricClassifier(model=news_classifier_model)
 
@@ -391,32 +707,101 @@ def get_news_relevancy_classifier(
     """Gets a NewsRelevancyClassifierConfig instance.
 
     Returns:
-        A NewsRelevancyClassifierConfig instance.
+        A NewsRelevancyClassifierConfig instance, cascading from a cheap embedding classifier if a
+        cascade margin is configured.
+
+    Raises:
+        ValueError: If the cascade model is the same as the main model.
+        TypeError: If the cascade model is not an embedding classifier.
     """
     news_relevancy_classifier_config = NewsRelevancyClassifierConfig()
+    if (
+        news_relevancy_classifier_config.cascade_margin > 0
+        and news_relevancy_classifier_config.cascade_model_name
+        == news_relevancy_classifier_config.classification_model_name
+    ):
+        error_msg = (
+            "The cascade model must differ from the main model, both are "
+            f"{news_relevancy_classifier_config.classification_model_name}."
+        )
+        raise ValueError(error_msg)
+    classifier_artifact_store = ClassifierArtifactStore(ClassifierArtifactConfig())
     news_classifier_model = create_news_classifier(
         vectorstore=vectorstore,
         classifier_type=news_relevancy_classifier_config.classification_model_name,
         vector_name=news_relevancy_classifier_config.vector_name,
+        classifier_artifact_store=classifier_artifact_store,
+    )
+    if news_relevancy_classifier_config.cascade_margin <= 0:
+        return NewsRelevancyClassifier(
+            model=news_classifier_model,
+            news_relevancy_classifier_config=news_relevancy_classifier_config,
+        )
+
+    cascade_model = create_news_classifier(
+        vectorstore=vectorstore,
+        classifier_type=news_relevancy_classifier_config.cascade_model_name,
+        vector_name=news_relevancy_classifier_config.vector_name,
+        classifier_artifact_store=classifier_artifact_store,
     )
-    return NewsRelevancyClassifier(
+    if not isinstance(cascade_model, EmbeddingNewsClassifier):
+        error_msg = f"The cascade model must be an embedding classifier, got {type(cascade_model).__name__}."
+        raise TypeError(error_msg)
+    return CascadeNewsRelevancyClassifier(
         model=news_classifier_model,
+        cascade_model=cascade_model,
         news_relevancy_classifier_config=news_relevancy_classifier_config,
     )
 
 
+def get_lexical_filter(vectorstore: Vectorstore) -> LexicalRelevancyFilter | None:
+    """Gets a LexicalRelevancyFilter fitted on the reference news.
+
+    Returns:
+        A LexicalRelevancyFilter instance, or None if the lexical filter is disabled.
+    """
+    lexical_filter_config = LexicalFilterConfig()
+    if not lexical_filter_config.enabled:
+        return None
+    # Same vectors as the relevancy classifier, so the reference news are already read.
+    reference_vectors = vectorstore.read_vectors(NewsRelevancyClassifierConfig().vector_name)
+    lexical_filter = LexicalRelevancyFilter(lexical_filter_config)
+    lexical_filter.fit(reference_vectors.to_news())
+    return lexical_filter
+
+
 def get_news_producer(
     summary_generator: Annotated[SummaryGenerator, Depends(get_summary_generator)],
-    news_rubric_classifier: Annotated[NewsRubricClassifier, Depends(get_news_rubric_classifier)],
+    news_rubric_classifier: Annotated[
+        NewsRubricClassifier, Depends(NewsClassifiersDependency.get_rubric_classifier)
+    ],
+    news_cache: Annotated[NewsCache, Depends(NewsCacheDependency())],
 ) -> NewsProducer:
     """Gets a NewsProducer instance.
 
     Returns:
         A NewsProducer instance.
     """
+    news_producer_config = NewsProducerConfig()
     return NewsProducer(
         summary_generator=summary_generator,
         news_rubric_classifier=news_rubric_classifier,
+        news_producer_config=news_producer_config,
+        news_cache=news_cache,
+    )
+
+
+def get_news_clusterer(
+    embedding_model: Annotated[EmbeddingModel, Depends(EmbeddingModelDependency())],
+) -> NewsClusterer:
+    """Gets a NewsClusterer instance.
+
+    Returns:
+        A NewsClusterer instance.
+    """
+    news_clusterer_config = NewsClustererConfig()
+    return NewsClusterer(
+        embedding_model=embedding_model, news_clusterer_config=news_clusterer_config
     )
 
 
@@ -424,9 +809,15 @@ def get_service(
     webscraper_io_client: Annotated[WebscraperIoClient, Depends(get_webscraperio_client)],
     news_repository: Annotated[NewsRepository, Depends(get_news_repository)],
     news_relevancy_classifier: Annotated[
-        NewsRelevancyClassifier, Depends(get_news_relevancy_classifier)
+        NewsRelevancyClassifier, Depends(NewsClassifiersDependency.get_relevancy_classifier)
     ],
     news_producer: Annotated[NewsProducer, Depends(get_news_producer)],
+    news_clusterer: Annotated[NewsClusterer, Depends(get_news_clusterer)],
+    published_news_index: Annotated[PublishedNewsIndex, Depends(PublishedNewsIndexDependency())],
+    lexical_filter: Annotated[
+        LexicalRelevancyFilter | None, Depends(NewsClassifiersDependency.get_lexical_filter)
+    ],
+    source_priors: Annotated[SourcePriors, Depends(SourcePriorsDependency())],
 ) -> Service:
     """Gets the Service instance.
 
@@ -441,4 +832,8 @@ def get_service(
         news_repository=news_repository,
         news_relevancy_classifier=news_relevancy_classifier,
         news_producer=news_producer,
+        news_clusterer=news_clusterer,
+        published_news_index=published_news_index,
+        lexical_filter=lexical_filter,
+        source_priors=source_priors,
     )
@@ -1,11 +1,26 @@
 """Contains the Embedding classes."""
 
+import asyncio
+import base64
+from collections import OrderedDict
+from collections.abc import Sequence
+from typing import cast
+
+import numpy as np
 import tiktoken
+from numpy.typing import NDArray
 from openai import AsyncOpenAI
 
 from cpeq_infolettre_automatique.config import EmbeddingModelConfig
 
 
+Embedding = NDArray[np.float32]
+"""An embedding vector, as a contiguous float32 array."""
+
+EmbeddingMatrix = NDArray[np.float32]
+"""The embeddings of many texts, as a contiguous float32 matrix with one row per text."""
+
+
 class EmbeddingModel:
     """Abstract base class for embedding models."""
 
@@ -32,7 +47,12 @@ class EmbeddingModel:
         """Get the maximum number of tokens."""
         return self.embedding_config.max_tokens
 
-    async def embed(self, text_description: str) -> list[float]:
+    @property
+    def cache_size(self) -> int:
+        """Get the maximum number of embeddings kept in memory."""
+        return self.embedding_config.cache_size
+
+    async def embed(self, text_description: str) -> Embedding:
         """Get the embedding of an image or text description.
 
         Args:
@@ -46,6 +66,20 @@ class EmbeddingModel:
         """
         raise NotImplementedError
 
+    async def embed_many(self, text_descriptions: Sequence[str]) -> EmbeddingMatrix:
+        """Get the embeddings of many text descriptions, embedding them concurrently.
+
+        Args:
+            text_descriptions: The text descriptions.
+
+        Returns:
+            The embeddings matrix, one row per text description.
+        """
+        embeddings = await asyncio.gather(*(self.embed(text) for text in text_descriptions))
+        if not embeddings:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.stack(embeddings).astype(np.float32, copy=False)
+
 
 class OpenAIEmbeddingModel(EmbeddingModel):
     """Embedding model using OpenAI's API."""
@@ -59,22 +93,40 @@ class OpenAIEmbeddingModel(EmbeddingModel):
         """
         super().__init__(embedding_model_config)
         self.client = client
+        self._cache: OrderedDict[str, Embedding] = OrderedDict()
 
-    async def embed(self, text_description: str) -> list[float]:
+    async def embed(self, text_description: str) -> Embedding:
         """Get the embedding of an image or text description.
 
+        Notes:
+            The `cache_size` most recently used embeddings are kept in memory, so that the same
+            text embedded by many components is sent only once to the API.
+
         Args:
             text_description: The text description.
 
         Returns:
-            The embedding.
+            The embedding. It is read-only, since it may be shared through the cache.
         """
-        text_description = self.truncate_text(text_description)
+        if text_description in self._cache:
+            self._cache.move_to_end(text_description)
+            return self._cache[text_description]
+
         response = await self.client.embeddings.create(
             model=self.embedding_model_id,
-            input=text_description,
+            input=self.truncate_text(text_description),
+            encoding_format="base64",
         )
-        embeddings = response.data[0].embedding
+        # With an explicit base64 encoding, the client returns the raw float32 bytes as a string
+        # instead of decoding them to a list of floats.
+        embeddings = np.frombuffer(
+            base64.b64decode(cast(str, response.data[0].embedding)), dtype=np.float32
+        )
+
+        if self.cache_size > 0:
+            self._cache[text_description] = embeddings
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
         return embeddings
 
     def truncate_text(self, text: str) -> str:
@@ -0,0 +1,504 @@
+"""In-process hybrid search over the reference news, loaded once from the vectorstore."""
+
+import logging
+import uuid
+from collections.abc import Sequence
+from typing import Self
+
+import numpy as np
+import weaviate
+from numpy.typing import NDArray
+from pydantic import ValidationError
+from scipy.sparse import csr_matrix
+from sklearn.feature_extraction.text import CountVectorizer
+
+from cpeq_infolettre_automatique.config import Rubric, VectorNames, VectorstoreConfig
+from cpeq_infolettre_automatique.embedding_model import (
+    Embedding,
+    EmbeddingMatrix,
+    EmbeddingModel,
+)
+from cpeq_infolettre_automatique.schemas import News
+from cpeq_infolettre_automatique.vectorstore import (
+    ReferenceNewsType,
+    ReferenceVectors,
+    SearchHits,
+    Vectorstore,
+)
+
+
+# Same as the `word` tokenization of Weaviate: alphanumeric sequences, lowercased.
+WORD_PATTERN = r"(?u)[^\W_]+"
+
+
+class HybridSearchIndex:
+    """Contiguous float32 matrices of the named vectors and BM25 index of the reference news.
+
+    Note:
+        The scores are fused like the `relativeScore` fusion of Weaviate: the vector (cosine
+        similarity) and keyword (BM25) scores of the `limit` best results of each search are
+        min-max normalized, then weighted by `alpha` and `1 - alpha`. The BM25 index covers the
+        title, content and summary of the news.
+    """
+
+    def __init__(
+        self,
+        ids: Sequence[str | uuid.UUID],
+        news: Sequence[News],
+        vectors: dict[VectorNames, NDArray[np.float32]],
+        k1: float = 1.2,
+        b: float = 0.75,
+    ) -> None:
+        """Build the index.
+
+        Args:
+            ids: The ids of the news.
+            news: The reference news.
+            vectors: The matrix of each named vector, one row per news.
+            k1: The BM25 term frequency saturation.
+            b: The BM25 length normalization.
+        """
+        self.ids = [str(id_) for id_ in ids]
+        self.positions = {id_: i for i, id_ in enumerate(self.ids)}
+        self.news = list(news)
+        property_names = set(ReferenceNewsType.__annotations__)
+        dumped_news = [news_item.model_dump(include=property_names) for news_item in self.news]
+        self.properties = {
+            name: [news_item[name] for news_item in dumped_news]
+            for name in ReferenceNewsType.__annotations__
+        }
+        self.vectors = {
+            vector_name: np.ascontiguousarray(matrix, dtype=np.float32)
+            for vector_name, matrix in vectors.items()
+        }
+        self.inverse_norms = {
+            vector_name: 1 / np.maximum(np.linalg.norm(matrix, axis=1), np.finfo(np.float32).tiny)
+            for vector_name, matrix in self.vectors.items()
+        }
+
+        self.vectorizer = CountVectorizer(token_pattern=WORD_PATTERN, dtype=np.float32)
+        term_frequencies = csr_matrix(
+            self.vectorizer.fit_transform([self.create_document(news) for news in self.news])
+        )
+        # Stored terms-by-news so that scoring the queries needs no format conversion.
+        self.bm25_weights = self.compute_bm25_weights(term_frequencies, k1=k1, b=b).T.tocsr()
+
+    def __len__(self) -> int:
+        """Get the number of indexed news."""
+        return len(self.news)
+
+    @classmethod
+    def from_collection(cls, collection: weaviate.collections.Collection) -> Self:
+        """Load all the news of a Weaviate collection with their named vectors.
+
+        Args:
+            collection: The Weaviate collection of reference news.
+
+        Returns:
+            The index of the collection.
+        """
+        ids: list[uuid.UUID] = []
+        news: list[News] = []
+        vectors: dict[VectorNames, list[NDArray[np.float32]]] = {
+            vector_name: [] for vector_name in VectorNames
+        }
+        for object_ in collection.iterator(
+            include_vector=True, return_properties=ReferenceNewsType
+        ):
+            try:
+                news_item = News.model_validate(object_.properties)
+            except ValidationError:
+                logging.exception("Error validating object %s", object_)
+                continue
+            ids.append(object_.uuid)
+            news.append(news_item)
+            for vector_name, vector_list in vectors.items():
+                vector_list.append(np.asarray(object_.vector[vector_name.value], dtype=np.float32))
+
+        logging.info("Loaded %s reference news in the hybrid search index.", len(news))
+        return cls(
+            ids=ids,
+            news=news,
+            vectors={
+                vector_name: np.asarray(vector_list, dtype=np.float32).reshape(len(news), -1)
+                for vector_name, vector_list in vectors.items()
+            },
+        )
+
+    def search_many(
+        self,
+        queries: Sequence[str],
+        embeddings: EmbeddingMatrix,
+        vector_name: VectorNames,
+        *,
+        alpha: float,
+        limit: int,
+        ids_to_keep: Sequence[str | uuid.UUID] | None = None,
+        excluded_ids: Sequence[str | uuid.UUID | None] | None = None,
+    ) -> list[tuple[NDArray[np.intp], NDArray[np.float32]]]:
+        """Search the news most similar to each query.
+
+        Args:
+            queries: The text of the queries.
+            embeddings: The embedding of each query.
+            vector_name: The named vector to compare the embeddings to.
+            alpha: The weight of the vector search, the keyword search having weight `1 - alpha`.
+            limit: The maximum number of results of each query.
+            ids_to_keep: The only ids that can be returned. All the news can be returned if None.
+            excluded_ids: The id that cannot be returned for each query, such as the held-out news
+                of a leave-one-out evaluation. The BM25 statistics still count the excluded news.
+
+        Returns:
+            For each query, the positions of the retrieved news and their scores, best first.
+        """
+        positions = (
+            np.asarray(
+                sorted({
+                    self.positions[str(id_)] for id_ in ids_to_keep if str(id_) in self.positions
+                }),
+                dtype=np.intp,
+            )
+            if ids_to_keep
+            else np.arange(len(self), dtype=np.intp)
+        )
+        if not queries or positions.size == 0:
+            return [(positions[:0], np.empty(0, dtype=np.float32)) for _ in queries]
+        limit = min(limit, positions.size)
+        # Slicing the whole index avoids copying the vector matrix.
+        selection: NDArray[np.intp] | slice = positions if ids_to_keep else slice(None)
+        excluded = self.excluded_columns(positions, excluded_ids)
+
+        fused_scores = np.zeros((len(queries), positions.size), dtype=np.float32)
+        retrieved = np.zeros((len(queries), positions.size), dtype=bool)
+        if alpha > 0:
+            query_vectors = self.normalize_rows(np.asarray(embeddings, dtype=np.float32))
+            vector_scores = (query_vectors @ self.vectors[vector_name][selection].T) * (
+                self.inverse_norms[vector_name][selection]
+            )
+            vector_scores[excluded] = -np.inf
+            normalized_scores, vector_retrieved = self.normalize_scores(vector_scores, limit)
+            fused_scores += alpha * normalized_scores
+            retrieved |= vector_retrieved
+        if alpha < 1:
+            keyword_scores = self.keyword_scores(queries)[:, selection]
+            keyword_scores[excluded] = -np.inf
+            normalized_scores, keyword_retrieved = self.normalize_scores(
+                keyword_scores, limit, positive_only=True
+            )
+            fused_scores += (1 - alpha) * normalized_scores
+            retrieved |= keyword_retrieved
+
+        fused_scores[~retrieved] = -np.inf
+        results = []
+        for query_scores in fused_scores:
+            best = np.argpartition(-query_scores, limit - 1)[:limit]
+            best = best[np.argsort(-query_scores[best], kind="stable")]
+            best = best[np.isfinite(query_scores[best])]
+            results.append((positions[best], query_scores[best]))
+        return results
+
+    def excluded_columns(
+        self,
+        positions: NDArray[np.intp],
+        excluded_ids: Sequence[str | uuid.UUID | None] | None,
+    ) -> tuple[NDArray[np.intp], NDArray[np.intp]]:
+        """Get the (query, column) indexes of the news excluded from the results of each query.
+
+        Args:
+            positions: The positions of the searched news, one column each.
+            excluded_ids: The id excluded from the results of each query, if any.
+
+        Returns:
+            The query indexes and the column indexes of the excluded news.
+        """
+        columns = np.full(len(self), -1, dtype=np.intp)
+        columns[positions] = np.arange(positions.size)
+        excluded_positions = np.array(
+            [
+                self.positions.get(str(id_), -1) if id_ is not None else -1
+                for id_ in excluded_ids or []
+            ],
+            dtype=np.intp,
+        )
+        excluded_columns = np.where(excluded_positions >= 0, columns[excluded_positions], -1)
+        queries = np.flatnonzero(excluded_columns >= 0)
+        return queries, excluded_columns[queries]
+
+    def keyword_scores(self, queries: Sequence[str]) -> NDArray[np.float32]:
+        """Compute the BM25 score of each news for each query.
+
+        Args:
+            queries: The text of the queries.
+
+        Returns:
+            The matrix of scores, one row per query.
+        """
+        query_terms = csr_matrix(self.vectorizer.transform(queries))
+        query_terms.data[:] = 1
+        scores: NDArray[np.float32] = (query_terms @ self.bm25_weights).toarray()
+        return scores
+
+    @staticmethod
+    def compute_bm25_weights(term_frequencies: csr_matrix, k1: float, b: float) -> csr_matrix:
+        """Weight the term frequencies of the documents with BM25.
+
+        Args:
+            term_frequencies: The term frequencies, one row per document.
+            k1: The BM25 term frequency saturation.
+            b: The BM25 length normalization.
+
+        Returns:
+            The BM25 weight of each term of each document.
+        """
+        nb_documents = term_frequencies.shape[0]
+        document_lengths = np.asarray(term_frequencies.sum(axis=1), dtype=np.float32).ravel()
+        length_ratios = document_lengths / max(float(document_lengths.mean()), 1.0)
+        document_frequencies = np.bincount(
+            term_frequencies.indices, minlength=term_frequencies.shape[1]
+        )
+        idf = np.log1p((nb_documents - document_frequencies + 0.5) / (document_frequencies + 0.5))
+
+        weights = term_frequencies.copy()
+        rows = np.repeat(np.arange(nb_documents), np.diff(weights.indptr))
+        weights.data = (
+            weights.data
+            * (k1 + 1)
+            / (weights.data + k1 * (1 - b + b * length_ratios[rows]))
+            * idf[weights.indices]
+        ).astype(np.float32)
+        return weights
+
+    @staticmethod
+    def normalize_scores(
+        scores: NDArray[np.float32], limit: int, *, positive_only: bool = False
+    ) -> tuple[NDArray[np.float32], NDArray[np.bool_]]:
+        """Min-max normalize the `limit` best scores of each row, the other scores being set to 0.
+
+        Args:
+            scores: The scores, one row per query.
+            limit: The number of results of each query.
+            positive_only: Whether only the positive scores are results, as for a keyword search.
+                The -inf scores of the excluded news are never results.
+
+        Returns:
+            The normalized scores and the mask of the results.
+        """
+        retrieved = np.zeros(scores.shape, dtype=bool)
+        best = np.argpartition(-scores, limit - 1, axis=1)[:, :limit]
+        np.put_along_axis(retrieved, best, values=True, axis=1)
+        retrieved &= scores > (0 if positive_only else -np.inf)
+
+        maximums = np.where(retrieved, scores, -np.inf).max(axis=1, keepdims=True)
+        minimums = np.where(retrieved, scores, np.inf).min(axis=1, keepdims=True)
+        ranges = maximums - minimums
+        with np.errstate(invalid="ignore", divide="ignore"):
+            normalized_scores = np.where(ranges > 0, (scores - minimums) / ranges, 1.0)
+        return np.where(retrieved, normalized_scores, 0.0).astype(np.float32), retrieved
+
+    @staticmethod
+    def normalize_rows(matrix: NDArray[np.float32]) -> NDArray[np.float32]:
+        """Normalize the rows of a matrix to unit length.
+
+        Args:
+            matrix: The matrix to normalize.
+
+        Returns:
+            The normalized matrix.
+        """
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        normalized_matrix: NDArray[np.float32] = matrix / np.maximum(
+            norms, np.finfo(np.float32).tiny
+        )
+        return normalized_matrix
+
+    @staticmethod
+    def create_document(news: News) -> str:
+        """Create the text of a news indexed by BM25.
+
+        Args:
+            news: The news.
+
+        Returns:
+            The title, content and summary of the news.
+        """
+        return " ".join(text for text in (news.title, news.content, news.summary) if text)
+
+
+class InMemoryVectorstore(Vectorstore):
+    """Vectorstore answering the queries from a HybridSearchIndex instead of Weaviate."""
+
+    def __init__(
+        self,
+        embedding_model: EmbeddingModel,
+        vectorstore_client: weaviate.WeaviateClient,
+        vectorstore_config: VectorstoreConfig,
+        hybrid_search_index: HybridSearchIndex,
+    ) -> None:
+        """Initialize the InMemoryVectorstore with the embedding model and the hybrid search index.
+
+        Args:
+            embedding_model: The embedding model to use.
+            vectorstore_client: The vectorstore client the index was loaded from.
+            vectorstore_config: The vectorstore configuration.
+            hybrid_search_index: The index of the reference news.
+        """
+        super().__init__(embedding_model, vectorstore_client, vectorstore_config)
+        self.hybrid_search_index = hybrid_search_index
+
+    async def hybrid_search(
+        self,
+        query: str,
+        embeddings: Embedding,
+        vector_name: VectorNames,
+        ids_to_keep: Sequence[str | uuid.UUID] | None = None,
+    ) -> list[tuple[News, float]]:
+        """Search for similar news in the index, without leaving the event loop.
+
+        Args:
+            query: The query to search for.
+            embeddings: The embeddings of the query.
+            ids_to_keep: The ids to keep in the search results.
+
+        Returns:
+            The list of similar news with their scores.
+        """
+        return self.hybrid_search_sync(query, embeddings, vector_name, ids_to_keep)
+
+    def hybrid_search_sync(
+        self,
+        query: str,
+        embeddings: Embedding,
+        vector_name: VectorNames,
+        ids_to_keep: Sequence[str | uuid.UUID] | None = None,
+    ) -> list[tuple[News, float]]:
+        """Search for similar news in the index.
+
+        Args:
+            query: The query to search for.
+            embeddings: The embeddings of the query.
+            ids_to_keep: The ids to keep in the search results.
+
+        Returns:
+            The list of similar news with their scores.
+        """
+        return self.hybrid_search_many_sync(
+            [query], embeddings.reshape(1, -1), vector_name, ids_to_keep
+        )[0]
+
+    def hybrid_search_many_sync(
+        self,
+        queries: Sequence[str],
+        embeddings: EmbeddingMatrix,
+        vector_name: VectorNames,
+        ids_to_keep: Sequence[str | uuid.UUID] | None = None,
+    ) -> list[list[tuple[News, float]]]:
+        """Search for the news similar to each query in a single matrix product.
+
+        Args:
+            queries: The queries to search for.
+            embeddings: The embeddings of each query.
+            vector_name: The named vector to compare the embeddings to.
+            ids_to_keep: The ids to keep in the search results.
+
+        Returns:
+            For each query, the list of similar news with their scores.
+        """
+        results = self.hybrid_search_index.search_many(
+            queries,
+            embeddings,
+            vector_name,
+            alpha=self.hybrid_weight,
+            limit=self.max_nb_items_retrieved,
+            ids_to_keep=ids_to_keep,
+        )
+        return [
+            [
+                (self.hybrid_search_index.news[position], float(score))
+                for position, score in zip(positions, scores, strict=True)
+                if score > self.minimal_score
+            ]
+            for positions, scores in results
+        ]
+
+    async def hybrid_search_many(
+        self,
+        queries: Sequence[str],
+        embeddings: EmbeddingMatrix,
+        vector_name: VectorNames,
+        ids_to_keep: Sequence[str | uuid.UUID] | None = None,
+        return_properties: Sequence[str] | None = None,
+        excluded_ids: Sequence[str | uuid.UUID | None] | None = None,
+    ) -> list[SearchHits]:
+        """Search for the news similar to each query in a single matrix product.
+
+        Args:
+            queries: The queries to search for.
+            embeddings: The embeddings of each query.
+            vector_name: The named vector to search with.
+            ids_to_keep: The ids to keep in the search results.
+            return_properties: The properties to retrieve. All the properties if None.
+            excluded_ids: The id excluded from the search results of each query, if any.
+
+        Returns:
+            The hits of each query.
+        """
+        results = self.hybrid_search_index.search_many(
+            queries,
+            embeddings,
+            vector_name,
+            alpha=self.hybrid_weight,
+            limit=self.max_nb_items_retrieved,
+            ids_to_keep=ids_to_keep,
+            excluded_ids=excluded_ids,
+        )
+        property_names = list(return_properties or self.hybrid_search_index.properties)
+        search_hits = []
+        for positions, scores in results:
+            kept_positions = positions[scores > self.minimal_score]
+            search_hits.append(
+                SearchHits(
+                    ids=[self.hybrid_search_index.ids[position] for position in kept_positions],
+                    scores=scores[scores > self.minimal_score],
+                    properties={
+                        name: [
+                            self.hybrid_search_index.properties[name][position]
+                            for position in kept_positions
+                        ]
+                        for name in property_names
+                    },
+                )
+            )
+        return search_hits
+
+    def read_many_by_rubric(self, rubric: Rubric) -> list[News]:
+        """Get the news with a specific rubric from the index.
+
+        Args:
+            rubric: The rubric to filter by.
+
+        Returns:
+            The list of news with the specified rubric.
+        """
+        news = [news for news in self.hybrid_search_index.news if news.rubric == rubric]
+        return news[: self.max_nb_items_retrieved]
+
+    def read_vectors(
+        self, vector_name: VectorNames, return_properties: Sequence[str] | None = None
+    ) -> ReferenceVectors:
+        """Read all the news of the index with one of their named vectors.
+
+        Args:
+            vector_name: The named vector to read.
+            return_properties: The properties to read. All the properties if None.
+
+        Returns:
+            The ids, vectors and properties of the news.
+        """
+        property_names = list(return_properties or self.hybrid_search_index.properties)
+        return ReferenceVectors(
+            ids=list(self.hybrid_search_index.ids),
+            vectors=self.hybrid_search_index.vectors[vector_name],
+            properties={
+                name: list(self.hybrid_search_index.properties[name]) for name in property_names
+            },
+        )
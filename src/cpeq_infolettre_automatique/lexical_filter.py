@@ -0,0 +1,165 @@
+"""Lexical filter rejecting clearly irrelevant news before they are embedded."""
+
+import logging
+from collections.abc import Sequence
+
+import numpy as np
+from numpy.typing import NDArray
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import StratifiedKFold, cross_val_predict
+from sklearn.pipeline import Pipeline, make_pipeline
+
+from cpeq_infolettre_automatique.config import LexicalFilterConfig, Rubric
+from cpeq_infolettre_automatique.in_memory_vectorstore import WORD_PATTERN
+from cpeq_infolettre_automatique.schemas import News
+
+
+class LexicalRelevancyFilter:
+    """TF-IDF logistic regression of the relevant vs `Autre` reference news.
+
+    Note:
+        The filter only drops the news whose lexical relevance score is below `threshold`, the
+        kept news still being classified by the NewsRelevancyClassifier. The threshold is the
+        score keeping a fraction `recall_target` of the relevant reference news, computed on
+        cross-validated scores so that it is not biased by the training data. Until fitted, or
+        if the reference news are not enough to cross-validate, the filter keeps all the news.
+    """
+
+    def __init__(self, lexical_filter_config: LexicalFilterConfig) -> None:
+        """Initialize an unfitted filter with the configuration."""
+        self.lexical_filter_config = lexical_filter_config
+        self.pipeline: Pipeline | None = None
+        self.threshold = 0.0
+
+    @property
+    def recall_target(self) -> float:
+        """Get the fraction of the relevant reference news that must be kept."""
+        return self.lexical_filter_config.recall_target
+
+    @property
+    def nb_folds(self) -> int:
+        """Get the number of cross-validation folds used to choose the threshold."""
+        return self.lexical_filter_config.nb_folds
+
+    def fit(self, news_list: Sequence[News]) -> None:
+        """Fit the lexical model and its threshold on the reference news.
+
+        Args:
+            news_list: The reference news, the news of the `Autre` rubric being the irrelevant ones.
+        """
+        labels = np.array([news.rubric != Rubric.AUTRE for news in news_list])
+        nb_folds = min(self.nb_folds, int(labels.sum()), int((~labels).sum()))
+        if nb_folds < 2:  # noqa: PLR2004
+            logging.warning(
+                "Not enough reference news to fit the lexical filter, it keeps all news."
+            )
+            self.pipeline = None
+            self.threshold = 0.0
+            return
+
+        documents = [self.create_document(news) for news in news_list]
+        out_of_fold_scores = self.out_of_fold_scores(documents, labels, nb_folds)
+        self.threshold = self.threshold_for_recall(out_of_fold_scores[labels], self.recall_target)
+        self.pipeline = self.create_pipeline().fit(documents, labels)
+        logging.info(
+            "Fitted the lexical filter: threshold %.3f would drop %.0f%% of the Autre news.",
+            self.threshold,
+            100 * np.mean(out_of_fold_scores[~labels] < self.threshold),
+        )
+
+    def scores(self, news_list: Sequence[News]) -> NDArray[np.float64]:
+        """Compute the lexical relevance scores of the news.
+
+        Args:
+            news_list: The news to score.
+
+        Returns:
+            The probability that each news is relevant according to the lexical model, or ones if
+            the filter is not fitted.
+        """
+        if self.pipeline is None:
+            return np.ones(len(news_list))
+        if not news_list:
+            return np.empty(0)
+        scores: NDArray[np.float64] = self.pipeline.predict_proba([
+            self.create_document(news) for news in news_list
+        ])[:, 1]
+        return scores
+
+    def filter(self, news_list: Sequence[News]) -> list[News]:
+        """Drop the news whose lexical relevance score is below the threshold.
+
+        Args:
+            news_list: The news to filter.
+
+        Returns:
+            The plausibly relevant news, in their original order.
+        """
+        keep = self.scores(news_list) >= self.threshold
+        if not keep.all():
+            logging.info(
+                "The lexical filter dropped %s of %s news.", int((~keep).sum()), len(news_list)
+            )
+        return [news for news, keep_news in zip(news_list, keep, strict=True) if keep_news]
+
+    def out_of_fold_scores(
+        self, documents: Sequence[str], labels: NDArray[np.bool_], nb_folds: int
+    ) -> NDArray[np.float64]:
+        """Score each document with a lexical model fitted on the other folds.
+
+        Args:
+            documents: The documents of the reference news.
+            labels: Whether each reference news is relevant.
+            nb_folds: The number of folds.
+
+        Returns:
+            The cross-validated probability that each news is relevant.
+        """
+        probs: NDArray[np.float64] = cross_val_predict(
+            self.create_pipeline(),
+            list(documents),
+            labels,
+            cv=StratifiedKFold(n_splits=nb_folds, shuffle=True, random_state=42),
+            method="predict_proba",
+        )
+        return probs[:, 1]
+
+    @staticmethod
+    def threshold_for_recall(relevant_scores: NDArray[np.float64], recall_target: float) -> float:
+        """Get the highest threshold keeping at least a fraction `recall_target` of the relevant news.
+
+        Args:
+            relevant_scores: The scores of the relevant news.
+            recall_target: The fraction of the relevant news to keep.
+
+        Returns:
+            The minimal score of a kept news.
+        """
+        sorted_scores = np.sort(relevant_scores)
+        nb_dropped = int(np.floor(len(sorted_scores) * (1 - recall_target) + 1e-9))
+        return float(sorted_scores[min(nb_dropped, len(sorted_scores) - 1)])
+
+    @staticmethod
+    def create_pipeline() -> Pipeline:
+        """Create the unfitted lexical model.
+
+        Returns:
+            The TF-IDF and logistic regression pipeline.
+        """
+        return make_pipeline(
+            TfidfVectorizer(token_pattern=WORD_PATTERN, sublinear_tf=True, dtype=np.float32),
+            LogisticRegression(class_weight="balanced", max_iter=1000),
+        )
+
+    @staticmethod
+    def create_document(news: News) -> str:
+        """Create the text scored by the lexical model, available before summarization.
+
+        Args:
+            news: The news.
+
+        Returns:
+            The title and content of the news.
+        """
+        return f"{news.title} {news.content}"
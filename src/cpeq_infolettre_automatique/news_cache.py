@@ -0,0 +1,197 @@
+"""Persistent cache of the news produced in previous runs."""
+
+import datetime as dt
+import hashlib
+import logging
+import sqlite3
+from collections.abc import Sequence
+from pathlib import Path
+
+from pydantic import BaseModel, ConfigDict
+
+from cpeq_infolettre_automatique.config import NewsCacheConfig, Rubric
+from cpeq_infolettre_automatique.schemas import News
+from cpeq_infolettre_automatique.utils import normalize_link
+
+
+class CachedNews(BaseModel):
+    """Schema for a news produced in a previous run."""
+
+    summary: str
+    rubric: Rubric | None
+
+    model_config = ConfigDict(use_enum_values=False)
+
+
+class NewsCache:
+    """Persistent cache of produced news, keyed by their normalized link and content hash.
+
+    Note:
+        An entry is invalidated when the content of its news changes. Entries older than
+        `max_age_days` are removed and only the `max_entries` most recently used entries are kept.
+    """
+
+    def __init__(self, news_cache_config: NewsCacheConfig) -> None:
+        """Initialize the cache.
+
+        Args:
+            news_cache_config: The news cache configuration.
+        """
+        self.news_cache_config = news_cache_config
+        self.connection: sqlite3.Connection | None = None
+
+    @property
+    def max_age(self) -> dt.timedelta:
+        """Get the maximum age of an entry."""
+        return dt.timedelta(days=self.news_cache_config.max_age_days)
+
+    @property
+    def max_entries(self) -> int:
+        """Get the maximum number of entries."""
+        return self.news_cache_config.max_entries
+
+    def setup(self) -> None:
+        """Open the cache database, creating it if needed, and remove expired entries."""
+        path = self.news_cache_config.path
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute(
+                """CREATE TABLE IF NOT EXISTS news (
+                    link TEXT PRIMARY KEY,
+                    content_hash TEXT NOT NULL,
+                    summary TEXT NOT NULL,
+                    rubric TEXT,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )"""
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS news_accessed_at ON news (accessed_at)"
+            )
+        self.prune()
+
+    def teardown(self) -> None:
+        """Close the cache database."""
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def get(self, news: News) -> CachedNews | None:
+        """Get the cached production of a news.
+
+        Args:
+            news: The news to look for.
+
+        Returns:
+            The cached news, or None if the news was never produced or if its content changed.
+        """
+        connection = self._get_connection()
+        link = normalize_link(str(news.link))
+        row = connection.execute(
+            "SELECT content_hash, summary, rubric FROM news WHERE link = ?", (link,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        content_hash, summary, rubric = row
+        with connection:
+            if content_hash != self.hash_content(news.content):
+                logging.info("The content of the cached News with link %s changed.", link)
+                connection.execute("DELETE FROM news WHERE link = ?", (link,))
+                return None
+            connection.execute(
+                "UPDATE news SET accessed_at = ? WHERE link = ?", (self._now(), link)
+            )
+
+        return CachedNews(summary=summary, rubric=Rubric(rubric) if rubric is not None else None)
+
+    def set(self, news: News) -> None:
+        """Cache the production of a news, replacing any previous entry with the same link.
+
+        Args:
+            news: The produced news, with its summary and rubric.
+        """
+        self.set_many([news])
+
+    def set_many(self, news_list: Sequence[News]) -> None:
+        """Cache the production of many news, then evict the entries above the size cap.
+
+        Args:
+            news_list: The produced news, with their summary and rubric.
+
+        Raises:
+            ValueError: If a news has no summary.
+        """
+        if any(news.summary is None for news in news_list):
+            error_msg = "Only news with a summary can be cached."
+            raise ValueError(error_msg)
+
+        connection = self._get_connection()
+        now = self._now()
+        with connection:
+            for news in news_list:
+                link = normalize_link(str(news.link))
+                connection.execute("DELETE FROM news WHERE link = ?", (link,))
+                connection.execute(
+                    "INSERT INTO news VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        link,
+                        self.hash_content(news.content),
+                        news.summary,
+                        news.rubric.value if news.rubric is not None else None,
+                        now,
+                        now,
+                    ),
+                )
+            self._evict_least_recently_used()
+
+    def prune(self) -> int:
+        """Remove the expired entries and the least recently used entries above the size cap.
+
+        Returns:
+            The number of removed entries.
+        """
+        connection = self._get_connection()
+        expiration = (dt.datetime.now(tz=dt.UTC) - self.max_age).timestamp()
+        with connection:
+            nb_expired = connection.execute(
+                "DELETE FROM news WHERE created_at < ?", (expiration,)
+            ).rowcount
+            nb_evicted = self._evict_least_recently_used()
+        return nb_expired + nb_evicted
+
+    def _evict_least_recently_used(self) -> int:
+        return (
+            self._get_connection()
+            .execute(
+                """DELETE FROM news WHERE link NOT IN (
+                SELECT link FROM news ORDER BY accessed_at DESC LIMIT ?
+            )""",
+                (self.max_entries,),
+            )
+            .rowcount
+        )
+
+    @staticmethod
+    def hash_content(content: str) -> str:
+        """Hash the content of a news.
+
+        Args:
+            content: The content to hash.
+
+        Returns:
+            The hexadecimal SHA-256 digest of the content.
+        """
+        return hashlib.sha256(content.strip().encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _now() -> float:
+        return dt.datetime.now(tz=dt.UTC).timestamp()
+
+    def _get_connection(self) -> sqlite3.Connection:
+        if self.connection is None:
+            error_msg = "The news cache must be set up before being used."
+            raise RuntimeError(error_msg)
+        return self.connection
@@ -1,11 +1,18 @@
 """Implement the NewsRubricClassifier and NewsRelevancyClassifier classes."""
 
+import logging
 import uuid
+from collections import Counter
 from collections.abc import Sequence
 from typing import Any
 
-from cpeq_infolettre_automatique.classification_algo import NewsClassifier
+from cpeq_infolettre_automatique.classification_algo import (
+    EmbeddingNewsClassifier,
+    NewsClassifier,
+    TrainData,
+)
 from cpeq_infolettre_automatique.config import NewsRelevancyClassifierConfig, Relevance, Rubric
+from cpeq_infolettre_automatique.embedding_model import Embedding, EmbeddingMatrix
 from cpeq_infolettre_automatique.schemas import News
 
 
@@ -19,7 +26,7 @@ class NewsRubricClassifier:
     async def predict_probs(
         self,
         news: News,
-        embedding: list[float] | None = None,
+        embedding: Embedding | None = None,
         ids_to_keep: Sequence[str | uuid.UUID] | None = None,
     ) -> dict[str, float]:
         """Predict the rubric of the given news.
@@ -40,7 +47,7 @@ class NewsRubricClassifier:
     async def predict(
         self,
         news: News,
-        embedding: list[float] | None = None,
+        embedding: Embedding | None = None,
         ids_to_keep: Sequence[str | uuid.UUID] | None = None,
     ) -> Rubric:
         """Predict the rubric of the given news.
@@ -52,10 +59,73 @@ class NewsRubricClassifier:
             The rubric class of the news
         """
         predicted_probs = await self.predict_probs(news, embedding, ids_to_keep)
+        return self.predict_from_probs(predicted_probs)
 
-        max_pred = max(predicted_probs, key=lambda rubric_prob: rubric_prob[1])
+    async def predict_many(
+        self,
+        news_list: Sequence[News],
+        embeddings: EmbeddingMatrix | None = None,
+        ids_to_keep: Sequence[str | uuid.UUID] | None = None,
+    ) -> list[Rubric]:
+        """Predict the rubric of many news in a single batch.
+
+        Args:
+            news_list: The news to predict the rubric from.
+
+        Returns:
+            The rubric class of each news.
+        """
+        predicted_probs = await self.predict_probs_many(news_list, embeddings, ids_to_keep)
+        return [self.predict_from_probs(probs) for probs in predicted_probs]
 
-        return Rubric(max_pred)
+    async def predict_probs_many(
+        self,
+        news_list: Sequence[News],
+        embeddings: EmbeddingMatrix | None = None,
+        ids_to_keep: Sequence[str | uuid.UUID] | None = None,
+    ) -> list[dict[str, float]]:
+        """Predict the rubric probabilities of many news in a single batch.
+
+        Args:
+            news_list: The news to predict the rubric from.
+
+        Returns:
+            The rubric classes of each news with their associated probabilities. The results are sorted in descending order of the probabilities.
+        """
+        if not news_list:
+            return []
+        predicted_probs = await self.model.predict_probs_many(news_list, embeddings, ids_to_keep)
+        return [
+            dict(sorted(probs.items(), key=lambda rubric_prob: rubric_prob[1], reverse=True))
+            for probs in predicted_probs
+        ]
+
+    async def leave_one_out_probs(
+        self, news_list: Sequence[News], train_data: TrainData
+    ) -> list[dict[str, float]]:
+        """Predict the rubric probabilities of each training news with the model fitted on the other ones.
+
+        Args:
+            news_list: The training news, in the order of the training data.
+            train_data: The label and the embedding of each training news.
+
+        Returns:
+            The rubric classes of each news with their associated probabilities. The results are sorted in descending order of the probabilities.
+        """
+        predicted_scores = await self.model.leave_one_out_scores(news_list, train_data)
+        return [self.model.scores_to_probs(scores) for scores in predicted_scores]
+
+    @staticmethod
+    def predict_from_probs(predicted_probs: dict[str, float]) -> Rubric:
+        """Predict the rubric with the highest probability.
+
+        Args:
+            predicted_probs: The probabilities of the rubrics.
+
+        Returns:
+            The rubric class of the news.
+        """
+        return Rubric(max(predicted_probs, key=predicted_probs.__getitem__))
 
     @property
     def model_name(self) -> str:
@@ -92,7 +162,7 @@ class NewsRelevancyClassifier:
     async def predict(
         self,
         news: News,
-        embedding: list[float] | None = None,
+        embedding: Embedding | None = None,
         ids_to_keep: Sequence[str | uuid.UUID] | None = None,
     ) -> Relevance:
         """Predict the relevance of the given news.
@@ -104,16 +174,48 @@ class NewsRelevancyClassifier:
             The relevance class of the news
         """
         predicted_probs = await self.predict_probs(news, embedding, ids_to_keep)
-        return (
-            Relevance.PERTINENT
-            if predicted_probs[Relevance.PERTINENT.value] >= self.threshold
-            else Relevance.AUTRE
-        )
+        return self.predict_from_probs(predicted_probs)
+
+    async def predict_many(
+        self,
+        news_list: Sequence[News],
+        embeddings: EmbeddingMatrix | None = None,
+        ids_to_keep: Sequence[str | uuid.UUID] | None = None,
+    ) -> list[Relevance]:
+        """Predict the relevance of many news in a single batch.
+
+        Args:
+            news_list: The news to predict if they are relevant or not.
+
+        Returns:
+            The relevance class of each news.
+        """
+        predicted_probs = await self.predict_probs_many(news_list, embeddings, ids_to_keep)
+        return [self.predict_from_probs(probs) for probs in predicted_probs]
+
+    async def predict_probs_many(
+        self,
+        news_list: Sequence[News],
+        embeddings: EmbeddingMatrix | None = None,
+        ids_to_keep: Sequence[str | uuid.UUID] | None = None,
+    ) -> list[dict[str, float]]:
+        """Predict the relevance probabilities of many news in a single batch.
+
+        Args:
+            news_list: The news to predict if they are relevant or not.
+
+        Returns:
+            The relevancy of each news with their associated probabilities. The results are sorted in descending order of the probabilities.
+        """
+        if not news_list:
+            return []
+        predicted_probs = await self.model.predict_probs_many(news_list, embeddings, ids_to_keep)
+        return [self.to_relevance_probs(probs) for probs in predicted_probs]
 
     async def predict_probs(
         self,
         news: News,
-        embedding: list[float] | None = None,
+        embedding: Embedding | None = None,
         ids_to_keep: Sequence[str | uuid.UUID] | None = None,
     ) -> dict[str, float]:
         """Predict the relevance of the given news.
@@ -125,6 +227,51 @@ class NewsRelevancyClassifier:
             The relevancy of the news with their associated probabilities. The results are sorted in descending order of the probabilities.
         """
         predicted_probs = await self.model.predict_probs(news, embedding, ids_to_keep)
+        return self.to_relevance_probs(predicted_probs)
+
+    async def leave_one_out_probs(
+        self, news_list: Sequence[News], train_data: TrainData
+    ) -> list[dict[str, float]]:
+        """Predict the relevance probabilities of each training news with the model fitted on the other ones.
+
+        Args:
+            news_list: The training news, in the order of the training data.
+            train_data: The label and the embedding of each training news.
+
+        Returns:
+            The relevancy of each news with their associated probabilities. The results are sorted in descending order of the probabilities.
+        """
+        predicted_scores = await self.model.leave_one_out_scores(news_list, train_data)
+        return [
+            self.to_relevance_probs(self.model.scores_to_probs(scores))
+            for scores in predicted_scores
+        ]
+
+    def predict_from_probs(self, predicted_probs: dict[str, float]) -> Relevance:
+        """Predict the relevance by comparing the relevance probability to the threshold.
+
+        Args:
+            predicted_probs: The relevancy probabilities.
+
+        Returns:
+            The relevance class of the news.
+        """
+        return (
+            Relevance.PERTINENT
+            if predicted_probs[Relevance.PERTINENT.value] >= self.threshold
+            else Relevance.AUTRE
+        )
+
+    @staticmethod
+    def to_relevance_probs(predicted_probs: dict[str, float]) -> dict[str, float]:
+        """Convert the probabilities of the rubrics to the probabilities of the relevance classes.
+
+        Args:
+            predicted_probs: The probabilities of the rubrics.
+
+        Returns:
+            The relevancy probabilities, sorted in descending order.
+        """
         not_relevant_prob = predicted_probs[Relevance.AUTRE.value]
         relevant_prob = 1.0 - not_relevant_prob
         probs = {
@@ -150,3 +297,104 @@ class NewsRelevancyClassifier:
             "task": type(self).__name__,
             "threshold": self.threshold,
         }
+
+
+class CascadeNewsRelevancyClassifier(NewsRelevancyClassifier):
+    """Classify the relevance of news with a cheap embedding classifier first.
+
+    Note:
+        The news whose relevance probability according to `cascade_model` is within
+        `cascade_margin` of the threshold are escalated to `model`, the others exit at the first
+        stage. The number of news exiting at each stage is kept in `stage_counts`.
+    """
+
+    def __init__(
+        self,
+        model: NewsClassifier,
+        cascade_model: EmbeddingNewsClassifier,
+        news_relevancy_classifier_config: NewsRelevancyClassifierConfig,
+    ) -> None:
+        """Initialize the CascadeNewsRelevancyClassifier with the models and the configuration."""
+        super().__init__(model, news_relevancy_classifier_config)
+        self.cascade_model = cascade_model
+        self.stage_counts: Counter[str] = Counter()
+
+    @property
+    def cascade_margin(self) -> float:
+        """Get the margin around the threshold within which the news are escalated."""
+        return self.news_relevancy_classifier_config.cascade_margin
+
+    async def predict_probs(
+        self,
+        news: News,
+        embedding: Embedding | None = None,
+        ids_to_keep: Sequence[str | uuid.UUID] | None = None,
+    ) -> dict[str, float]:
+        """Predict the relevance of the given news.
+
+        Args:
+            news: The news to predict if it is relevant or not.
+
+        Returns:
+            The relevancy of the news with their associated probabilities. The results are sorted in descending order of the probabilities.
+        """
+        [probs] = await self.predict_probs_many(
+            [news], embedding.reshape(1, -1) if embedding is not None else None, ids_to_keep
+        )
+        return probs
+
+    async def predict_probs_many(
+        self,
+        news_list: Sequence[News],
+        embeddings: EmbeddingMatrix | None = None,
+        ids_to_keep: Sequence[str | uuid.UUID] | None = None,
+    ) -> list[dict[str, float]]:
+        """Predict the relevance probabilities of many news, escalating only the uncertain news.
+
+        Args:
+            news_list: The news to predict if they are relevant or not.
+
+        Returns:
+            The relevancy of each news with their associated probabilities. The results are sorted in descending order of the probabilities.
+        """
+        if not news_list:
+            return []
+        embeddings_matrix = await self.cascade_model.embed_many(news_list, embeddings)
+        cascade_probs = await self.cascade_model.predict_probs_many(news_list, embeddings_matrix)
+        relevance_probs = [self.to_relevance_probs(probs) for probs in cascade_probs]
+        uncertain_indexes = [
+            i
+            for i, probs in enumerate(relevance_probs)
+            if abs(probs[Relevance.PERTINENT.value] - self.threshold) < self.cascade_margin
+        ]
+
+        if uncertain_indexes:
+            escalated_probs = await self.model.predict_probs_many(
+                [news_list[i] for i in uncertain_indexes],
+                embeddings_matrix[uncertain_indexes]
+                if self.model.vector_name == self.cascade_model.vector_name
+                else None,
+                ids_to_keep,
+            )
+            for i, probs in zip(uncertain_indexes, escalated_probs, strict=True):
+                relevance_probs[i] = self.to_relevance_probs(probs)
+
+        nb_accepted = sum(
+            relevance_probs[i][Relevance.PERTINENT.value] >= self.threshold
+            for i in set(range(len(news_list))).difference(uncertain_indexes)
+        )
+        batch_counts = Counter({
+            "accepted": nb_accepted,
+            "rejected": len(news_list) - len(uncertain_indexes) - nb_accepted,
+            "escalated": len(uncertain_indexes),
+        })
+        self.stage_counts.update(batch_counts)
+        logging.info(
+            "Relevancy cascade: %.0f%% rejected and %.0f%% accepted by %s, %.0f%% escalated to %s.",
+            100 * batch_counts["rejected"] / len(news_list),
+            100 * batch_counts["accepted"] / len(news_list),
+            type(self.cascade_model).__name__,
+            100 * batch_counts["escalated"] / len(news_list),
+            type(self.model).__name__,
+        )
+        return relevance_probs
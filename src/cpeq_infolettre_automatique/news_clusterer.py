@@ -0,0 +1,114 @@
+"""Implement the clustering of news covering the same story."""
+
+import logging
+
+import numpy as np
+from numpy.typing import NDArray
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+
+from cpeq_infolettre_automatique.config import NewsClustererConfig, VectorNames
+from cpeq_infolettre_automatique.embedding_model import EmbeddingModel
+from cpeq_infolettre_automatique.schemas import News
+from cpeq_infolettre_automatique.vectorstore import Vectorstore
+
+
+class NewsClusterer:
+    """Group near-duplicate news so that each story is summarized only once."""
+
+    def __init__(
+        self, embedding_model: EmbeddingModel, news_clusterer_config: NewsClustererConfig
+    ) -> None:
+        """Initialize the NewsClusterer with the embedding model and the configuration."""
+        self.embedding_model = embedding_model
+        self.news_clusterer_config = news_clusterer_config
+
+    @property
+    def vector_name(self) -> VectorNames:
+        """Get the vector name used to compare the news."""
+        return self.news_clusterer_config.vector_name
+
+    @property
+    def similarity_threshold(self) -> float:
+        """Get the minimal cosine similarity for two news to cover the same story."""
+        return self.news_clusterer_config.similarity_threshold
+
+    async def deduplicate(self, news_list: list[News]) -> list[News]:
+        """Keep one representative news per story, the other news of the story being linked in its `see_also` field.
+
+        Args:
+            news_list: The news to deduplicate.
+
+        Returns:
+            The representative news of each story, in the order of their first occurrence.
+        """
+        clusters = await self.cluster(news_list)
+        logging.info("Grouped %s news into %s stories.", len(news_list), len(clusters))
+        return [self.merge_cluster(cluster) for cluster in clusters]
+
+    async def cluster(self, news_list: list[News]) -> list[list[News]]:
+        """Group the news whose embeddings are similar.
+
+        Args:
+            news_list: The news to cluster.
+
+        Returns:
+            The clusters of news, the representative news of each cluster first.
+        """
+        if len(news_list) <= 1:
+            return [[news] for news in news_list]
+
+        embeddings = await self.embedding_model.embed_many([
+            Vectorstore.create_query(news, vector_name=self.vector_name) for news in news_list
+        ])
+        similarities = self.cosine_similarities(embeddings)
+        _, labels = connected_components(
+            csr_matrix(similarities >= self.similarity_threshold), directed=False
+        )
+
+        clusters: dict[int, list[int]] = {}
+        for i, label in enumerate(labels):
+            clusters.setdefault(int(label), []).append(i)
+
+        sorted_clusters = []
+        for indexes in clusters.values():
+            # The representative news is the medoid of the cluster, i.e. the most similar news to the others.
+            centrality = similarities[np.ix_(indexes, indexes)].sum(axis=1)
+            order = np.argsort(-centrality, kind="stable")
+            sorted_clusters.append([news_list[indexes[i]] for i in order])
+        return sorted_clusters
+
+    @staticmethod
+    def cosine_similarities(embeddings: NDArray[np.float32]) -> NDArray[np.float32]:
+        """Compute the pairwise cosine similarities of the embeddings.
+
+        Args:
+            embeddings: The embeddings matrix, one row per news.
+
+        Returns:
+            The square matrix of pairwise cosine similarities.
+        """
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        normalized_embeddings = embeddings / np.maximum(norms, np.finfo(embeddings.dtype).tiny)
+        similarities: NDArray[np.float32] = normalized_embeddings @ normalized_embeddings.T
+        return similarities
+
+    @staticmethod
+    def merge_cluster(cluster: list[News]) -> News:
+        """Link the other news of the cluster in the `see_also` field of its representative news.
+
+        Args:
+            cluster: The news of the cluster, the representative news first.
+
+        Returns:
+            The representative news.
+        """
+        representative_news, *other_news = cluster
+        see_also = list(representative_news.see_also)
+        links = {str(representative_news.link), *(str(link) for link in see_also)}
+        for news in other_news:
+            if str(news.link) not in links:
+                links.add(str(news.link))
+                see_also.append(news.link)
+        representative_news.see_also = see_also
+        return representative_news
@@ -1,10 +1,27 @@
 """Implementation of the News Producer Class."""
 
+import logging
+import re
+from collections import Counter
+from enum import Enum
+
+import tiktoken
+
+from cpeq_infolettre_automatique.config import NewsProducerConfig
+from cpeq_infolettre_automatique.news_cache import NewsCache
 from cpeq_infolettre_automatique.news_classifier import NewsRubricClassifier
 from cpeq_infolettre_automatique.schemas import News
 from cpeq_infolettre_automatique.summary_generator import SummaryGenerator
 
 
+class SummaryPath(Enum):
+    """How the summary of a news was produced."""
+
+    CACHED = "cached"
+    EXTRACTIVE = "extractive"
+    GENERATIVE = "generative"
+
+
 class NewsProducer:
     """Class to produce news for the newsletter."""
 
@@ -12,13 +29,119 @@ class NewsProducer:
         self,
         summary_generator: SummaryGenerator,
         news_rubric_classifier: NewsRubricClassifier,
+        news_producer_config: NewsProducerConfig,
+        news_cache: NewsCache,
     ) -> None:
-        """Initialize the News Producer with the summary generator and the rubric classifier."""
+        """Initialize the News Producer with the summary generator, the rubric classifier and the cache of previously produced news."""
         self.summary_generator = summary_generator
         self.news_rubric_classifier = news_rubric_classifier
+        self.news_producer_config = news_producer_config
+        self.news_cache = news_cache
+        self.summary_path_counts: Counter[SummaryPath] = Counter()
+
+    @property
+    def extractive_summary_max_tokens(self) -> int:
+        """Get the maximum number of tokens of a content summarized extractively."""
+        return self.news_producer_config.extractive_summary_max_tokens
 
     async def produce_news(self, news: News) -> News:
-        """Produce the news by classifying and summarizing it."""
-        news.summary = await self.summary_generator.generate(news)
+        """Produce the news by classifying and summarizing it, unless it was already produced."""
+        if self.load_from_cache(news):
+            return news
+
+        if self.is_short_enough(news.content):
+            news.summary = self.extract_summary(news.content)
+            self.summary_path_counts[SummaryPath.EXTRACTIVE] += 1
+        else:
+            news.summary = await self.summary_generator.generate(news)
+            self.summary_path_counts[SummaryPath.GENERATIVE] += 1
         news.rubric = await self.news_rubric_classifier.predict(news)
+        self.news_cache.set(news)
         return news
+
+    async def produce_many_news(self, news_list: list[News]) -> list[News]:
+        """Produce many news, summarizing the news that are too long in batches.
+
+        Args:
+            news_list: The news to produce.
+
+        Returns:
+            The classified and summarized news.
+        """
+        news_to_produce = [news for news in news_list if not self.load_from_cache(news)]
+        news_to_generate: list[News] = []
+        for news in news_to_produce:
+            if self.is_short_enough(news.content):
+                news.summary = self.extract_summary(news.content)
+                self.summary_path_counts[SummaryPath.EXTRACTIVE] += 1
+            else:
+                news_to_generate.append(news)
+
+        summaries = await self.summary_generator.generate_many(news_to_generate)
+        for news, summary in zip(news_to_generate, summaries, strict=True):
+            news.summary = summary
+        self.summary_path_counts[SummaryPath.GENERATIVE] += len(news_to_generate)
+
+        rubrics = await self.news_rubric_classifier.predict_many(news_to_produce)
+        for news, rubric in zip(news_to_produce, rubrics, strict=True):
+            news.rubric = rubric
+        self.news_cache.set_many(news_to_produce)
+        return news_list
+
+    def load_from_cache(self, news: News) -> bool:
+        """Fill the summary and rubric of the news from the cache of previously produced news.
+
+        Args:
+            news: The news to produce.
+
+        Returns:
+            True if the news was found in the cache, False otherwise.
+        """
+        cached_news = self.news_cache.get(news)
+        if cached_news is None:
+            return False
+        news.summary = cached_news.summary
+        news.rubric = cached_news.rubric
+        self.summary_path_counts[SummaryPath.CACHED] += 1
+        return True
+
+    def is_short_enough(self, content: str) -> bool:
+        """Check if the content is short enough to be used as its own summary.
+
+        Args:
+            content: The content of the news.
+
+        Returns:
+            True if the content has at most `extractive_summary_max_tokens` tokens.
+        """
+        if self.extractive_summary_max_tokens <= 0:
+            return False
+        # A byte-level BPE token is at least one byte long, so short contents are not encoded.
+        if len(content.encode("utf-8")) <= self.extractive_summary_max_tokens:
+            return True
+        encoding = tiktoken.get_encoding(self.news_producer_config.token_encoding)
+        return len(encoding.encode(content)) <= self.extractive_summary_max_tokens
+
+    @staticmethod
+    def extract_summary(content: str) -> str:
+        """Derive a summary directly from a short content by cleaning up its whitespaces.
+
+        Args:
+            content: The content of the news.
+
+        Returns:
+            The cleaned content.
+        """
+        paragraphs = [
+            re.sub(r"\s+", " ", paragraph).strip() for paragraph in re.split(r"\n\s*\n", content)
+        ]
+        return "\n\n".join(paragraph for paragraph in paragraphs if paragraph)
+
+    def log_summary_path_counts(self) -> None:
+        """Log how many summaries were produced by each path."""
+        logging.info(
+            "Summaries produced: %s cached, %s extractive, %s generative.",
+            self.summary_path_counts[SummaryPath.CACHED],
+            self.summary_path_counts[SummaryPath.EXTRACTIVE],
+            self.summary_path_counts[SummaryPath.GENERATIVE],
+        )
@@ -0,0 +1,219 @@
+"""Near-duplicate index of the news published in previous newsletters."""
+
+import datetime as dt
+import logging
+import re
+import unicodedata
+import zlib
+from collections.abc import Iterable
+from pathlib import Path
+
+import numpy as np
+from numpy.typing import NDArray
+
+from cpeq_infolettre_automatique.config import PublishedNewsIndexConfig
+from cpeq_infolettre_automatique.schemas import News
+from cpeq_infolettre_automatique.utils import normalize_link
+
+
+MERSENNE_PRIME = (1 << 31) - 1
+PERMUTATIONS_SEED = 42
+# Publication period of the news indexed without one, earlier than any newsletter.
+UNKNOWN_PERIOD = np.iinfo(np.int64).min
+
+
+class PublishedNewsIndex:
+    """MinHash/LSH index of the titles and contents of the previously published news.
+
+    Note:
+        A news is a duplicate of a published news if their normalized links are equal, or if the
+        estimated Jaccard similarity of their word shingles is at least `similarity_threshold`.
+        Only the news sharing at least one LSH band with the news are compared, so lookups do not
+        grow with the number of published news. Each news is indexed with the start of the period
+        of its newsletter, so that regenerating a newsletter does not drop its own news.
+    """
+
+    def __init__(self, published_news_index_config: PublishedNewsIndexConfig) -> None:
+        """Initialize an empty index.
+
+        Args:
+            published_news_index_config: The published news index configuration.
+
+        Raises:
+            ValueError: If the number of permutations is not a multiple of the number of bands.
+        """
+        if (
+            published_news_index_config.nb_bands <= 0
+            or published_news_index_config.nb_permutations % published_news_index_config.nb_bands
+        ):
+            error_msg = "The number of permutations must be a multiple of the number of bands."
+            raise ValueError(error_msg)
+        self.published_news_index_config = published_news_index_config
+
+        generator = np.random.default_rng(PERMUTATIONS_SEED)
+        self._a = generator.integers(
+            1, MERSENNE_PRIME, size=(self.nb_permutations, 1), dtype=np.uint64
+        )
+        self._b = generator.integers(
+            0, MERSENNE_PRIME, size=(self.nb_permutations, 1), dtype=np.uint64
+        )
+
+        self._links: list[str] = []
+        self._link_ids: dict[str, int] = {}
+        self._periods: list[int] = []
+        self._signatures: list[NDArray[np.uint32]] = []
+        self._buckets: list[dict[bytes, list[int]]] = [{} for _ in range(self.nb_bands)]
+
+    @property
+    def nb_permutations(self) -> int:
+        """Get the number of values of a MinHash signature."""
+        return self.published_news_index_config.nb_permutations
+
+    @property
+    def nb_bands(self) -> int:
+        """Get the number of LSH bands."""
+        return self.published_news_index_config.nb_bands
+
+    @property
+    def similarity_threshold(self) -> float:
+        """Get the minimal estimated Jaccard similarity of two duplicate news."""
+        return self.published_news_index_config.similarity_threshold
+
+    def __len__(self) -> int:
+        """Get the number of indexed news."""
+        return len(self._links)
+
+    def setup(self) -> None:
+        """Load the index from its file, if it exists."""
+        path = Path(self.published_news_index_config.path)
+        if not path.exists():
+            return
+        with np.load(path, allow_pickle=False) as data:
+            signatures = data["signatures"]
+            links = data["links"].tolist()
+            periods = (
+                data["periods"].tolist() if "periods" in data else [UNKNOWN_PERIOD] * len(links)
+            )
+        if signatures.shape[1:] != (self.nb_permutations,):
+            logging.warning(
+                "The published news index at %s was built with other parameters, it is ignored.",
+                path,
+            )
+            return
+        for link, signature, period in zip(links, signatures, periods, strict=True):
+            self._insert(link, signature, period)
+        logging.info("Loaded %s published news in the index.", len(self))
+
+    def save(self) -> None:
+        """Save the index to its file."""
+        path = Path(self.published_news_index_config.path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        signatures = (
+            np.stack(self._signatures)
+            if self._signatures
+            else np.empty((0, self.nb_permutations), dtype=np.uint32)
+        )
+        temporary_path = path.with_name(f"{path.name}.tmp.npz")
+        np.savez(
+            temporary_path,
+            signatures=signatures,
+            links=np.array(self._links, dtype=str),
+            periods=np.array(self._periods, dtype=np.int64),
+        )
+        temporary_path.replace(path)
+
+    def add_many(self, news_list: Iterable[News], period_start: dt.datetime | None = None) -> None:
+        """Index published news. News whose link is already indexed are skipped.
+
+        Args:
+            news_list: The published news.
+            period_start: The start of the period of the newsletter of the news. The news are
+                considered published before any period if None.
+        """
+        period = self.to_period(period_start)
+        for news in news_list:
+            self._insert(normalize_link(str(news.link)), self.signature(news), period)
+
+    def find_duplicate(
+        self, news: News, published_before: dt.datetime | None = None
+    ) -> str | None:
+        """Find a published news that is a near-duplicate of the news.
+
+        Args:
+            news: The news to look for.
+            published_before: Only the news of the newsletters of earlier periods are matched. All
+                the published news are matched if None.
+
+        Returns:
+            The normalized link of the published news, or None if the news was never published.
+        """
+        max_period = (
+            np.iinfo(np.int64).max
+            if published_before is None
+            else self.to_period(published_before)
+        )
+        link = normalize_link(str(news.link))
+        if link in self._link_ids:
+            return link if self._periods[self._link_ids[link]] < max_period else None
+
+        signature = self.signature(news)
+        candidates = {
+            i
+            for band, band_key in enumerate(self._band_keys(signature))
+            for i in self._buckets[band].get(band_key, ())
+        }
+        for i in candidates:
+            if (
+                self._periods[i] < max_period
+                and np.mean(self._signatures[i] == signature) >= self.similarity_threshold
+            ):
+                return self._links[i]
+        return None
+
+    @staticmethod
+    def to_period(period_start: dt.datetime | None) -> int:
+        """Convert the start of a newsletter period to its stored value.
+
+        Args:
+            period_start: The start of the period, or None if unknown.
+
+        Returns:
+            The POSIX timestamp of the start of the period, in seconds.
+        """
+        return UNKNOWN_PERIOD if period_start is None else int(period_start.timestamp())
+
+    def signature(self, news: News) -> NDArray[np.uint32]:
+        """Compute the MinHash signature of the word shingles of the title and content of a news.
+
+        Args:
+            news: The news.
+
+        Returns:
+            The MinHash signature.
+        """
+        text = unicodedata.normalize("NFKC", f"{news.title} {news.content}").casefold()
+        words = re.findall(r"\w+", text)
+        size = self.published_news_index_config.shingle_size
+        shingles = {" ".join(words[i : i + size]) for i in range(max(len(words) - size + 1, 1))}
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode("utf-8")) for shingle in shingles),
+            dtype=np.uint64,
+            count=len(shingles),
+        )
+        permuted_hashes = (self._a * (hashes % MERSENNE_PRIME) + self._b) % MERSENNE_PRIME
+        signature: NDArray[np.uint32] = permuted_hashes.min(axis=1).astype(np.uint32)
+        return signature
+
+    def _band_keys(self, signature: NDArray[np.uint32]) -> list[bytes]:
+        return [band.tobytes() for band in np.split(signature, self.nb_bands)]
+
+    def _insert(self, link: str, signature: NDArray[np.uint32], period: int) -> None:
+        if link in self._link_ids:
+            return
+        i = len(self._links)
+        self._links.append(link)
+        self._link_ids[link] = i
+        self._periods.append(period)
+        self._signatures.append(signature)
+        for band, band_key in enumerate(self._band_keys(signature)):
+            self._buckets[band].setdefault(band_key, []).append(i)
@@ -37,6 +37,7 @@ class News(BaseModel):
     datetime: dt.datetime | None = Field(validation_alias=AliasChoices("datetime", "date"))
     rubric: Annotated[Rubric | None, PlainSerializer(lambda x: x.value if x else None)] = None
     summary: str | None = None
+    see_also: list[Annotated[Url, PlainSerializer(str)]] = []
 
     model_config = ConfigDict(use_enum_values=False, extra="ignore")
 
@@ -111,7 +112,13 @@ class News(BaseModel):
         if self.summary is None or self.title is None:
             error_msg = "The news must have a summary and a title to be converted to markdown."
             raise ValueError(error_msg)
-        return f"### {self.title}\n\n{self.summary}\n\nPour en connaître davantage, nous vous invitons à consulter cet [hyperlien]({self.link})."
+        markdown = f"### {self.title}\n\n{self.summary}\n\nPour en connaître davantage, nous vous invitons à consulter cet [hyperlien]({self.link})."
+        if self.see_also:
+            see_also_links = ", ".join(
+                f"[hyperlien {i + 1}]({link})" for i, link in enumerate(self.see_also)
+            )
+            markdown += f"\n\nVoir aussi: {see_also_links}."
+        return markdown
 
 
 class Newsletter(BaseModel):
@@ -242,3 +249,22 @@ class ScrapingProblem(BaseModel):
     problem_type: Literal["empty", "failed", "no_value"] = Field(
         validation_alias=AliasChoices("type", "problem_type")
     )
+
+
+class NewsSummary(BaseModel):
+    """Schema for a single summary of a batched summarization response."""
+
+    id: str
+    summary: str
+
+    @field_validator("summary")
+    @classmethod
+    def validate_summary(cls, value: str) -> str:
+        """Validate that the summary is properly formatted."""
+        return unicodedata.normalize("NFKC", value.strip())
+
+
+class NewsSummaries(BaseModel):
+    """Schema for the structured response of a batched summarization."""
+
+    summaries: list[NewsSummary]
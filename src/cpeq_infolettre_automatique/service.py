@@ -3,23 +3,27 @@
 import asyncio
 import datetime as dt
 import logging
-from collections.abc import AsyncIterator, Awaitable, Iterable
+from collections.abc import Awaitable, Iterable
 
 from cpeq_infolettre_automatique.config import Relevance
+from cpeq_infolettre_automatique.lexical_filter import LexicalRelevancyFilter
 from cpeq_infolettre_automatique.news_classifier import NewsRelevancyClassifier
+from cpeq_infolettre_automatique.news_clusterer import NewsClusterer
 from cpeq_infolettre_automatique.news_producer import NewsProducer
+from cpeq_infolettre_automatique.published_news_index import PublishedNewsIndex
 from cpeq_infolettre_automatique.repositories import NewsRepository
 from cpeq_infolettre_automatique.schemas import (
     News,
     Newsletter,
 )
+from cpeq_infolettre_automatique.source_priors import SourcePriors
 from cpeq_infolettre_automatique.webscraper_io_client import WebscraperIoClient
 
 
 class Service:
     """Service for the automatic newsletter generation that is called by the API."""
 
-    def __init__(
+    def __init__(  # noqa: PLR0913, PLR0917
         self,
         start_date: dt.datetime,
         end_date: dt.datetime,
@@ -27,6 +31,10 @@ class Service:
         news_repository: NewsRepository,
         news_producer: NewsProducer,
         news_relevancy_classifier: NewsRelevancyClassifier,
+        news_clusterer: NewsClusterer,
+        published_news_index: PublishedNewsIndex,
+        lexical_filter: LexicalRelevancyFilter | None = None,
+        source_priors: SourcePriors | None = None,
     ) -> None:
         """Initialize the service with the repository and the generator."""
         self.start_date = start_date
@@ -35,13 +43,20 @@ class Service:
         self.news_repository = news_repository
         self.news_producer = news_producer
         self.news_relevancy_classifier = news_relevancy_classifier
+        self.news_clusterer = news_clusterer
+        self.published_news_index = published_news_index
+        self.lexical_filter = lexical_filter
+        self.source_priors = source_priors
 
     async def generate_newsletter(
         self,
         *,
         delete_scraping_jobs: bool = True,
     ) -> Newsletter:
-        """Generate the newsletter for the previous whole monday-to-sunday period. Summarization is done concurrently inside 'coroutines'.
+        """Generate the newsletter for the previous whole monday-to-sunday period.
+
+        The relevant news of all the scraping jobs are grouped by story before being summarized, so that
+        each story is summarized only once.
 
         Returns:
             The formatted newsletter.
@@ -50,12 +65,15 @@ class Service:
         job_ids = await self.webscraper_io_client.get_scraping_jobs()
 
         logging.info("Nb Scraping jobs: %s", len(job_ids))
-        scraped_news_coroutines = self._prepare_scraped_news_summarization_coroutines(
+        scraped_news_coroutines = self._prepare_scraped_news_filtering_coroutines(
             self.start_date, self.end_date, job_ids
         )
 
-        summarized_news = await asyncio.gather(*scraped_news_coroutines)
-        flattened_news = [news for news_list in summarized_news for news in news_list]
+        filtered_news = await asyncio.gather(*scraped_news_coroutines)
+        news_to_publish = [news for news_list in filtered_news for news in news_list]
+        stories = await self.news_clusterer.deduplicate(news_to_publish)
+        flattened_news = await self.news_producer.produce_many_news(stories)
+        self.news_producer.log_summary_path_counts()
 
         self.news_repository.create_many_news(flattened_news)
 
@@ -73,6 +91,9 @@ class Service:
             publication_datetime=self.end_date,
         )
         self.news_repository.create_newsletter(newsletter)
+
+        self.published_news_index.add_many(news_to_publish, period_start=self.start_date)
+        self.published_news_index.save()
         return newsletter
 
     async def add_news(self, news: News) -> None:
@@ -85,10 +106,10 @@ class Service:
         news = await self.news_producer.produce_news(news)
         self.news_repository.create_news(news)
 
-    def _prepare_scraped_news_summarization_coroutines(
+    def _prepare_scraped_news_filtering_coroutines(
         self, start_date: dt.datetime, end_date: dt.datetime, job_ids: list[str]
-    ) -> Iterable[Awaitable[Iterable[News]]]:
-        """Prepare the summarization coroutines for concurrent summary generation of the news that are taken from the webscaper.
+    ) -> Iterable[Awaitable[list[News]]]:
+        """Prepare the coroutines for concurrent download and filtering of the news that are taken from the webscaper.
 
         Args:
             start_date: The start datetime of the newsletter.
@@ -96,24 +117,19 @@ class Service:
             job_ids: The IDs of the scraping jobs.
 
         Returns:
-            An iterable of summary generation coroutines to be run.
+            An iterable of download and filtering coroutines to be run.
         """
 
         async def scraped_news_coroutine(job_id: str) -> list[News]:
             all_news = await self.webscraper_io_client.download_scraping_job_data(job_id)
-            filtered_news = self._filter_all_news(
-                all_news, start_date=start_date, end_date=end_date
-            )
-            coroutines = [self.news_producer.produce_news(news) async for news in filtered_news]
-            summarized_news = await asyncio.gather(*coroutines)
-            return summarized_news
+            return await self._filter_all_news(all_news, start_date=start_date, end_date=end_date)
 
         return (scraped_news_coroutine(job_id) for job_id in job_ids)
 
     async def _filter_all_news(
         self, all_news: Iterable[News], start_date: dt.datetime, end_date: dt.datetime
-    ) -> AsyncIterator[News]:
-        """Preprocess the raw news by keeping only news published within start_date and end_date and are relevant.
+    ) -> list[News]:
+        """Preprocess the raw news by keeping only news published within start_date and end_date, not already published in a previous newsletter and relevant.
 
         Args:
             all_news: The raw news data.
@@ -122,10 +138,28 @@ class Service:
 
         Returns: The filtered news data.
         """
-        for news in all_news:
-            if self._news_in_date_range(news, start_date, end_date):  # noqa: SIM102
-                if await self._news_is_relevant(news):
-                    yield news
+        # Published news are dropped before the relevancy classification, so before any embedding.
+        candidate_news = [
+            news
+            for news in all_news
+            if self._news_in_date_range(news, start_date, end_date)
+            and not self._news_is_published(news)
+        ]
+        if self.source_priors is not None:
+            candidate_news = self.source_priors.filter(candidate_news)
+        if self.lexical_filter is not None:
+            candidate_news = self.lexical_filter.filter(candidate_news)
+        relevances = await self.news_relevancy_classifier.predict_many(candidate_news)
+        if self.source_priors is not None:
+            self.source_priors.record_many(candidate_news, relevances)
+        relevant_news = []
+        for news, relevance in zip(candidate_news, relevances, strict=True):
+            if relevance == Relevance.AUTRE:
+                msg = f"The News with title {news.title} is not relevant."
+                logging.warning(msg)
+            else:
+                relevant_news.append(news)
+        return relevant_news
 
     @staticmethod
     def _news_in_date_range(news: News, start_date: dt.datetime, end_date: dt.datetime) -> bool:
@@ -149,18 +183,20 @@ class Service:
             return False
         return True
 
-    async def _news_is_relevant(self, news: News) -> bool:
-        """Check if the news is relevant.
+    def _news_is_published(self, news: News) -> bool:
+        """Check if the news, or a near-duplicate of it, was published in the newsletter of a previous period.
 
         Args:
             news: The news data to check.
 
         Returns:
-            True if the news is relevant, False otherwise.
+            True if the news was already published, False otherwise.
         """
-        relevance = await self.news_relevancy_classifier.predict(news)
-        if relevance == Relevance.AUTRE:
-            msg = f"The News with title {news.title} is not relevant."
+        published_link = self.published_news_index.find_duplicate(
+            news, published_before=self.start_date
+        )
+        if published_link is not None:
+            msg = f"The News with title {news.title} was already published at {published_link}."
             logging.warning(msg)
-            return False
-        return True
+            return True
+        return False
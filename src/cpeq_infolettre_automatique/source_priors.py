@@ -0,0 +1,173 @@
+"""Persistent relevance rates of the news sources, learned from the previous classifications."""
+
+import logging
+import sqlite3
+from collections import Counter
+from collections.abc import Sequence
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from cpeq_infolettre_automatique.config import Relevance, SourcePriorsConfig
+from cpeq_infolettre_automatique.schemas import News
+from cpeq_infolettre_automatique.utils import normalize_link
+
+
+class SourcePriors:
+    """Relevance rates of the domains and URL prefixes of the previously classified news.
+
+    Note:
+        A news is skipped without being classified if the most specific section prefix of its link
+        with at least `min_observations` classified news has a relevance rate of at most
+        `max_relevance_rate`. The domain alone is only used as a fallback when `domain_fallback` is
+        enabled. A fraction `audit_rate` of these news is still classified, so that the rates follow
+        the sections whose content changes. Each link is recorded once, even if its period is
+        processed again. The rates are always recorded, but news are only skipped when the priors
+        are enabled.
+    """
+
+    def __init__(self, source_priors_config: SourcePriorsConfig) -> None:
+        """Initialize the priors.
+
+        Args:
+            source_priors_config: The source priors configuration.
+        """
+        self.source_priors_config = source_priors_config
+        self.connection: sqlite3.Connection | None = None
+        self.generator = np.random.default_rng()
+
+    @property
+    def max_depth(self) -> int:
+        """Get the maximal number of path segments of a prefix."""
+        return self.source_priors_config.max_depth
+
+    def setup(self) -> None:
+        """Open the priors database, creating it if needed."""
+        path = self.source_priors_config.path
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute(
+                """CREATE TABLE IF NOT EXISTS prefixes (
+                    prefix TEXT PRIMARY KEY,
+                    nb_news INTEGER NOT NULL,
+                    nb_relevant INTEGER NOT NULL
+                )"""
+            )
+            self.connection.execute("CREATE TABLE IF NOT EXISTS links (link TEXT PRIMARY KEY)")
+
+    def teardown(self) -> None:
+        """Close the priors database."""
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def prefixes(self, news: News) -> list[str]:
+        """Get the prefixes of the link of a news, from the domain to the most specific one.
+
+        Args:
+            news: The news.
+
+        Returns:
+            The domain of the link, followed by its first `max_depth` path segments one at a time.
+        """
+        parts = urlsplit(normalize_link(str(news.link)))
+        segments = [segment for segment in parts.path.split("/") if segment][: self.max_depth]
+        return ["/".join([parts.netloc, *segments[:depth]]) for depth in range(len(segments) + 1)]
+
+    def relevance_rate(self, news: News) -> float | None:
+        """Get the relevance rate of the most specific prefix of the link of a news with enough observations.
+
+        Args:
+            news: The news.
+
+        Returns:
+            The fraction of relevant news of the prefix, or None if no section prefix, or domain if
+            `domain_fallback` is enabled, has enough observations.
+        """
+        prefixes = self.prefixes(news)
+        if not self.source_priors_config.domain_fallback:
+            prefixes = prefixes[1:]
+        if not prefixes:
+            return None
+        placeholders = ", ".join("?" * len(prefixes))
+        rows = dict(
+            self._get_connection().execute(
+                "SELECT prefix, CAST(nb_relevant AS REAL) / nb_news FROM prefixes "  # noqa: S608
+                f"WHERE nb_news >= ? AND prefix IN ({placeholders})",
+                (self.source_priors_config.min_observations, *prefixes),
+            )
+        )
+        return next((rows[prefix] for prefix in reversed(prefixes) if prefix in rows), None)
+
+    def filter(self, news_list: Sequence[News]) -> list[News]:
+        """Skip the news of the sources that are almost never relevant, except an audit sample.
+
+        Args:
+            news_list: The news to filter.
+
+        Returns:
+            The news to classify, in their original order.
+        """
+        if not self.source_priors_config.enabled:
+            return list(news_list)
+        news_to_classify = []
+        for news in news_list:
+            rate = self.relevance_rate(news)
+            if (
+                rate is None
+                or rate > self.source_priors_config.max_relevance_rate
+                or self.generator.random() < self.source_priors_config.audit_rate
+            ):
+                news_to_classify.append(news)
+        if len(news_to_classify) < len(news_list):
+            logging.info(
+                "The source priors skipped %s of %s news.",
+                len(news_list) - len(news_to_classify),
+                len(news_list),
+            )
+        return news_to_classify
+
+    def record_many(self, news_list: Sequence[News], relevances: Sequence[Relevance]) -> None:
+        """Record the relevance of classified news in the rates of the prefixes of their links.
+
+        Note:
+            The links already recorded, by a previous call or earlier in the list, are ignored.
+
+        Args:
+            news_list: The classified news.
+            relevances: The relevance of each news.
+        """
+        connection = self._get_connection()
+        with connection:
+            # A link is only counted if it is inserted, that is if it was never recorded.
+            new_news_list = [
+                (news, relevance)
+                for news, relevance in zip(news_list, relevances, strict=True)
+                if connection.execute(
+                    "INSERT OR IGNORE INTO links VALUES (?)", (normalize_link(str(news.link)),)
+                ).rowcount
+            ]
+            counts: Counter[tuple[str, bool]] = Counter(
+                (prefix, relevance == Relevance.PERTINENT)
+                for news, relevance in new_news_list
+                for prefix in self.prefixes(news)
+            )
+            increments: dict[str, tuple[int, int]] = {}
+            for (prefix, is_relevant), count in counts.items():
+                nb_news, nb_relevant = increments.get(prefix, (0, 0))
+                increments[prefix] = (nb_news + count, nb_relevant + count * is_relevant)
+            connection.executemany(
+                """INSERT INTO prefixes VALUES (?, ?, ?) ON CONFLICT (prefix) DO UPDATE SET
+                    nb_news = nb_news + excluded.nb_news,
+                    nb_relevant = nb_relevant + excluded.nb_relevant""",
+                [(prefix, *increment) for prefix, increment in increments.items()],
+            )
+
+    def _get_connection(self) -> sqlite3.Connection:
+        if self.connection is None:
+            error_msg = "The source priors must be set up before being used."
+            raise RuntimeError(error_msg)
+        return self.connection
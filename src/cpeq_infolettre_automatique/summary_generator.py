@@ -1,13 +1,42 @@
 """Implement the news summary generator."""
 
+import asyncio
+import json
+import logging
+from collections import defaultdict
 from inspect import cleandoc
+from itertools import chain, zip_longest
+from types import MappingProxyType
+from typing import Any
+
+import openai
+from pydantic import ValidationError
 
 from cpeq_infolettre_automatique.completion_model import CompletionModel
 from cpeq_infolettre_automatique.config import SummaryGeneratorConfig, VectorNames
-from cpeq_infolettre_automatique.schemas import News
+from cpeq_infolettre_automatique.schemas import News, NewsSummaries
 from cpeq_infolettre_automatique.vectorstore import Vectorstore
 
 
+BATCH_SUMMARIES_SCHEMA_NAME = "news_summaries"
+BATCH_SUMMARIES_SCHEMA: MappingProxyType[str, Any] = MappingProxyType({
+    "type": "object",
+    "properties": {
+        "summaries": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {"id": {"type": "string"}, "summary": {"type": "string"}},
+                "required": ["id", "summary"],
+                "additionalProperties": False,
+            },
+        }
+    },
+    "required": ["summaries"],
+    "additionalProperties": False,
+})
+
+
 class SummaryGenerator:
     """Service for summarizing news articles."""
 
@@ -27,6 +56,11 @@ class SummaryGenerator:
         """Return the vector name from the configuration."""
         return self.summary_generator_config.vector_name
 
+    @property
+    def batch_size(self) -> int:
+        """Return the maximum number of news summarized in a single completion."""
+        return self.summary_generator_config.batch_size
+
     async def generate(self, news_to_summarize: News) -> str:
         """Summarize the given news based on reference news exemples.
 
@@ -49,6 +83,137 @@ class SummaryGenerator:
         summary = await self.generate_with_similar_news(news_to_summarize, similar_news)
         return summary
 
+    async def generate_many(self, news_to_summarize: list[News]) -> list[str]:
+        """Summarize many news, packing news with similar exemples in a single completion.
+
+        Notes:
+            News are grouped by the rubric of their most similar reference news, and each group is
+            split in batches of at most `batch_size` news. Each batch shares a single system prompt
+            and is summarized in one completion returning a JSON document that maps the news ids to
+            their summaries. News missing from or invalid in the response are summarized
+            individually.
+
+        Args:
+            news_to_summarize: The news to summarize.
+
+        Returns:
+            The summaries of the news, in the same order as the given news.
+
+        Raises:
+            ValueError: If all reference news do not have a summary.
+        """
+        if not news_to_summarize:
+            return []
+        if self.batch_size == 1:
+            return list(await asyncio.gather(*(self.generate(news) for news in news_to_summarize)))
+
+        similar_news_per_news = await self.vectorstore.search_similar_news_many(
+            news_to_summarize, vector_name=self.vector_name
+        )
+        if any(news.summary is None for news in chain.from_iterable(similar_news_per_news)):
+            error_msg = "All reference news must have a summary as an exemple."
+            raise ValueError(error_msg)
+
+        groups: dict[str | None, list[int]] = defaultdict(list)
+        for i, similar_news in enumerate(similar_news_per_news):
+            rubric = similar_news[0].rubric if similar_news else None
+            groups[rubric.value if rubric is not None else None].append(i)
+        batches = [
+            indexes[start : start + self.batch_size]
+            for indexes in groups.values()
+            for start in range(0, len(indexes), self.batch_size)
+        ]
+
+        summaries: dict[int, str] = {}
+        for batch_summaries in await asyncio.gather(
+            *(
+                self.generate_batch(
+                    {i: news_to_summarize[i] for i in batch},
+                    {i: similar_news_per_news[i] for i in batch},
+                )
+                for batch in batches
+            )
+        ):
+            summaries.update(batch_summaries)
+
+        return [summaries[i] for i in range(len(news_to_summarize))]
+
+    async def generate_batch(
+        self, news_to_summarize: dict[int, News], similar_news: dict[int, list[News]]
+    ) -> dict[int, str]:
+        """Summarize a batch of news in a single completion.
+
+        Args:
+            news_to_summarize: The news to summarize, indexed by their id.
+            similar_news: The reference news exemples of each news to summarize.
+
+        Returns:
+            The summaries of the news, indexed by their id.
+        """
+        if len(news_to_summarize) == 1:
+            ((i, news),) = news_to_summarize.items()
+            return {i: await self.generate_with_similar_news(news, similar_news[i])}
+
+        system_prompt = self.format_batch_system_prompt(
+            self.merge_reference_news(list(similar_news.values()))
+        )
+        user_message = json.dumps(
+            [{"id": str(i), "content": news.content} for i, news in news_to_summarize.items()],
+            ensure_ascii=False,
+        )
+        summaries: dict[int, str] = {}
+        try:
+            response = await self.completion_model.complete_structured_message(
+                user_message=user_message,
+                system_prompt=system_prompt,
+                response_schema=dict(BATCH_SUMMARIES_SCHEMA),
+                schema_name=BATCH_SUMMARIES_SCHEMA_NAME,
+            )
+            for news_summary in NewsSummaries.model_validate_json(response).summaries:
+                is_known_id = (
+                    news_summary.id.isdigit() and int(news_summary.id) in news_to_summarize
+                )
+                if is_known_id and news_summary.summary:
+                    summaries[int(news_summary.id)] = news_summary.summary
+        except (ValidationError, ValueError):
+            logging.exception("Invalid response for a batch of %s news.", len(news_to_summarize))
+        except openai.APIError:
+            # Models without strict structured outputs reject the response schema.
+            logging.exception("Failed completion for a batch of %s news.", len(news_to_summarize))
+
+        missing_ids = [i for i in news_to_summarize if i not in summaries]
+        if missing_ids:
+            logging.warning("Retrying %s news individually.", len(missing_ids))
+            retried_summaries = await asyncio.gather(
+                *(
+                    self.generate_with_similar_news(news_to_summarize[i], similar_news[i])
+                    for i in missing_ids
+                )
+            )
+            summaries.update(zip(missing_ids, retried_summaries, strict=True))
+        return summaries
+
+    @staticmethod
+    def merge_reference_news(similar_news: list[list[News]]) -> list[News]:
+        """Merge the reference news exemples of many news into a single list of exemples.
+
+        Notes:
+            Exemples are interleaved by rank so the most similar exemples of every news are kept
+            first, duplicates are removed, and the list is as long as the longest list of exemples.
+
+        Args:
+            similar_news: The reference news exemples of each news, sorted by decreasing similarity.
+
+        Returns:
+            The merged reference news exemples.
+        """
+        max_nb_exemples = max((len(news_list) for news_list in similar_news), default=0)
+        merged_news: dict[str, News] = {}
+        for news in chain.from_iterable(zip_longest(*similar_news)):
+            if news is not None:
+                merged_news.setdefault(str(news.link) + news.title, news)
+        return list(merged_news.values())[:max_nb_exemples]
+
     async def generate_with_similar_news(
         self, news_to_summarize: News, similar_news: list[News]
     ) -> str:
@@ -76,15 +241,7 @@ class SummaryGenerator:
 
         Returns: The formatted prompt.
         """
-        filtered_reference_news = [
-            reference_news
-            for reference_news in reference_news
-            if reference_news.summary and reference_news.content
-        ]
-        exemples_template = "\n\n".join([
-            f"""## Exemple {i + 1}\n\n### Contenu: {exemple.content}\n\n### Résumé: {exemple.summary}"""
-            for i, exemple in enumerate(filtered_reference_news)
-        ])
+        exemples_template = SummaryGenerator.format_exemples(reference_news)
 
         system_prompt = cleandoc("""
             Utilises les articles suivants pour t'inspirer afin de résumer un article. Tu auras accès au contenu des articles d'exemple, ainsi que leurs résumés respectifs.
@@ -96,3 +253,45 @@ class SummaryGenerator:
             exemples_template=exemples_template
         )
         return system_prompt
+
+    @staticmethod
+    def format_batch_system_prompt(reference_news: list[News]) -> str:
+        """Format the prompt for the OpenAI API when summarizing many news in a single completion.
+
+        Args:
+            reference_news: The reference news exemples used to create a prompt for the summarization.
+
+        Returns: The formatted prompt.
+        """
+        exemples_template = SummaryGenerator.format_exemples(reference_news)
+
+        system_prompt = cleandoc("""
+            Utilises les articles suivants pour t'inspirer afin de résumer des articles. Tu auras accès au contenu des articles d'exemple, ainsi que leurs résumés respectifs.
+            # Début des exemples:
+
+            {exemples_template}
+
+            Tu reçeveras en message une liste JSON d'articles à résumer, chacun avec un identifiant "id" et un contenu "content". Résumes chaque article indépendamment des autres, et retournes pour chaque article son identifiant et le résumé de l'article, sans préfixe avec aucune autre information.""").format(
+            exemples_template=exemples_template
+        )
+        return system_prompt
+
+    @staticmethod
+    def format_exemples(reference_news: list[News]) -> str:
+        """Format the reference news exemples of the prompt.
+
+        Args:
+            reference_news: The reference news exemples.
+
+        Returns: The formatted exemples.
+        """
+        filtered_reference_news = [
+            reference_news
+            for reference_news in reference_news
+            if reference_news.summary and reference_news.content
+        ]
+        exemples_template = "\n\n".join([
+            f"""## Exemple {i + 1}\n\n### Contenu: {exemple.content}\n\n### Résumé: {exemple.summary}"""
+            for i, exemple in enumerate(filtered_reference_news)
+        ])
+        return exemples_template
@@ -2,6 +2,7 @@
 
 import datetime as dt
 from typing import cast
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 from zoneinfo import ZoneInfo
 
 from O365.drive import File, Folder
@@ -43,6 +44,36 @@ def get_current_montreal_datetime() -> dt.datetime:
     return dt.datetime.now(tz=timezone)
 
 
+TRACKING_QUERY_PARAMETERS = frozenset({"fbclid", "gclid", "mc_cid", "mc_eid", "ref"})
+
+
+def normalize_link(link: str) -> str:
+    """Normalize a link so that different URLs of the same article compare equal.
+
+    Notes:
+        The scheme and host are lowercased, the "www." prefix, the fragment, the trailing slash of
+        the path and the tracking query parameters are removed, and the remaining query
+        parameters are sorted.
+
+    Args:
+        link: The link to normalize.
+
+    Returns:
+        The normalized link.
+    """
+    parts = urlsplit(link.strip())
+    host = parts.netloc.lower().removeprefix("www.")
+    path = parts.path.rstrip("/")
+    query = urlencode(
+        sorted(
+            (key, value)
+            for key, value in parse_qsl(parts.query, keep_blank_values=True)
+            if key not in TRACKING_QUERY_PARAMETERS and not key.startswith("utm_")
+        )
+    )
+    return urlunsplit((parts.scheme.lower(), host, path, query, ""))
+
+
 def get_or_create_subfolder(parent_folder: Folder, folder_name: str) -> Folder:
     """Returns the subfolder with name $folder_name from the $parent_folder, creating it before if not found.
 
@@ -0,0 +1,175 @@
+"""Snapshots of the reference vectors of a collection, memory-mapped when loaded."""
+
+import hashlib
+import json
+import logging
+import tempfile
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from numpy.typing import NDArray
+
+from cpeq_infolettre_automatique.config import VectorNames, VectorSnapshotConfig
+
+
+SNAPSHOT_FORMAT_VERSION = 2
+
+
+class VectorSnapshotStore:
+    """Store of snapshots of the reference vectors, one per collection and named vector.
+
+    Note:
+        A snapshot is a `.npy` float32 matrix and a `.json` sidecar holding the ids, the property
+        columns and the fingerprint of the collection. The matrix is opened with `mmap_mode="r"`,
+        so loading it does not read the vectors and processes loading the same snapshot share its
+        pages. A snapshot is stale when the fingerprint of the ids and last update times of the
+        objects of the collection changed.
+    """
+
+    def __init__(self, vector_snapshot_config: VectorSnapshotConfig) -> None:
+        """Initialize the store.
+
+        Args:
+            vector_snapshot_config: The vector snapshot configuration.
+        """
+        self.vector_snapshot_config = vector_snapshot_config
+
+    def paths(self, collection_name: str, vector_name: VectorNames) -> tuple[Path, Path]:
+        """Get the paths of the matrix and of the sidecar of a snapshot.
+
+        Args:
+            collection_name: The name of the collection.
+            vector_name: The named vector.
+
+        Returns:
+            The path of the `.npy` matrix and the path of the `.json` sidecar.
+        """
+        directory = Path(self.vector_snapshot_config.directory)
+        stem = f"{collection_name}.{vector_name.value}"
+        return directory / f"{stem}.npy", directory / f"{stem}.json"
+
+    def load(
+        self,
+        collection_name: str,
+        vector_name: VectorNames,
+        fingerprint: str,
+        property_names: Sequence[str],
+    ) -> tuple[list[str], NDArray[np.float32], dict[str, list[Any]]] | None:
+        """Load a snapshot, if it is up to date and has the properties.
+
+        Args:
+            collection_name: The name of the collection.
+            vector_name: The named vector.
+            fingerprint: The current fingerprint of the objects of the collection.
+            property_names: The properties to load.
+
+        Returns:
+            The ids, the memory-mapped vectors matrix and the property columns, or None if there is
+            no usable snapshot.
+        """
+        vectors_path, metadata_path = self.paths(collection_name, vector_name)
+        if not metadata_path.exists() or not vectors_path.exists():
+            return None
+        metadata = json.loads(metadata_path.read_text(encoding="utf-8"))
+        if (
+            metadata.get("version") != SNAPSHOT_FORMAT_VERSION
+            or metadata["fingerprint"] != fingerprint
+            or not set(property_names).issubset(metadata["properties"])
+        ):
+            logging.info("The vector snapshot %s is stale.", vectors_path)
+            return None
+        vectors: NDArray[np.float32] = np.load(vectors_path, mmap_mode="r", allow_pickle=False)
+        if vectors.shape[0] != len(metadata["ids"]):
+            logging.warning("The vector snapshot %s is inconsistent, it is ignored.", vectors_path)
+            return None
+        properties = {name: metadata["properties"][name] for name in property_names}
+        return metadata["ids"], vectors, properties
+
+    def save(
+        self,
+        collection_name: str,
+        vector_name: VectorNames,
+        ids: list[str],
+        vectors: NDArray[np.float32],
+        properties: dict[str, list[Any]],
+        fingerprint: str,
+    ) -> None:
+        """Save a snapshot, replacing the previous one.
+
+        Args:
+            collection_name: The name of the collection.
+            vector_name: The named vector.
+            ids: The ids of the objects.
+            vectors: The vectors matrix, one row per object.
+            properties: The property columns of the objects.
+            fingerprint: The fingerprint of the objects, as computed by `fingerprint`.
+        """
+        vectors_path, metadata_path = self.paths(collection_name, vector_name)
+        vectors_path.parent.mkdir(parents=True, exist_ok=True)
+        metadata: dict[str, Any] = {
+            "version": SNAPSHOT_FORMAT_VERSION,
+            "collection_name": collection_name,
+            "vector_name": vector_name.value,
+            "nb_objects": len(ids),
+            "fingerprint": fingerprint,
+            "ids": ids,
+            "properties": properties,
+        }
+        # The temporary files have unique names, so that processes saving the same snapshot do
+        # not write to the same file. The sidecar is replaced last: a snapshot is only loaded once
+        # both files are written.
+        temporary_paths: list[Path] = []
+        try:
+            with tempfile.NamedTemporaryFile(
+                dir=vectors_path.parent,
+                prefix=f"{vectors_path.stem}.",
+                suffix=".npy",
+                delete=False,
+            ) as vectors_file:
+                temporary_paths.append(Path(vectors_file.name))
+                np.save(vectors_file, np.asarray(vectors, dtype=np.float32))
+            with tempfile.NamedTemporaryFile(
+                "w",
+                encoding="utf-8",
+                dir=metadata_path.parent,
+                prefix=f"{metadata_path.stem}.",
+                suffix=".json",
+                delete=False,
+            ) as metadata_file:
+                temporary_paths.append(Path(metadata_file.name))
+                json.dump(metadata, metadata_file, ensure_ascii=False, default=str)
+            metadata_path.unlink(missing_ok=True)
+            temporary_paths[0].replace(vectors_path)
+            temporary_paths[1].replace(metadata_path)
+        finally:
+            for temporary_path in temporary_paths:
+                temporary_path.unlink(missing_ok=True)
+
+    def remove(self, collection_name: str) -> None:
+        """Remove the snapshots of all the named vectors of a collection.
+
+        Args:
+            collection_name: The name of the collection.
+        """
+        for vector_name in VectorNames:
+            for path in self.paths(collection_name, vector_name):
+                path.unlink(missing_ok=True)
+
+    @staticmethod
+    def fingerprint(ids: Sequence[str], update_times: Sequence[Any]) -> str:
+        """Compute the fingerprint of the objects of a collection.
+
+        Args:
+            ids: The ids of the objects.
+            update_times: The last update time of each object.
+
+        Returns:
+            The number of objects and the hash of their sorted ids and last update times.
+        """
+        versions = sorted(
+            f"{id_} {update_time}" for id_, update_time in zip(ids, update_times, strict=True)
+        )
+        versions_hash = hashlib.sha256("\n".join(versions).encode("utf-8")).hexdigest()
+        return f"{len(ids)}-{versions_hash[:16]}"
@@ -1,20 +1,34 @@
 """Client module for openAI API interaction."""
 
+import asyncio
 import datetime as dt
+import functools
 import logging
+import threading
+import time
 import uuid
-from collections.abc import Sequence
-from typing import TypedDict
+from collections.abc import Callable, Sequence
+from concurrent.futures import Executor
+from typing import Any, NamedTuple, TypedDict, TypeVar
 
+import numpy as np
 import weaviate
 import weaviate.classes as wvc
+from numpy.typing import NDArray
 from pydantic import ValidationError
 
 from cpeq_infolettre_automatique.config import Rubric, VectorNames, VectorstoreConfig
-from cpeq_infolettre_automatique.embedding_model import EmbeddingModel
+from cpeq_infolettre_automatique.embedding_model import (
+    Embedding,
+    EmbeddingMatrix,
+    EmbeddingModel,
+)
 from cpeq_infolettre_automatique.schemas import News
+from cpeq_infolettre_automatique.vector_snapshot import VectorSnapshotStore
 
 
+T = TypeVar("T")
+
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
@@ -33,7 +47,101 @@ class ReferenceNewsType(TypedDict):
     summary: str
 
 
-class Vectorstore:
+class SearchHits(NamedTuple):
+    """The results of a search, best first, as parallel columns.
+
+    Note:
+        The properties are the raw properties of the retrieved objects, one column per property.
+        They are only validated as News by `to_news`, which requires all the properties to have
+        been retrieved.
+    """
+
+    ids: list[str]
+    scores: NDArray[np.float32]
+    properties: dict[str, list[Any]]
+
+    def to_news(self) -> list[News]:
+        """Validate the retrieved objects as News, skipping the invalid ones.
+
+        Returns:
+            The retrieved news.
+        """
+        news, _ = validate_news_columns(self.properties)
+        return news
+
+
+class ReferenceVectors(NamedTuple):
+    """The reference news of a collection with one of their named vectors, as parallel columns.
+
+    Note:
+        The rows of the vectors matrix are in the order of the ids and of the property columns.
+        The properties are only validated as News by `to_news`.
+    """
+
+    ids: list[str]
+    vectors: NDArray[np.float32]
+    properties: dict[str, list[Any]]
+
+    def to_news(self) -> list[News]:
+        """Validate the reference objects as News, skipping the invalid ones.
+
+        Returns:
+            The reference news.
+        """
+        news, _ = self.validate()
+        return news
+
+    def validate(self) -> tuple[list[News], "ReferenceVectors"]:
+        """Validate the reference objects as News, dropping the rows of the invalid ones.
+
+        Returns:
+            The valid reference news, and the reference vectors of these news only, in the same
+            order.
+        """
+        news, positions = validate_news_columns(self.properties)
+        if len(positions) == len(self.ids):
+            return news, self
+        return news, ReferenceVectors(
+            ids=[self.ids[position] for position in positions],
+            vectors=self.vectors[positions],
+            properties={
+                name: [column[position] for position in positions]
+                for name, column in self.properties.items()
+            },
+        )
+
+
+def validate_news_columns(properties: dict[str, list[Any]]) -> tuple[list[News], list[int]]:
+    """Validate columns of raw properties as News, logging and skipping the invalid rows.
+
+    Args:
+        properties: The raw properties, one column per property.
+
+    Returns:
+        The news of the valid rows, and the positions of these rows.
+    """
+    names = list(properties)
+    news: list[News] = []
+    positions: list[int] = []
+    for position, values in enumerate(zip(*properties.values(), strict=True)):
+        try:
+            news.append(News.model_validate(dict(zip(names, values, strict=True))))
+        except ValidationError:
+            logging.exception("Error validating object %s", values)
+        else:
+            positions.append(position)
+    return news, positions
+
+
+class CollectionMetadata(NamedTuple):
+    """The handle and the number of objects of the Weaviate collection."""
+
+    collection: weaviate.collections.Collection
+    nb_objects: int
+    expiration: float
+
+
+class Vectorstore:  # noqa: PLR0904
     """Handles vector storage and retrieval using embeddings."""
 
     def __init__(
@@ -41,6 +149,8 @@ class Vectorstore:
         embedding_model: EmbeddingModel,
         vectorstore_client: weaviate.WeaviateClient,
         vectorstore_config: VectorstoreConfig,
+        executor: Executor | None = None,
+        vector_snapshot_store: VectorSnapshotStore | None = None,
     ) -> None:
         """Initialize the Vectorstore with the embedding model and the vectorstore client.
 
@@ -48,10 +158,23 @@ class Vectorstore:
             embedding_model: The embedding model to use.
             vectorstore_client: The vectorstore client to use.
             vectorstore_config: The vectorstore configuration.
+            executor: The executor running the blocking queries of async methods. The default
+                executor of the event loop is used if None.
+            vector_snapshot_store: The store of snapshots of the reference vectors. The vectors
+                are always read from the collection if None.
         """
         self.embedding_model = embedding_model
         self.vectorstore_client = vectorstore_client
         self.vectorstore_config = vectorstore_config
+        self.executor = executor
+        self.vector_snapshot_store = vector_snapshot_store
+        self._queries_semaphore = asyncio.Semaphore(self.max_concurrent_queries)
+        self._collection_metadata: CollectionMetadata | None = None
+        self._collection_metadata_lock = threading.Lock()
+        self._reference_vectors: dict[VectorNames, ReferenceVectors] = {}
+        self._reference_vectors_metadata: CollectionMetadata | None = None
+        self._collection_fingerprint = ""
+        self._collection_fingerprint_metadata: CollectionMetadata | None = None
 
     @property
     def collection_name(self) -> str:
@@ -73,6 +196,70 @@ class Vectorstore:
         """Get the minimal score."""
         return self.vectorstore_config.minimal_score
 
+    @property
+    def max_concurrent_queries(self) -> int:
+        """Get the maximum number of queries running or waiting in the executor at once."""
+        return self.vectorstore_config.max_concurrent_queries
+
+    def get_collection_metadata(self) -> CollectionMetadata:
+        """Get the collection handle and number of objects, refreshing them once expired.
+
+        Note:
+            Counting the objects runs an aggregate query, so it is only done when the cached
+            metadata expires or is invalidated.
+
+        Returns:
+            The collection metadata.
+        """
+        with self._collection_metadata_lock:
+            if (
+                self._collection_metadata is None
+                or self._collection_metadata.expiration <= time.monotonic()
+            ):
+                collection = self.vectorstore_client.collections.get(self.collection_name)
+                self._collection_metadata = CollectionMetadata(
+                    collection=collection,
+                    nb_objects=len(collection),
+                    expiration=time.monotonic() + self.vectorstore_config.metadata_ttl_seconds,
+                )
+            return self._collection_metadata
+
+    def invalidate_collection_metadata(self) -> None:
+        """Invalidate the cached collection metadata and release the vectors read from the collection.
+
+        Must be called after writing to the collection.
+        """
+        with self._collection_metadata_lock:
+            self._collection_metadata = None
+        self._reference_vectors = {}
+        self._reference_vectors_metadata = None
+        self._collection_fingerprint_metadata = None
+
+    def get_collection_fingerprint(self) -> str:
+        """Get the fingerprint of the ids and last update times of the objects of the collection.
+
+        Note:
+            The ids and last update times are streamed without the vectors and the properties.
+            The fingerprint is kept until the collection metadata expires or is invalidated.
+
+        Returns:
+            The fingerprint, which changes whenever an object is added, removed or updated.
+        """
+        collection_metadata = self.get_collection_metadata()
+        if self._collection_fingerprint_metadata is not collection_metadata:
+            ids: list[str] = []
+            update_times: list[Any] = []
+            for object_ in collection_metadata.collection.iterator(
+                include_vector=False,
+                return_properties=[],
+                return_metadata=wvc.query.MetadataQuery(last_update_time=True),
+            ):
+                ids.append(str(object_.uuid))
+                update_times.append(object_.metadata.last_update_time)
+            self._collection_fingerprint = VectorSnapshotStore.fingerprint(ids, update_times)
+            self._collection_fingerprint_metadata = collection_metadata
+        return self._collection_fingerprint
+
     async def search_similar_news(
         self,
         news: News,
@@ -93,15 +280,101 @@ class Vectorstore:
         news_retrieved = await self.hybrid_search(query, embeddings, vector_name, ids_to_keep)
         return [news_item for news_item, _ in news_retrieved]
 
+    async def search_similar_news_many(
+        self,
+        news_list: Sequence[News],
+        vector_name: VectorNames,
+        ids_to_keep: Sequence[str | uuid.UUID] | None = None,
+    ) -> list[list[News]]:
+        """Search for the news similar to each news in a single batch of queries.
+
+        Args:
+            news_list: The news to search for.
+            vector_name: The named vector to search with.
+            ids_to_keep: The ids to keep in the search results.
+
+        Returns:
+            The list of similar news of each news.
+        """
+        queries = [self.create_query(news, vector_name=vector_name) for news in news_list]
+        embeddings = await self.embedding_model.embed_many(queries)
+        search_hits = await self.hybrid_search_many(queries, embeddings, vector_name, ids_to_keep)
+        return [hits.to_news() for hits in search_hits]
+
     async def hybrid_search(
         self,
         query: str,
-        embeddings: list[float],
+        embeddings: Embedding,
         vector_name: VectorNames,
         ids_to_keep: Sequence[str | uuid.UUID] | None = None,
     ) -> list[tuple[News, float]]:
         """Search for similar news in the vectorstore.
 
+        Note:
+            The Weaviate client is synchronous, so the query runs in the executor to avoid blocking
+            the event loop. At most `max_concurrent_queries` queries are submitted at once.
+
+        Args:
+            query: The query to search for.
+            embeddings: The embeddings of the query.
+            ids_to_keep: The ids to keep in the search results.
+
+        Returns:
+            The list of similar news with their scores.
+        """
+        return await self._run_query(
+            self.hybrid_search_sync, query, embeddings, vector_name, ids_to_keep
+        )
+
+    async def hybrid_search_many(
+        self,
+        queries: Sequence[str],
+        embeddings: EmbeddingMatrix,
+        vector_name: VectorNames,
+        ids_to_keep: Sequence[str | uuid.UUID] | None = None,
+        return_properties: Sequence[str] | None = None,
+    ) -> list[SearchHits]:
+        """Search for the news similar to each query.
+
+        Note:
+            Weaviate has no multi-query hybrid search, so the queries run concurrently in the
+            executor, and their hits are returned as columns without validating them as News.
+
+        Args:
+            queries: The queries to search for.
+            embeddings: The embeddings matrix, one row per query.
+            vector_name: The named vector to search with.
+            ids_to_keep: The ids to keep in the search results.
+            return_properties: The properties to retrieve. All the properties if None.
+
+        Returns:
+            The hits of each query.
+        """
+        return list(
+            await asyncio.gather(
+                *(
+                    self._run_query(
+                        self.hybrid_search_hits_sync,
+                        query,
+                        embedding,
+                        vector_name,
+                        ids_to_keep,
+                        return_properties,
+                    )
+                    for query, embedding in zip(queries, embeddings, strict=True)
+                )
+            )
+        )
+
+    def hybrid_search_sync(
+        self,
+        query: str,
+        embeddings: Embedding,
+        vector_name: VectorNames,
+        ids_to_keep: Sequence[str | uuid.UUID] | None = None,
+    ) -> list[tuple[News, float]]:
+        """Search for similar news in the vectorstore, blocking until the query completes.
+
         Args:
             query: The query to search for.
             embeddings: The embeddings of the query.
@@ -110,28 +383,81 @@ class Vectorstore:
         Returns:
             The list of similar news with their scores.
         """
-        collection = self.vectorstore_client.collections.get(self.collection_name)
+        objects = self._query_hybrid(query, embeddings, vector_name, ids_to_keep)
 
-        objects = collection.query.hybrid(
+        news_retrieved: list[tuple[News, float]] = [
+            (News.model_validate(obj.properties), obj.metadata.score)
+            for obj in objects
+            if obj.metadata.score is not None and obj.metadata.score > self.minimal_score
+        ]
+
+        return news_retrieved
+
+    def hybrid_search_hits_sync(
+        self,
+        query: str,
+        embeddings: Embedding,
+        vector_name: VectorNames,
+        ids_to_keep: Sequence[str | uuid.UUID] | None = None,
+        return_properties: Sequence[str] | None = None,
+    ) -> SearchHits:
+        """Search for similar news in the vectorstore, returning the hits as columns.
+
+        Args:
+            query: The query to search for.
+            embeddings: The embeddings of the query.
+            ids_to_keep: The ids to keep in the search results.
+            return_properties: The properties to retrieve. All the properties if None.
+
+        Returns:
+            The hits of the query.
+        """
+        property_names = list(return_properties or ReferenceNewsType.__annotations__)
+        objects = [
+            obj
+            for obj in self._query_hybrid(
+                query, embeddings, vector_name, ids_to_keep, property_names
+            )
+            if obj.metadata.score is not None and obj.metadata.score > self.minimal_score
+        ]
+        return SearchHits(
+            ids=[str(obj.uuid) for obj in objects],
+            scores=np.array([obj.metadata.score for obj in objects], dtype=np.float32),
+            properties={
+                name: [obj.properties.get(name) for obj in objects] for name in property_names
+            },
+        )
+
+    def _query_hybrid(
+        self,
+        query: str,
+        embeddings: Embedding,
+        vector_name: VectorNames,
+        ids_to_keep: Sequence[str | uuid.UUID] | None = None,
+        return_properties: list[str] | None = None,
+    ) -> list[Any]:
+        collection, nb_objects, _ = self.get_collection_metadata()
+
+        return collection.query.hybrid(
             query=query,
-            vector=embeddings,
-            limit=min(self.max_nb_items_retrieved, len(collection)),
+            vector=embeddings.tolist(),
+            limit=min(self.max_nb_items_retrieved, nb_objects),
             alpha=self.hybrid_weight,
             return_metadata=wvc.query.MetadataQuery(score=True),
-            return_properties=ReferenceNewsType,
+            return_properties=return_properties
+            if return_properties is not None
+            else ReferenceNewsType,
             target_vector=vector_name.value,
             filters=wvc.query.Filter.by_id().contains_any(list(ids_to_keep))
             if ids_to_keep
             else None,
         ).objects
 
-        news_retrieved: list[tuple[News, float]] = [
-            (News.model_validate(obj.properties), obj.metadata.score)
-            for obj in objects
-            if obj.metadata.score is not None and obj.metadata.score > self.minimal_score
-        ]
-
-        return news_retrieved
+    async def _run_query(self, query_function: Callable[..., T], *args: Any) -> T:
+        async with self._queries_semaphore:
+            return await asyncio.get_running_loop().run_in_executor(
+                self.executor, functools.partial(query_function, *args)
+            )
 
     def read_many_by_rubric(self, rubric: Rubric) -> list[News]:
         """Get objects with specific rubric from the repository.
@@ -143,11 +469,11 @@ class Vectorstore:
         Returns:
             The list of objects with the specified rubric.
         """
-        collection = self.vectorstore_client.collections.get(self.collection_name)
+        collection, nb_objects, _ = self.get_collection_metadata()
 
         objects = collection.query.fetch_objects(
             filters=wvc.query.Filter.by_property("rubric").equal(rubric.value),
-            limit=min(self.max_nb_items_retrieved, len(collection)),
+            limit=min(self.max_nb_items_retrieved, nb_objects),
             return_properties=ReferenceNewsType,
         ).objects
         news = []
@@ -159,33 +485,118 @@ class Vectorstore:
 
         return news
 
-    def read_many_with_vectors(self, vector_name: VectorNames) -> list[tuple[News, list[float]]]:
-        """Get objects with specific rubric from the repository.
+    def read_vectors(
+        self, vector_name: VectorNames, return_properties: Sequence[str] | None = None
+    ) -> ReferenceVectors:
+        """Read all the objects of the collection with one of their named vectors.
+
+        Note:
+            The collection is streamed in pages with a cursor, and all the named vectors are
+            written in float32 matrices allocated for the counted number of objects, in a single
+            pass. The matrices are kept until the collection metadata expires or is invalidated, so
+            reading another named vector of the same version of the collection does not copy or
+            query anything. With a snapshot store, an up-to-date snapshot is memory-mapped instead,
+            and new snapshots are saved otherwise.
 
         Args:
-            uuids: The uuids to filter by.
+            vector_name: The named vector to read.
+            return_properties: The properties to read. All the properties if None.
 
         Returns:
-            The list of objects with the specified uuids.
+            The ids, vectors and properties of the objects.
         """
-        collection = self.vectorstore_client.collections.get(self.collection_name)
-
-        objects = collection.query.fetch_objects(
-            limit=min(self.max_nb_items_retrieved, len(collection)),
-            include_vector=[vector_name.value],
-            return_properties=ReferenceNewsType,
-        ).objects
-        news_vectors = []
-        for object_ in objects:
-            try:
-                news_vectors.append((
-                    News.model_validate(object_.properties),
-                    object_.vector[vector_name.value],
-                ))
-            except ValidationError:
-                logging.exception("Error validating object %s", object_)
+        collection_metadata = self.get_collection_metadata()
+        property_names = list(return_properties or ReferenceNewsType.__annotations__)
+        if self._reference_vectors_metadata is not collection_metadata:
+            self._reference_vectors = {}
+            self._reference_vectors_metadata = collection_metadata
+
+        reference_vectors = self._reference_vectors.get(vector_name)
+        if reference_vectors is None or not set(property_names).issubset(
+            reference_vectors.properties
+        ):
+            snapshot = (
+                self.vector_snapshot_store.load(
+                    self.collection_name,
+                    vector_name,
+                    self.get_collection_fingerprint(),
+                    property_names,
+                )
+                if self.vector_snapshot_store is not None
+                else None
+            )
+            if snapshot is not None:
+                snapshot_ids, snapshot_vectors, snapshot_properties = snapshot
+                return ReferenceVectors(
+                    ids=snapshot_ids, vectors=snapshot_vectors, properties=snapshot_properties
+                )
+            self._reference_vectors = self._read_all_vectors(collection_metadata, property_names)
+            reference_vectors = self._reference_vectors[vector_name]
+
+        return ReferenceVectors(
+            ids=reference_vectors.ids,
+            vectors=reference_vectors.vectors,
+            properties={name: reference_vectors.properties[name] for name in property_names},
+        )
 
-        return news_vectors
+    def _read_all_vectors(
+        self, collection_metadata: CollectionMetadata, property_names: list[str]
+    ) -> dict[VectorNames, ReferenceVectors]:
+        ids: list[str] = []
+        update_times: list[Any] = []
+        properties: dict[str, list[Any]] = {name: [] for name in property_names}
+        vectors: dict[VectorNames, NDArray[np.float32]] = {}
+        for object_ in collection_metadata.collection.iterator(
+            include_vector=True,
+            return_properties=property_names,
+            return_metadata=wvc.query.MetadataQuery(last_update_time=True),
+        ):
+            if not vectors:
+                vectors = {
+                    vector_name: np.empty(
+                        (
+                            max(collection_metadata.nb_objects, 1),
+                            len(object_.vector[vector_name.value]),
+                        ),
+                        dtype=np.float32,
+                    )
+                    for vector_name in VectorNames
+                }
+            elif len(ids) == len(vectors[VectorNames.TITLE_CONTENT]):
+                # The collection grew since it was counted.
+                vectors = {
+                    vector_name: np.concatenate([matrix, np.empty_like(matrix)])
+                    for vector_name, matrix in vectors.items()
+                }
+            for vector_name, matrix in vectors.items():
+                matrix[len(ids)] = object_.vector[vector_name.value]
+            ids.append(str(object_.uuid))
+            update_times.append(object_.metadata.last_update_time)
+            for name, values in properties.items():
+                values.append(object_.properties.get(name))
+
+        all_reference_vectors = {
+            vector_name: ReferenceVectors(
+                ids=ids,
+                vectors=vectors.get(vector_name, np.empty((0, 0), dtype=np.float32))[: len(ids)],
+                properties=properties,
+            )
+            for vector_name in VectorNames
+        }
+        # The fingerprint of the objects read, which may have changed since the collection was counted.
+        self._collection_fingerprint = VectorSnapshotStore.fingerprint(ids, update_times)
+        self._collection_fingerprint_metadata = collection_metadata
+        if self.vector_snapshot_store is not None:
+            for vector_name, reference_vectors in all_reference_vectors.items():
+                self.vector_snapshot_store.save(
+                    self.collection_name,
+                    vector_name,
+                    ids,
+                    reference_vectors.vectors,
+                    properties,
+                    self._collection_fingerprint,
+                )
+        return all_reference_vectors
 
     @staticmethod
     def create_query(news: News, *, vector_name: VectorNames) -> str:
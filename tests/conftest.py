@@ -3,21 +3,34 @@
 import datetime as dt
 from collections.abc import Iterator
 from inspect import cleandoc
+from pathlib import Path
 from typing import Any
 from unittest.mock import AsyncMock, MagicMock
 
+import numpy as np
 import pytest
 import weaviate
 from pydantic_core import Url
 
 from cpeq_infolettre_automatique.completion_model import CompletionModel
-from cpeq_infolettre_automatique.config import Relevance, Rubric, VectorstoreConfig
+from cpeq_infolettre_automatique.config import (
+    NewsCacheConfig,
+    NewsClustererConfig,
+    NewsProducerConfig,
+    PublishedNewsIndexConfig,
+    Relevance,
+    Rubric,
+    VectorstoreConfig,
+)
 from cpeq_infolettre_automatique.embedding_model import EmbeddingModel
+from cpeq_infolettre_automatique.news_cache import NewsCache
 from cpeq_infolettre_automatique.news_classifier import (
     NewsRelevancyClassifier,
     NewsRubricClassifier,
 )
+from cpeq_infolettre_automatique.news_clusterer import NewsClusterer
 from cpeq_infolettre_automatique.news_producer import NewsProducer
+from cpeq_infolettre_automatique.published_news_index import PublishedNewsIndex
 from cpeq_infolettre_automatique.repositories import NewsRepository
 from cpeq_infolettre_automatique.schemas import News, Newsletter
 from cpeq_infolettre_automatique.summary_generator import SummaryGenerator
@@ -259,7 +272,14 @@ def rubric_classification_fixture() -> Rubric:
 def embedding_model_fixture() -> EmbeddingModel:
     """Fixture for a mocked EmbeddingModel."""
     embedding_model_fixture = MagicMock(spec=EmbeddingModel)
-    embedding_model_fixture.embed = AsyncMock(return_value=[0.1, 0.2, 0.3])
+    embedding_model_fixture.embed = AsyncMock(
+        return_value=np.array([0.1, 0.2, 0.3], dtype=np.float32)
+    )
+    embedding_model_fixture.embed_many = AsyncMock(
+        side_effect=lambda texts: np.tile(
+            np.array([0.1, 0.2, 0.3], dtype=np.float32), (len(texts), 1)
+        )
+    )
     return embedding_model_fixture
 
 
@@ -286,6 +306,9 @@ def news_rubric_classifier_fixture(rubric_classification_fixture: Rubric) -> Any
     """Fixture for mocked ReferenceNewsRepository."""
     news_rubric_classifier_fixture = MagicMock(spec=NewsRubricClassifier)
     news_rubric_classifier_fixture.predict = AsyncMock(return_value=rubric_classification_fixture)
+    news_rubric_classifier_fixture.predict_many = AsyncMock(
+        side_effect=lambda news_list, *_: [rubric_classification_fixture for _ in news_list]
+    )
     return news_rubric_classifier_fixture
 
 
@@ -309,23 +332,63 @@ def summary_generator_fixture(
     )
 
 
+@pytest.fixture()
+def news_cache_fixture() -> Iterator[NewsCache]:
+    """Fixture for an in-memory NewsCache.
+
+    Yields:
+        The NewsCache, closed after the test.
+    """
+    news_cache = NewsCache(NewsCacheConfig(path=":memory:"))
+    news_cache.setup()
+    yield news_cache
+    news_cache.teardown()
+
+
 @pytest.fixture()
 def news_producer_fixture(
     summary_generator_fixture: SummaryGenerator,
     news_rubric_classifier_fixture: NewsRubricClassifier,
+    news_cache_fixture: NewsCache,
 ) -> NewsProducer:
     """Fixture for the NewsProducer."""
     news_producer_fixture = NewsProducer(
         summary_generator=summary_generator_fixture,
         news_rubric_classifier=news_rubric_classifier_fixture,
+        news_producer_config=NewsProducerConfig(),
+        news_cache=news_cache_fixture,
     )
     news_producer_fixture.produce_news = AsyncMock(side_effect=news_producer_fixture.produce_news)
+    news_producer_fixture.produce_many_news = AsyncMock(
+        side_effect=news_producer_fixture.produce_many_news
+    )
     return news_producer_fixture
 
 
+@pytest.fixture()
+def news_clusterer_fixture(embedding_model_fixture: EmbeddingModel) -> NewsClusterer:
+    """Fixture for the NewsClusterer."""
+    return NewsClusterer(
+        embedding_model=embedding_model_fixture, news_clusterer_config=NewsClustererConfig()
+    )
+
+
+@pytest.fixture()
+def published_news_index_fixture(tmp_path: Path) -> PublishedNewsIndex:
+    """Fixture for an empty PublishedNewsIndex saved in a temporary directory."""
+    published_news_index = PublishedNewsIndex(
+        PublishedNewsIndexConfig(path=str(tmp_path / "published_news_index.npz"))
+    )
+    published_news_index.setup()
+    return published_news_index
+
+
 @pytest.fixture()
 def news_relevance_classifier_fixture() -> NewsRelevancyClassifier:
     """Fixture for the NewsRelevancyClassifier."""
     news_relevance_classifier_fixture = MagicMock(spec=NewsRelevancyClassifier)
     news_relevance_classifier_fixture.predict = AsyncMock(return_value=Relevance.PERTINENT)
+    news_relevance_classifier_fixture.predict_many = AsyncMock(
+        side_effect=lambda news_list, *_: [Relevance.PERTINENT for _ in news_list]
+    )
     return news_relevance_classifier_fixture
@@ -2,7 +2,7 @@
 
 from collections.abc import AsyncIterator, Iterator
 from contextlib import asynccontextmanager
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, patch
 
 import httpx
 import pytest
@@ -11,6 +11,7 @@ from fastapi.testclient import TestClient
 
 from cpeq_infolettre_automatique.api import app
 from cpeq_infolettre_automatique.dependencies import (
+    NewsClassifiersDependency,
     OneDriveDependency,
     get_service,
 )
@@ -71,3 +72,12 @@ def test_generate_newsletter__when_happy_path__returns_successful_response(
     assert response.status_code == SUCCESS_HTTP_STATUS_CODE
     assert expected_folder_name in response.text
     assert service_fixture.generate_newsletter.called
+
+
+def test_reload_classifiers__when_called__reloads_classifiers(client_fixture: TestClient) -> None:
+    """Test reloading the news classifiers."""
+    with patch.object(NewsClassifiersDependency, "reload") as reload_mock:
+        response = client_fixture.post("/reload-classifiers")
+
+    assert response.status_code == SUCCESS_HTTP_STATUS_CODE
+    assert reload_mock.called
@@ -0,0 +1,46 @@
+import numpy as np
+
+from cpeq_infolettre_automatique.ann_index import IvfIndex
+
+
+class TestIvfIndex:
+    @staticmethod
+    def test__search__when_all_lists_probed__returns_exact_nearest_neighbours() -> None:
+        """Test that probing every list gives the brute-force cosine neighbours."""
+        generator = np.random.default_rng(0)
+        vectors = generator.normal(size=(200, 8)).astype(np.float32)
+        queries = generator.normal(size=(5, 8)).astype(np.float32)
+        index = IvfIndex(n_lists=10, n_probes=10).fit(vectors)
+
+        positions, similarities = index.search(queries, k=3)
+
+        normalized_vectors = IvfIndex.normalize_rows(vectors)
+        exact_similarities = IvfIndex.normalize_rows(queries) @ normalized_vectors.T
+        assert positions.tolist() == np.argsort(-exact_similarities, axis=1)[:, :3].tolist()
+        assert np.allclose(similarities, np.sort(exact_similarities, axis=1)[:, ::-1][:, :3])
+
+    @staticmethod
+    def test__search__when_small_index_with_default_lists__returns_exact_neighbours() -> None:
+        """Test that an index without a given number of lists searches small collections exactly."""
+        generator = np.random.default_rng(0)
+        vectors = generator.normal(size=(1000, 8)).astype(np.float32)
+        queries = generator.normal(size=(20, 8)).astype(np.float32)
+        index = IvfIndex(exact_search_max_size=1000).fit(vectors)
+
+        positions, _ = index.search(queries, k=4)
+
+        exact_similarities = IvfIndex.normalize_rows(queries) @ IvfIndex.normalize_rows(vectors).T
+        assert positions.tolist() == np.argsort(-exact_similarities, axis=1)[:, :4].tolist()
+        assert index.default_n_lists(1001) == 32  # noqa: PLR2004
+
+    @staticmethod
+    def test__search__when_one_list_probed__returns_neighbours_of_nearest_list() -> None:
+        """Test that a partial search only returns the vectors of the probed lists, padded."""
+        index = IvfIndex(n_lists=2, n_probes=1).fit(
+            np.array([[1.0, 0.0], [0.9, 0.1], [0.0, 1.0], [0.1, 0.9]], dtype=np.float32)
+        )
+
+        positions, similarities = index.search(np.array([[0.0, 1.0]], dtype=np.float32), k=3)
+
+        assert positions.tolist() == [[2, 3, -1]]
+        assert similarities[0, 2] == -np.inf
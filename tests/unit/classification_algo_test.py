@@ -0,0 +1,218 @@
+from collections.abc import Callable
+from unittest.mock import AsyncMock, MagicMock
+
+import numpy as np
+import pytest
+
+from cpeq_infolettre_automatique.classification_algo import (
+    KnNewsClassifier,
+    LogisticRegressionNewsClassifier,
+    MaxMeanScoresNewsClassifier,
+    MaxPoolingNewsClassifier,
+    MaxScoreNewsClassifier,
+    NewsClassifier,
+    TrainData,
+)
+from cpeq_infolettre_automatique.config import Rubric, VectorNames
+from cpeq_infolettre_automatique.schemas import News
+from cpeq_infolettre_automatique.vectorstore import ReferenceVectors, SearchHits, Vectorstore
+
+
+class TestScoreBasedNewsClassifiers:
+    @staticmethod
+    @pytest.mark.asyncio()
+    async def test__predict_scores_many__when_many_news__aggregates_hits_of_single_batch(
+        vectorstore_fixture: Vectorstore,
+        news_fixture: News,
+    ) -> None:
+        """Test that the scores of all the news come from a single batched search."""
+        hits = SearchHits(
+            ids=["a", "b", "c"],
+            scores=np.array([0.9, 0.5, 0.4], dtype=np.float32),
+            properties={
+                "rubric": [Rubric.PECHERIES.value, Rubric.PECHERIES.value, None],
+            },
+        )
+        vectorstore_fixture.hybrid_search_many = AsyncMock(return_value=[hits, hits])
+        news_list = [news_fixture, news_fixture]
+        embeddings = np.array([[0.1, 0.2, 0.3]] * 2, dtype=np.float32)
+
+        max_scores = await MaxScoreNewsClassifier(
+            vectorstore_fixture, vector_name=VectorNames.TITLE_CONTENT
+        ).predict_scores_many(news_list, embeddings)
+        mean_scores = await MaxMeanScoresNewsClassifier(
+            vectorstore_fixture, vector_name=VectorNames.TITLE_CONTENT
+        ).predict_scores_many(news_list, embeddings)
+
+        assert max_scores == [{Rubric.PECHERIES.value: pytest.approx(0.9)}] * 2
+        assert mean_scores == [{Rubric.PECHERIES.value: pytest.approx(0.7)}] * 2
+        expected_nb_searches = 2
+        assert vectorstore_fixture.hybrid_search_many.call_count == expected_nb_searches
+        assert vectorstore_fixture.hybrid_search_many.call_args.args[-1] == ("rubric",)
+
+
+class TestMaxPoolingNewsClassifier:
+    @staticmethod
+    def test__setup__when_no_train_news__averages_reference_vectors_of_each_rubric(
+        vectorstore_fixture: Vectorstore,
+    ) -> None:
+        """Test that the reference vectors without a rubric are ignored."""
+        vectorstore_fixture.read_vectors = MagicMock(
+            return_value=ReferenceVectors(
+                ids=["a", "b", "c"],
+                vectors=np.array([[1.0, 0.0], [0.0, 1.0], [3.0, 0.0]], dtype=np.float32),
+                properties={"rubric": [Rubric.PECHERIES.value, None, Rubric.PECHERIES.value]},
+            )
+        )
+        classifier = MaxPoolingNewsClassifier(
+            vectorstore_fixture, vector_name=VectorNames.TITLE_CONTENT
+        )
+
+        classifier.setup()
+
+        assert classifier.labels == [Rubric.PECHERIES.value]
+        assert classifier.label_average_embeddings[Rubric.PECHERIES.value].tolist() == [2.0, 0.0]
+
+    @staticmethod
+    def test__setup__when_no_vectorstore_and_no_train_news__raises_error() -> None:
+        """Test that a classifier without vectorstore must be given its training data."""
+        classifier = MaxPoolingNewsClassifier(None, vector_name=VectorNames.TITLE_CONTENT)
+
+        with pytest.raises(RuntimeError, match="has no vectorstore"):
+            classifier.setup()
+
+    @staticmethod
+    @pytest.mark.asyncio()
+    async def test__predict_probs_many__when_many_news__returns_same_probs_as_single_predictions(
+        vectorstore_fixture: Vectorstore,
+        news_fixture: News,
+    ) -> None:
+        """Test that the matrix prediction of many news matches the prediction of each news."""
+        classifier = MaxPoolingNewsClassifier(
+            vectorstore_fixture, vector_name=VectorNames.TITLE_CONTENT
+        )
+        classifier.setup((
+            [Rubric.PECHERIES.value, Rubric.QUALITE_DE_LAIR.value],
+            np.array([[1.0, 0.0], [0.0, 1.0]], dtype=np.float32),
+        ))
+        embeddings = np.array([[0.9, 0.1], [0.2, 0.8], [0.5, 0.5]], dtype=np.float32)
+
+        probs_many = await classifier.predict_probs_many([news_fixture] * 3, embeddings)
+        probs = [
+            await classifier.predict_probs(news_fixture, embedding) for embedding in embeddings
+        ]
+
+        assert [list(news_probs) for news_probs in probs_many] == [
+            list(news_probs) for news_probs in probs
+        ]
+        for news_probs_many, news_probs in zip(probs_many, probs, strict=True):
+            assert news_probs_many == pytest.approx(news_probs)
+
+
+class TestLeaveOneOutScores:
+    @staticmethod
+    @pytest.fixture()
+    def train_data_fixture() -> TrainData:
+        """Fixture for training data with a label of a single news.
+
+        Returns:
+            The labels and embeddings of the training news.
+        """
+        generator = np.random.default_rng(0)
+        return (
+            [Rubric.PECHERIES.value] * 5
+            + [Rubric.QUALITE_DE_LAIR.value] * 4
+            + [Rubric.AUTRE.value],
+            generator.normal(size=(10, 4)).astype(np.float32),
+        )
+
+    @staticmethod
+    @pytest.mark.asyncio()
+    @pytest.mark.parametrize(
+        "classifier_type",
+        [
+            MaxPoolingNewsClassifier,
+            lambda vectorstore, vector_name: KnNewsClassifier(
+                vectorstore, vector_name, n_neighbors=3, n_lists=1
+            ),
+        ],
+    )
+    async def test__leave_one_out_scores__when_closed_form__returns_same_scores_as_refitting(
+        vectorstore_fixture: Vectorstore,
+        news_fixture: News,
+        train_data_fixture: TrainData,
+        classifier_type: Callable[..., NewsClassifier],
+    ) -> None:
+        """Test that the closed-form leave-one-out scores match fitting once per held-out news."""
+        classifier = classifier_type(vectorstore_fixture, vector_name=VectorNames.TITLE_CONTENT)
+        news_list = [
+            news_fixture.model_copy(update={"link": f"https://{i}.com/"})
+            for i in range(len(train_data_fixture[0]))
+        ]
+
+        scores = await classifier.leave_one_out_scores(news_list, train_data_fixture)
+        refitted_scores = await NewsClassifier.leave_one_out_scores(
+            classifier, news_list, train_data_fixture
+        )
+
+        assert [list(news_scores) for news_scores in scores] == [
+            list(news_scores) for news_scores in refitted_scores
+        ]
+        for news_scores, news_refitted_scores in zip(scores, refitted_scores, strict=True):
+            assert news_scores == pytest.approx(news_refitted_scores, abs=1e-6)
+
+
+class TestLogisticRegressionNewsClassifier:
+    @staticmethod
+    @pytest.mark.asyncio()
+    async def test__predict_probs_many__when_fitted__returns_calibrated_probs_of_each_label(
+        vectorstore_fixture: Vectorstore,
+        news_fixture: News,
+    ) -> None:
+        """Test that the probabilities of the calibrated linear model sum to one and rank the right label first."""
+        classifier = LogisticRegressionNewsClassifier(
+            vectorstore_fixture, vector_name=VectorNames.TITLE_CONTENT, n_folds=2
+        )
+        shifts = 0.1 * np.arange(4, dtype=np.float32)[:, None] * np.array([1.0, -1.0])
+        classifier.setup((
+            [Rubric.PECHERIES.value] * 4 + [Rubric.QUALITE_DE_LAIR.value] * 4,
+            np.vstack([np.array([1.0, 0.0]) + shifts, np.array([0.0, 1.0]) + shifts]).astype(
+                np.float32
+            ),
+        ))
+
+        probs_many = await classifier.predict_probs_many(
+            [news_fixture] * 2, np.array([[1.0, 0.1], [0.1, 1.0]], dtype=np.float32)
+        )
+
+        assert [next(iter(probs)) for probs in probs_many] == [
+            Rubric.PECHERIES.value,
+            Rubric.QUALITE_DE_LAIR.value,
+        ]
+        for probs in probs_many:
+            assert sum(probs.values()) == pytest.approx(1.0)
+        assert set(classifier.get_fitted_state()) == {"labels", "coefficients", "intercepts"}
+        assert classifier.coefficients.shape == (2, 2)
+
+    @staticmethod
+    def test__fit_temperature__when_a_label_has_single_example__calibrates_on_other_labels(
+        caplog: pytest.LogCaptureFixture,
+    ) -> None:
+        """Test that a rare label is kept in every training fold instead of skipping calibration."""
+        classifier = LogisticRegressionNewsClassifier(
+            None, vector_name=VectorNames.TITLE_CONTENT, n_folds=2
+        )
+        generator = np.random.default_rng(0)
+        centers = np.array([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]])
+        y = ["a"] * 6 + ["b"] * 6 + ["c"]
+        x = (centers[[0] * 6 + [1] * 6 + [2]] + generator.normal(scale=0.3, size=(13, 3))).astype(
+            np.float32
+        )
+        classifier.labels = sorted(set(y))
+
+        temperature = classifier.fit_temperature(x, y)
+        rare_temperature = classifier.fit_temperature(x[[0, 6, 12]], ["a", "b", "c"])
+
+        assert temperature != 1.0
+        assert rare_temperature == 1.0
+        assert "is not calibrated" in caplog.text
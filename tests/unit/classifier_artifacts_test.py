@@ -0,0 +1,56 @@
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+from cpeq_infolettre_automatique.classification_algo import NewsClassifier
+from cpeq_infolettre_automatique.classifier_artifacts import ClassifierArtifactStore
+from cpeq_infolettre_automatique.config import ClassifierArtifactConfig, Rubric, VectorNames
+from cpeq_infolettre_automatique.dependencies import create_news_classifier
+from cpeq_infolettre_automatique.vectorstore import ReferenceVectors, Vectorstore
+
+
+class TestClassifierArtifactStore:
+    @staticmethod
+    def test__create_news_classifier__when_artifact_up_to_date__does_not_train_again(
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+        vectorstore_fixture: Vectorstore,
+    ) -> None:
+        """Test that a fitted classifier is loaded from its artifact until the collection changes."""
+        monkeypatch.setattr(vectorstore_fixture, "collection_name", "Collection")
+        vectorstore_fixture.get_collection_fingerprint = MagicMock(return_value="2-0123")
+        vectorstore_fixture.read_vectors = MagicMock(
+            return_value=ReferenceVectors(
+                ids=["a", "b"],
+                vectors=np.array([[1.0, 0.0], [0.0, 1.0]], dtype=np.float32),
+                properties={"rubric": [Rubric.PECHERIES.value, Rubric.QUALITE_DE_LAIR.value]},
+            )
+        )
+        classifier_artifact_store = ClassifierArtifactStore(
+            ClassifierArtifactConfig(directory=str(tmp_path))
+        )
+
+        def create_classifier() -> NewsClassifier:
+            return create_news_classifier(
+                vectorstore=vectorstore_fixture,
+                vector_name=VectorNames.TITLE_CONTENT,
+                classifier_type="KnNewsClassifier",
+                classifier_artifact_store=classifier_artifact_store,
+                n_neighbors=1,
+            )
+
+        trained_classifier = create_classifier()
+        loaded_classifier = create_classifier()
+        # An object of the collection is updated, the number of objects does not change.
+        vectorstore_fixture.get_collection_fingerprint.return_value = "2-4567"
+        create_classifier()
+
+        expected_nb_trainings = 2
+        assert vectorstore_fixture.read_vectors.call_count == expected_nb_trainings
+        assert len(list(tmp_path.iterdir())) == 1
+        assert (
+            loaded_classifier.get_fitted_state()["labels"]
+            == (trained_classifier.get_fitted_state()["labels"])
+        )
@@ -0,0 +1,36 @@
+import numpy as np
+
+from cpeq_infolettre_automatique.classification_algo import (
+    KnNewsClassifier,
+    MaxPoolingNewsClassifier,
+)
+from cpeq_infolettre_automatique.config import VectorNames
+from cpeq_infolettre_automatique.cross_validation import ClassifierConfig, cross_validate
+
+
+class TestCrossValidate:
+    @staticmethod
+    def test__cross_validate__when_labels_separable__predicts_each_news_outside_its_fold() -> None:
+        """Test that every news is predicted, by classifiers without vectorstore in a worker process."""
+        generator = np.random.default_rng(0)
+        centers = np.array([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]], dtype=np.float32)
+        labels = ["a", "b"] * 5
+        vectors = (centers[[0, 1] * 5] + generator.normal(scale=0.05, size=(10, 3))).astype(
+            np.float32
+        )
+
+        predicted_probs = cross_validate(
+            [
+                ClassifierConfig(MaxPoolingNewsClassifier, {}),
+                ClassifierConfig(KnNewsClassifier, {"n_neighbors": 2}),
+            ],
+            VectorNames.TITLE_CONTENT,
+            (labels, vectors),
+            splitter="leave-one-out",
+            max_workers=1,
+        )
+
+        assert len(predicted_probs) == 2  # noqa: PLR2004
+        for classifier_probs in predicted_probs:
+            assert [next(iter(probs)) for probs in classifier_probs] == labels
+            assert all(np.isclose(sum(probs.values()), 1.0) for probs in classifier_probs)
@@ -0,0 +1,73 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from cpeq_infolettre_automatique import dependencies
+from cpeq_infolettre_automatique.classifier_artifacts import ClassifierArtifactStore
+from cpeq_infolettre_automatique.config import NewsRelevancyClassifierConfig
+from cpeq_infolettre_automatique.dependencies import (
+    NewsClassifiers,
+    NewsClassifiersDependency,
+    get_news_relevancy_classifier,
+)
+from cpeq_infolettre_automatique.vector_snapshot import VectorSnapshotStore
+from cpeq_infolettre_automatique.vectorstore import Vectorstore
+
+
+class TestNewsClassifiersDependency:
+    @staticmethod
+    def test__reload__when_fitting_fails__keeps_previous_index_and_classifiers(
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """Test that the new index is only swapped in along with the classifiers fitted on it."""
+        previous_classifiers = MagicMock(spec=NewsClassifiers)
+        new_index = MagicMock()
+        monkeypatch.setattr(
+            NewsClassifiersDependency, "news_classifiers", previous_classifiers, raising=False
+        )
+        monkeypatch.setattr(
+            NewsClassifiersDependency,
+            "create_hybrid_search_index",
+            MagicMock(return_value=new_index),
+        )
+        create_news_classifiers = MagicMock(side_effect=RuntimeError("fit failed"))
+        monkeypatch.setattr(
+            NewsClassifiersDependency, "create_news_classifiers", create_news_classifiers
+        )
+        monkeypatch.setattr(VectorSnapshotStore, "remove", MagicMock())
+        clear_artifacts = MagicMock()
+        monkeypatch.setattr(ClassifierArtifactStore, "clear", clear_artifacts)
+
+        with pytest.raises(RuntimeError, match="fit failed"):
+            NewsClassifiersDependency.reload()
+
+        create_news_classifiers.assert_called_once_with(new_index)
+        assert clear_artifacts.called
+        assert NewsClassifiersDependency.news_classifiers is previous_classifiers
+        assert NewsClassifiersDependency.get_hybrid_search_index() is (
+            previous_classifiers.hybrid_search_index
+        )
+        assert not NewsClassifiersDependency.reload_lock.locked()
+
+
+class TestGetNewsRelevancyClassifier:
+    @staticmethod
+    def test__get_news_relevancy_classifier__when_cascade_model_is_main_model__raises(
+        monkeypatch: pytest.MonkeyPatch,
+        vectorstore_fixture: Vectorstore,
+    ) -> None:
+        """Test that a cascade of a model to itself is rejected before fitting any model."""
+        monkeypatch.setattr(
+            dependencies,
+            "NewsRelevancyClassifierConfig",
+            lambda: NewsRelevancyClassifierConfig(
+                classification_model_name="MaxPoolingNewsClassifier",
+                cascade_model_name="MaxPoolingNewsClassifier",
+                cascade_margin=0.1,
+            ),
+        )
+
+        with pytest.raises(ValueError, match="must differ"):
+            get_news_relevancy_classifier(vectorstore_fixture)
+
+        assert not vectorstore_fixture.read_vectors.called
@@ -0,0 +1,188 @@
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+from cpeq_infolettre_automatique.config import Rubric, VectorNames, VectorstoreConfig
+from cpeq_infolettre_automatique.embedding_model import EmbeddingModel
+from cpeq_infolettre_automatique.in_memory_vectorstore import (
+    HybridSearchIndex,
+    InMemoryVectorstore,
+)
+from cpeq_infolettre_automatique.schemas import News
+
+
+@pytest.fixture()
+def hybrid_search_index_fixture(news_fixture: News) -> HybridSearchIndex:
+    """Fixture for a HybridSearchIndex of three news.
+
+    Returns:
+        The HybridSearchIndex.
+    """
+    news = [
+        news_fixture.model_copy(
+            update={"title": title, "content": content, "rubric": rubric, "link": link}
+        )
+        for title, content, rubric, link in [
+            ("Pêcheries", "Quotas de crabe des neiges", Rubric.PECHERIES, "https://a.com/"),
+            ("Qualité de l'air", "Smog à Montréal", Rubric.QUALITE_DE_LAIR, "https://b.com/"),
+            ("Pêcheries", "Quotas de homard", Rubric.PECHERIES, "https://c.com/"),
+        ]
+    ]
+    vectors = np.array([[1.0, 0.0], [0.0, 2.0], [0.8, 0.6]], dtype=np.float32)
+    return HybridSearchIndex(
+        ids=["a", "b", "c"],
+        news=news,
+        vectors=dict.fromkeys(VectorNames, vectors),
+    )
+
+
+class TestHybridSearchIndex:
+    @staticmethod
+    def test__search_many__when_vector_search_only__ranks_by_cosine_similarity(
+        hybrid_search_index_fixture: HybridSearchIndex,
+    ) -> None:
+        """Test that the vector scores are min-max normalized cosine similarities."""
+        [(positions, scores)] = hybrid_search_index_fixture.search_many(
+            ["query"],
+            np.array([[0.0, 1.0]], dtype=np.float32),
+            VectorNames.TITLE_CONTENT,
+            alpha=1.0,
+            limit=10,
+        )
+
+        assert positions.tolist() == [1, 2, 0]
+        assert scores.tolist() == pytest.approx([1.0, 0.6, 0.0])
+
+    @staticmethod
+    def test__search_many__when_keyword_search_only__returns_only_matching_news(
+        hybrid_search_index_fixture: HybridSearchIndex,
+    ) -> None:
+        """Test that only the news containing a query term are returned by the keyword search."""
+        [(positions, _)] = hybrid_search_index_fixture.search_many(
+            ["QUOTAS crabe"],
+            np.array([[0.0, 1.0]], dtype=np.float32),
+            VectorNames.TITLE_CONTENT,
+            alpha=0.0,
+            limit=10,
+        )
+
+        assert positions.tolist() == [0, 2]
+
+    @staticmethod
+    def test__search_many__when_many_queries__returns_same_results_as_single_queries(
+        hybrid_search_index_fixture: HybridSearchIndex,
+    ) -> None:
+        """Test that the batched search is equivalent to one search per query."""
+        queries = ["crabe", "smog"]
+        embeddings = np.array([[1.0, 0.1], [0.1, 1.0]], dtype=np.float32)
+
+        batched_results = hybrid_search_index_fixture.search_many(
+            queries, embeddings, VectorNames.TITLE_CONTENT, alpha=0.5, limit=2, ids_to_keep=None
+        )
+        single_results = [
+            hybrid_search_index_fixture.search_many(
+                [query], embedding.reshape(1, -1), VectorNames.TITLE_CONTENT, alpha=0.5, limit=2
+            )[0]
+            for query, embedding in zip(queries, embeddings, strict=True)
+        ]
+
+        for (batched_positions, batched_scores), (positions, scores) in zip(
+            batched_results, single_results, strict=True
+        ):
+            assert batched_positions.tolist() == positions.tolist()
+            assert batched_scores.tolist() == pytest.approx(scores.tolist())
+
+    @staticmethod
+    def test__search_many__when_excluded_ids__never_returns_excluded_news(
+        hybrid_search_index_fixture: HybridSearchIndex,
+    ) -> None:
+        """Test that the news excluded from a query are not returned, nor used to normalize its scores."""
+        results = hybrid_search_index_fixture.search_many(
+            ["query", "query"],
+            np.array([[1.0, 0.0], [1.0, 0.0]], dtype=np.float32),
+            VectorNames.TITLE_CONTENT,
+            alpha=1.0,
+            limit=10,
+            excluded_ids=["a", None],
+        )
+
+        assert [positions.tolist() for positions, _ in results] == [[2, 1], [0, 2, 1]]
+        assert results[0][1].tolist() == pytest.approx([1.0, 0.0])
+
+
+class TestInMemoryVectorstore:
+    @staticmethod
+    @pytest.mark.asyncio()
+    async def test__hybrid_search__when_ids_to_keep__returns_only_kept_news(
+        hybrid_search_index_fixture: HybridSearchIndex,
+        embedding_model_fixture: EmbeddingModel,
+    ) -> None:
+        """Test that the in-memory backend filters the ids and the minimal score like Weaviate."""
+        vectorstore = InMemoryVectorstore(
+            embedding_model=embedding_model_fixture,
+            vectorstore_client=MagicMock(),
+            vectorstore_config=VectorstoreConfig(hybrid_weight=1.0, minimal_score=0.5),
+            hybrid_search_index=hybrid_search_index_fixture,
+        )
+
+        news_scores = await vectorstore.hybrid_search(
+            "query",
+            np.array([1.0, 0.0], dtype=np.float32),
+            VectorNames.TITLE_CONTENT,
+            ids_to_keep=["a", "b"],
+        )
+
+        assert [(str(news.link), score) for news, score in news_scores] == [
+            ("https://a.com/", 1.0)
+        ]
+
+    @staticmethod
+    @pytest.mark.asyncio()
+    async def test__hybrid_search_many__when_many_queries__returns_hits_of_each_query(
+        hybrid_search_index_fixture: HybridSearchIndex,
+        embedding_model_fixture: EmbeddingModel,
+    ) -> None:
+        """Test that the batched search returns the hits of each query as columns."""
+        vectorstore = InMemoryVectorstore(
+            embedding_model=embedding_model_fixture,
+            vectorstore_client=MagicMock(),
+            vectorstore_config=VectorstoreConfig(hybrid_weight=1.0, minimal_score=0.5),
+            hybrid_search_index=hybrid_search_index_fixture,
+        )
+
+        search_hits = await vectorstore.hybrid_search_many(
+            ["crabe", "smog"],
+            np.array([[1.0, 0.0], [0.0, 1.0]], dtype=np.float32),
+            VectorNames.TITLE_CONTENT,
+        )
+
+        assert [hits.ids for hits in search_hits] == [["a", "c"], ["b", "c"]]
+        assert search_hits[1].properties["rubric"] == [
+            Rubric.QUALITE_DE_LAIR.value,
+            Rubric.PECHERIES.value,
+        ]
+        assert [news.title for news in search_hits[0].to_news()] == ["Pêcheries", "Pêcheries"]
+
+    @staticmethod
+    @pytest.mark.asyncio()
+    async def test__hybrid_search_many__when_return_properties__returns_only_these_properties(
+        hybrid_search_index_fixture: HybridSearchIndex,
+        embedding_model_fixture: EmbeddingModel,
+    ) -> None:
+        """Test that only the requested properties are returned with the hits."""
+        vectorstore = InMemoryVectorstore(
+            embedding_model=embedding_model_fixture,
+            vectorstore_client=MagicMock(),
+            vectorstore_config=VectorstoreConfig(hybrid_weight=1.0, minimal_score=0.5),
+            hybrid_search_index=hybrid_search_index_fixture,
+        )
+
+        [hits] = await vectorstore.hybrid_search_many(
+            ["crabe"],
+            np.array([[1.0, 0.0]], dtype=np.float32),
+            VectorNames.TITLE_CONTENT,
+            return_properties=["rubric"],
+        )
+
+        assert hits.properties == {"rubric": [Rubric.PECHERIES.value, Rubric.PECHERIES.value]}
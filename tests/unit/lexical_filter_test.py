@@ -0,0 +1,49 @@
+import numpy as np
+
+from cpeq_infolettre_automatique.config import LexicalFilterConfig, Rubric
+from cpeq_infolettre_automatique.lexical_filter import LexicalRelevancyFilter
+from cpeq_infolettre_automatique.schemas import News
+
+
+class TestLexicalRelevancyFilter:
+    @staticmethod
+    def test__filter__when_fitted__drops_only_lexically_irrelevant_news(
+        news_fixture: News,
+    ) -> None:
+        """Test that the news sharing the vocabulary of the Autre reference news are dropped."""
+        relevant_words = ["pollution", "émissions", "recyclage", "eau", "climat", "déchets"]
+        autre_words = ["hockey", "match", "concert", "festival", "but", "spectacle"]
+        reference_news = [
+            news_fixture.model_copy(
+                update={
+                    "title": f"{words[i]} {words[i - 1]}",
+                    "content": words[i - 2],
+                    "rubric": rubric,
+                }
+            )
+            for words, rubric in [
+                (relevant_words, Rubric.PECHERIES),
+                (autre_words, Rubric.AUTRE),
+            ]
+            for i in range(len(words))
+        ]
+        lexical_filter = LexicalRelevancyFilter(LexicalFilterConfig(recall_target=1.0, nb_folds=3))
+        relevant_news = news_fixture.model_copy(
+            update={"title": "Recyclage et pollution", "content": "Les déchets et l'eau"}
+        )
+        autre_news = news_fixture.model_copy(
+            update={"title": "Le match de hockey", "content": "Un festival et un concert"}
+        )
+
+        lexical_filter.fit(reference_news)
+
+        assert lexical_filter.filter([autre_news, relevant_news]) == [relevant_news]
+
+    @staticmethod
+    def test__threshold_for_recall__when_recall_target__keeps_target_fraction() -> None:
+        """Test that the threshold keeps the requested fraction of the relevant news."""
+        relevant_scores = np.array([0.9, 0.1, 0.5, 0.7, 0.3])
+
+        threshold = LexicalRelevancyFilter.threshold_for_recall(relevant_scores, 0.8)
+
+        assert threshold == 0.3  # noqa: PLR2004
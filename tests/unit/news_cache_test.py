@@ -0,0 +1,55 @@
+from cpeq_infolettre_automatique.config import NewsCacheConfig
+from cpeq_infolettre_automatique.news_cache import NewsCache
+from cpeq_infolettre_automatique.schemas import News
+
+
+class TestNewsCache:
+    @staticmethod
+    def test__get__when_link_differs_only_by_tracking_parameters__returns_cached_news(
+        news_cache_fixture: NewsCache,
+        summarized_news_fixture: News,
+    ) -> None:
+        """Test that news are found by their normalized link."""
+        news_cache_fixture.set(summarized_news_fixture)
+        news = summarized_news_fixture.model_copy(
+            update={"link": "https://www.SomeLink.com/?utm_source=newsletter#top", "summary": None}
+        )
+
+        cached_news = news_cache_fixture.get(news)
+
+        assert cached_news is not None
+        assert cached_news.summary == summarized_news_fixture.summary
+        assert cached_news.rubric == summarized_news_fixture.rubric
+
+    @staticmethod
+    def test__get__when_content_changed__invalidates_cached_news(
+        news_cache_fixture: NewsCache,
+        summarized_news_fixture: News,
+    ) -> None:
+        """Test that a cached news is invalidated when its content changes."""
+        news_cache_fixture.set(summarized_news_fixture)
+        news = summarized_news_fixture.model_copy(update={"content": "Some updated content"})
+
+        assert news_cache_fixture.get(news) is None
+        assert news_cache_fixture.get(summarized_news_fixture) is None
+
+    @staticmethod
+    def test__set_many__when_above_size_cap__evicts_least_recently_used_news(
+        summarized_news_fixture: News,
+    ) -> None:
+        """Test that only the most recently used news are kept."""
+        news_cache = NewsCache(NewsCacheConfig(path=":memory:", max_entries=2))
+        news_cache.setup()
+        news_list = [
+            summarized_news_fixture.model_copy(update={"link": f"https://somelink.com/{i}"})
+            for i in range(3)
+        ]
+
+        news_cache.set_many(news_list[:2])
+        news_cache.get(news_list[0])
+        news_cache.set(news_list[2])
+
+        assert news_cache.get(news_list[0]) is not None
+        assert news_cache.get(news_list[1]) is None
+        assert news_cache.get(news_list[2]) is not None
+        news_cache.teardown()
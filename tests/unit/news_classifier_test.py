@@ -0,0 +1,51 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import numpy as np
+import pytest
+
+from cpeq_infolettre_automatique.classification_algo import (
+    MaxPoolingNewsClassifier,
+    NewsClassifier,
+)
+from cpeq_infolettre_automatique.config import (
+    NewsRelevancyClassifierConfig,
+    Relevance,
+    Rubric,
+    VectorNames,
+)
+from cpeq_infolettre_automatique.news_classifier import CascadeNewsRelevancyClassifier
+from cpeq_infolettre_automatique.schemas import News
+from cpeq_infolettre_automatique.vectorstore import Vectorstore
+
+
+class TestCascadeNewsRelevancyClassifier:
+    @staticmethod
+    @pytest.mark.asyncio()
+    async def test__predict_many__when_some_news_uncertain__escalates_only_uncertain_news(
+        vectorstore_fixture: Vectorstore,
+        news_fixture: News,
+    ) -> None:
+        """Test that the confident news exit at the first stage and the others are escalated."""
+        cascade_model = MaxPoolingNewsClassifier(
+            vectorstore_fixture, vector_name=VectorNames.TITLE_CONTENT
+        )
+        cascade_model.setup((
+            [Rubric.PECHERIES.value, Rubric.AUTRE.value],
+            np.array([[1.0, 0.0], [0.0, 1.0]], dtype=np.float32),
+        ))
+        model = MagicMock(spec=NewsClassifier, vector_name=VectorNames.TITLE_CONTENT)
+        model.predict_probs_many = AsyncMock(return_value=[{Rubric.AUTRE.value: 0.9}])
+        classifier = CascadeNewsRelevancyClassifier(
+            model=model,
+            cascade_model=cascade_model,
+            news_relevancy_classifier_config=NewsRelevancyClassifierConfig(
+                threshold=0.5, cascade_margin=0.1
+            ),
+        )
+        embeddings = np.array([[1.0, 0.0], [0.0, 1.0], [1.0, 1.0]], dtype=np.float32)
+
+        relevances = await classifier.predict_many([news_fixture] * 3, embeddings)
+
+        assert relevances == [Relevance.PERTINENT, Relevance.AUTRE, Relevance.AUTRE]
+        assert model.predict_probs_many.call_args.args[1].tolist() == [[1.0, 1.0]]
+        assert classifier.stage_counts == {"accepted": 1, "rejected": 1, "escalated": 1}
@@ -0,0 +1,38 @@
+from unittest.mock import AsyncMock
+
+import numpy as np
+import pytest
+
+from cpeq_infolettre_automatique.news_clusterer import NewsClusterer
+from cpeq_infolettre_automatique.schemas import News
+
+
+class TestNewsClusterer:
+    @staticmethod
+    @pytest.mark.asyncio()
+    async def test__deduplicate__when_news_cover_same_story__keeps_one_news_with_links_to_others(
+        news_clusterer_fixture: NewsClusterer,
+        news_fixture: News,
+    ) -> None:
+        """Test that near-duplicate news are merged while distinct stories are kept apart."""
+        embeddings = {
+            "Story A": [1.0, 0.0, 0.0],
+            "Story A, again": [0.99, 0.05, 0.0],
+            "Story B": [0.0, 1.0, 0.0],
+        }
+        news_clusterer_fixture.embedding_model.embed_many = AsyncMock(  # type: ignore[method-assign]
+            side_effect=lambda texts: np.array(
+                [embeddings[text.removesuffix(f" {news_fixture.content}")] for text in texts],
+                dtype=np.float32,
+            )
+        )
+        news_list = [
+            news_fixture.model_copy(update={"title": title, "link": f"https://{i}.com/"})
+            for i, title in enumerate(embeddings)
+        ]
+
+        stories = await news_clusterer_fixture.deduplicate(news_list)
+
+        assert [story.title for story in stories] == ["Story A", "Story B"]
+        assert [str(link) for link in stories[0].see_also] == ["https://1.com/"]
+        assert stories[1].see_also == []
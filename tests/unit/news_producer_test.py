@@ -0,0 +1,138 @@
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from cpeq_infolettre_automatique.config import NewsProducerConfig
+from cpeq_infolettre_automatique.news_cache import NewsCache
+from cpeq_infolettre_automatique.news_classifier import NewsRubricClassifier
+from cpeq_infolettre_automatique.news_producer import NewsProducer, SummaryPath
+from cpeq_infolettre_automatique.schemas import News
+from cpeq_infolettre_automatique.summary_generator import SummaryGenerator
+
+
+@pytest.fixture()
+def news_rubric_classifier_fixture() -> NewsRubricClassifier:
+    """Fixture for a mocked NewsRubricClassifier."""
+    news_rubric_classifier_fixture = MagicMock(spec=NewsRubricClassifier)
+    news_rubric_classifier_fixture.predict = AsyncMock(return_value=None)
+    return news_rubric_classifier_fixture
+
+
+class TestNewsProducer:
+    @staticmethod
+    @pytest.mark.asyncio()
+    async def test__produce_news__when_content_is_short__uses_content_as_summary(
+        summary_generator_fixture: SummaryGenerator,
+        news_rubric_classifier_fixture: NewsRubricClassifier,
+        news_cache_fixture: NewsCache,
+        news_fixture: News,
+    ) -> None:
+        """Test that short news are not sent to the summary generator."""
+        news_producer = NewsProducer(
+            summary_generator_fixture,
+            news_rubric_classifier_fixture,
+            NewsProducerConfig(extractive_summary_max_tokens=50),
+            news_cache_fixture,
+        )
+        news_fixture.content = "  Some   short\ncontent.\n\n\n Second  paragraph. "
+
+        news = await news_producer.produce_news(news_fixture)
+
+        assert news.summary == "Some short content.\n\nSecond paragraph."
+        assert not summary_generator_fixture.generate.called
+        assert news_producer.summary_path_counts[SummaryPath.EXTRACTIVE] == 1
+
+    @staticmethod
+    @pytest.mark.asyncio()
+    async def test__produce_news__when_content_is_long__uses_summary_generator(
+        summary_generator_fixture: SummaryGenerator,
+        news_rubric_classifier_fixture: NewsRubricClassifier,
+        news_cache_fixture: NewsCache,
+        news_fixture: News,
+    ) -> None:
+        """Test that news longer than the threshold are summarized by the summary generator."""
+        news_producer = NewsProducer(
+            summary_generator_fixture,
+            news_rubric_classifier_fixture,
+            NewsProducerConfig(extractive_summary_max_tokens=5),
+            news_cache_fixture,
+        )
+        news_fixture.content = "Some content that is longer than the threshold."
+
+        with patch("cpeq_infolettre_automatique.news_producer.tiktoken") as tiktoken_mock:
+            tiktoken_mock.get_encoding.return_value.encode.return_value = list(range(10))
+            news = await news_producer.produce_news(news_fixture)
+
+        assert news.summary == "This is a summary"
+        assert news_producer.summary_path_counts[SummaryPath.GENERATIVE] == 1
+
+    @staticmethod
+    @pytest.mark.asyncio()
+    async def test__produce_news__when_few_multibyte_characters__counts_their_tokens(
+        summary_generator_fixture: SummaryGenerator,
+        news_rubric_classifier_fixture: NewsRubricClassifier,
+        news_cache_fixture: NewsCache,
+        news_fixture: News,
+    ) -> None:
+        """Test that a content with fewer characters than the threshold is still encoded."""
+        news_producer = NewsProducer(
+            summary_generator_fixture,
+            news_rubric_classifier_fixture,
+            NewsProducerConfig(extractive_summary_max_tokens=5),
+            news_cache_fixture,
+        )
+        news_fixture.content = "🦞🦞🦞"
+
+        with patch("cpeq_infolettre_automatique.news_producer.tiktoken") as tiktoken_mock:
+            tiktoken_mock.get_encoding.return_value.encode.return_value = list(range(6))
+            news = await news_producer.produce_news(news_fixture)
+
+        assert news.summary == "This is a summary"
+        assert news_producer.summary_path_counts[SummaryPath.GENERATIVE] == 1
+
+    @staticmethod
+    @pytest.mark.asyncio()
+    async def test__produce_news__when_threshold_is_zero__always_uses_summary_generator(
+        summary_generator_fixture: SummaryGenerator,
+        news_rubric_classifier_fixture: NewsRubricClassifier,
+        news_cache_fixture: NewsCache,
+        news_fixture: News,
+    ) -> None:
+        """Test that the extractive path is disabled when the threshold is 0."""
+        news_producer = NewsProducer(
+            summary_generator_fixture,
+            news_rubric_classifier_fixture,
+            NewsProducerConfig(extractive_summary_max_tokens=0),
+            news_cache_fixture,
+        )
+
+        news = await news_producer.produce_news(news_fixture)
+
+        assert news.summary == "This is a summary"
+        assert summary_generator_fixture.generate.called
+
+    @staticmethod
+    @pytest.mark.asyncio()
+    async def test__produce_news__when_news_was_already_produced__uses_cached_news(
+        summary_generator_fixture: SummaryGenerator,
+        news_rubric_classifier_fixture: NewsRubricClassifier,
+        news_cache_fixture: NewsCache,
+        summarized_news_fixture: News,
+        news_fixture: News,
+    ) -> None:
+        """Test that a news produced in a previous run is neither summarized nor classified again."""
+        news_cache_fixture.set(summarized_news_fixture)
+        news_producer = NewsProducer(
+            summary_generator_fixture,
+            news_rubric_classifier_fixture,
+            NewsProducerConfig(extractive_summary_max_tokens=0),
+            news_cache_fixture,
+        )
+
+        news = await news_producer.produce_news(news_fixture)
+
+        assert news.summary == summarized_news_fixture.summary
+        assert news.rubric == summarized_news_fixture.rubric
+        assert not summary_generator_fixture.generate.called
+        assert not news_rubric_classifier_fixture.predict.called
+        assert news_producer.summary_path_counts[SummaryPath.CACHED] == 1
@@ -0,0 +1,42 @@
+from cpeq_infolettre_automatique.published_news_index import PublishedNewsIndex
+from cpeq_infolettre_automatique.schemas import News
+
+
+class TestPublishedNewsIndex:
+    @staticmethod
+    def test__find_duplicate__when_news_slightly_edited__returns_published_link(
+        published_news_index_fixture: PublishedNewsIndex,
+        news_fixture: News,
+    ) -> None:
+        """Test that a news republished under another link and title is found, but not other news."""
+        content = " ".join(f"mot{i}" for i in range(200))
+        published_news = news_fixture.model_copy(update={"content": content})
+        published_news_index_fixture.add_many([published_news])
+        edited_news = news_fixture.model_copy(
+            update={
+                "title": "Some other title",
+                "content": f"{content} mot200",
+                "link": "https://www.otherlink.com/article",
+            }
+        )
+        other_news = news_fixture.model_copy(
+            update={"content": "Une tout autre nouvelle", "link": "https://otherlink.com/other"}
+        )
+
+        assert published_news_index_fixture.find_duplicate(edited_news) == "https://somelink.com"
+        assert published_news_index_fixture.find_duplicate(other_news) is None
+
+    @staticmethod
+    def test__setup__when_index_saved__loads_published_news(
+        published_news_index_fixture: PublishedNewsIndex,
+        news_fixture: News,
+    ) -> None:
+        """Test that the index is persisted between runs."""
+        published_news_index_fixture.add_many([news_fixture])
+        published_news_index_fixture.save()
+
+        loaded_index = PublishedNewsIndex(published_news_index_fixture.published_news_index_config)
+        loaded_index.setup()
+
+        assert len(loaded_index) == 1
+        assert loaded_index.find_duplicate(news_fixture) == "https://somelink.com"
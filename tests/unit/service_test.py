@@ -6,7 +6,9 @@ import pytest
 
 from cpeq_infolettre_automatique.config import Rubric
 from cpeq_infolettre_automatique.news_classifier import NewsRelevancyClassifier
+from cpeq_infolettre_automatique.news_clusterer import NewsClusterer
 from cpeq_infolettre_automatique.news_producer import NewsProducer
+from cpeq_infolettre_automatique.published_news_index import PublishedNewsIndex
 from cpeq_infolettre_automatique.repositories import NewsRepository
 from cpeq_infolettre_automatique.schemas import News
 from cpeq_infolettre_automatique.service import Service
@@ -19,6 +21,8 @@ def service_fixture(
     news_repository_fixture: NewsRepository,
     news_producer_fixture: NewsProducer,
     news_relevance_classifier_fixture: NewsRelevancyClassifier,
+    news_clusterer_fixture: NewsClusterer,
+    published_news_index_fixture: PublishedNewsIndex,
 ) -> Service:
     """Fixture for mocked service.
 
@@ -32,6 +36,8 @@ def service_fixture(
         news_repository=news_repository_fixture,
         news_producer=news_producer_fixture,
         news_relevancy_classifier=news_relevance_classifier_fixture,
+        news_clusterer=news_clusterer_fixture,
+        published_news_index=published_news_index_fixture,
     )
     return service
 
@@ -63,8 +69,54 @@ class TestService:
         """
         await service_fixture.generate_newsletter()
         assert service_fixture.webscraper_io_client.get_scraping_jobs.called
-        assert service_fixture.news_relevancy_classifier.predict.called
+        assert service_fixture.news_relevancy_classifier.predict_many.called
         assert service_fixture.webscraper_io_client.download_scraping_job_data.called
-        assert service_fixture.news_producer.produce_news.called
+        assert service_fixture.news_producer.produce_many_news.called
         assert service_fixture.webscraper_io_client.delete_scraping_jobs.called
         assert service_fixture.news_repository.create_many_news.called
+
+    @staticmethod
+    @pytest.mark.asyncio()
+    async def test_generate_newsletter__when_news_already_published__skips_news(
+        service_fixture: Service,
+        news_fixture: News,
+    ) -> None:
+        """Test that the news published in a previous newsletter are dropped before being classified."""
+        new_news = news_fixture.model_copy(
+            update={"title": "Some new title", "link": "https://somelink.com/new"}
+        )
+        service_fixture.webscraper_io_client.download_scraping_job_data.return_value = [
+            news_fixture,
+            new_news,
+        ]
+        service_fixture.published_news_index.add_many([news_fixture])
+
+        newsletter = await service_fixture.generate_newsletter()
+
+        assert [news.title for news in newsletter.news] == [new_news.title]
+        for call in service_fixture.news_relevancy_classifier.predict_many.call_args_list:
+            assert call.args[0] == [new_news]
+
+    @staticmethod
+    @pytest.mark.asyncio()
+    async def test_generate_newsletter__when_generated__indexes_published_news(
+        service_fixture: Service,
+        news_fixture: News,
+    ) -> None:
+        """Test that the published news are indexed for the next newsletters."""
+        await service_fixture.generate_newsletter()
+
+        assert service_fixture.published_news_index.find_duplicate(news_fixture) is not None
+
+    @staticmethod
+    @pytest.mark.asyncio()
+    async def test_generate_newsletter__when_same_period_generated_twice__keeps_news(
+        service_fixture: Service,
+        news_fixture: News,
+    ) -> None:
+        """Test that regenerating a newsletter does not drop the news it already indexed."""
+        first_newsletter = await service_fixture.generate_newsletter(delete_scraping_jobs=False)
+        second_newsletter = await service_fixture.generate_newsletter(delete_scraping_jobs=False)
+
+        assert [news.title for news in first_newsletter.news] == [news_fixture.title]
+        assert [news.title for news in second_newsletter.news] == [news_fixture.title]
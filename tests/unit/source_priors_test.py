@@ -0,0 +1,90 @@
+from collections.abc import Iterator
+
+import pytest
+
+from cpeq_infolettre_automatique.config import Relevance, SourcePriorsConfig
+from cpeq_infolettre_automatique.schemas import News
+from cpeq_infolettre_automatique.source_priors import SourcePriors
+
+
+@pytest.fixture()
+def source_priors_fixture() -> Iterator[SourcePriors]:
+    """Fixture for enabled in-memory source priors without audit sample.
+
+    Yields:
+        The SourcePriors.
+    """
+    source_priors = SourcePriors(
+        SourcePriorsConfig(
+            enabled=True,
+            path=":memory:",
+            max_depth=1,
+            min_observations=2,
+            max_relevance_rate=0.0,
+            audit_rate=0.0,
+        )
+    )
+    source_priors.setup()
+    yield source_priors
+    source_priors.teardown()
+
+
+class TestSourcePriors:
+    @staticmethod
+    def test__filter__when_section_never_relevant__skips_its_news(
+        source_priors_fixture: SourcePriors,
+        news_fixture: News,
+    ) -> None:
+        """Test that only the news of the sections whose news were never relevant are skipped."""
+        events_news, other_events_news, jobs_news, other_jobs_news, other_news = (
+            news_fixture.model_copy(update={"link": f"https://www.site.com/{section}/{i}"})
+            for i, section in enumerate([
+                "evenements",
+                "evenements",
+                "emplois",
+                "emplois",
+                "nouvelles",
+            ])
+        )
+        source_priors_fixture.record_many(
+            [events_news, other_events_news, jobs_news, other_jobs_news],
+            [Relevance.AUTRE, Relevance.AUTRE, Relevance.PERTINENT, Relevance.AUTRE],
+        )
+
+        news_to_classify = source_priors_fixture.filter([events_news, jobs_news, other_news])
+
+        assert news_to_classify == [jobs_news, other_news]
+        assert source_priors_fixture.relevance_rate(other_news) is None
+
+    @staticmethod
+    def test__relevance_rate__when_domain_fallback__uses_domain_rate(
+        source_priors_fixture: SourcePriors,
+        news_fixture: News,
+    ) -> None:
+        """Test that the rate of the domain is used for an unseen section only when enabled."""
+        events_news, jobs_news, other_news = (
+            news_fixture.model_copy(update={"link": f"https://www.site.com/{section}/{i}"})
+            for i, section in enumerate(["evenements", "emplois", "nouvelles"])
+        )
+        source_priors_fixture.record_many(
+            [events_news, jobs_news], [Relevance.AUTRE, Relevance.PERTINENT]
+        )
+        source_priors_fixture.source_priors_config.domain_fallback = True
+
+        assert source_priors_fixture.relevance_rate(other_news) == 0.5  # noqa: PLR2004
+
+    @staticmethod
+    def test__record_many__when_link_recorded_again__counts_it_once(
+        source_priors_fixture: SourcePriors,
+        news_fixture: News,
+    ) -> None:
+        """Test that reprocessing a period does not count its news again."""
+        events_news = news_fixture.model_copy(update={"link": "https://www.site.com/evenements/1"})
+        same_events_news = news_fixture.model_copy(
+            update={"link": "https://site.com/evenements/1/?utm_source=newsletter"}
+        )
+
+        source_priors_fixture.record_many([events_news, events_news], [Relevance.AUTRE] * 2)
+        source_priors_fixture.record_many([same_events_news], [Relevance.AUTRE])
+
+        assert source_priors_fixture.relevance_rate(events_news) is None
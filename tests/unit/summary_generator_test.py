@@ -1,9 +1,17 @@
+import json
+from unittest.mock import AsyncMock
+
+import httpx
+import openai
 import pytest
 
+from cpeq_infolettre_automatique.completion_model import CompletionModel
+from cpeq_infolettre_automatique.config import Rubric, SummaryGeneratorConfig
 from cpeq_infolettre_automatique.schemas import News
 from cpeq_infolettre_automatique.summary_generator import (
     SummaryGenerator,
 )
+from cpeq_infolettre_automatique.vectorstore import Vectorstore
 
 
 class TestSummaryGenerator:
@@ -42,3 +50,81 @@ class TestSummaryGenerator:
         prompt = SummaryGenerator.format_system_prompt(reference_news)
         assert "## Exemple 1\n\n### Contenu:" in prompt
         assert "### Résumé:" in prompt
+
+    @staticmethod
+    @pytest.mark.asyncio()
+    async def test__generate_many__when_batch_response_is_partial__retries_missing_news_individually(
+        vectorstore_fixture: Vectorstore,
+        completion_model_fixture: CompletionModel,
+        news_fixture: News,
+        summarized_news_fixture: News,
+    ) -> None:
+        """Test that news with similar exemples are summarized in a single completion, and that news missing from the response are summarized individually."""
+        vectorstore_fixture.search_similar_news_many = AsyncMock(
+            side_effect=lambda news_list, **_: [[summarized_news_fixture] for _ in news_list]
+        )
+        completion_model_fixture.complete_structured_message = AsyncMock(
+            return_value=json.dumps({
+                "summaries": [{"id": "0", "summary": "Summary 0"}, {"id": "2", "summary": " "}]
+            })
+        )
+        summary_generator = SummaryGenerator(
+            completion_model=completion_model_fixture,
+            vectorstore=vectorstore_fixture,
+            summary_generator_config=SummaryGeneratorConfig(batch_size=3),
+        )
+        news_to_summarize = [news_fixture.model_copy() for _ in range(3)]
+
+        summaries = await summary_generator.generate_many(news_to_summarize)
+
+        assert summaries == ["Summary 0", "Some completion", "Some completion"]
+        assert completion_model_fixture.complete_structured_message.call_count == 1
+        expected_nb_retries = 2
+        assert completion_model_fixture.complete_message.call_count == expected_nb_retries
+
+    @staticmethod
+    @pytest.mark.asyncio()
+    async def test__generate_many__when_batch_completion_rejected__summarizes_news_individually(
+        vectorstore_fixture: Vectorstore,
+        completion_model_fixture: CompletionModel,
+        news_fixture: News,
+        summarized_news_fixture: News,
+    ) -> None:
+        """Test that a model rejecting the batch response schema falls back to one completion per news."""
+        vectorstore_fixture.search_similar_news_many = AsyncMock(
+            side_effect=lambda news_list, **_: [[summarized_news_fixture] for _ in news_list]
+        )
+        completion_model_fixture.complete_structured_message = AsyncMock(
+            side_effect=openai.BadRequestError(
+                "Invalid parameter: 'response_format' of type 'json_schema' is not supported.",
+                response=httpx.Response(400, request=httpx.Request("POST", "https://api.test")),
+                body=None,
+            )
+        )
+        summary_generator = SummaryGenerator(
+            completion_model=completion_model_fixture,
+            vectorstore=vectorstore_fixture,
+            summary_generator_config=SummaryGeneratorConfig(batch_size=2),
+        )
+
+        summaries = await summary_generator.generate_many([
+            news_fixture.model_copy() for _ in range(2)
+        ])
+
+        assert summaries == ["Some completion", "Some completion"]
+        assert completion_model_fixture.complete_message.call_count == 2  # noqa: PLR2004
+
+    @staticmethod
+    def test__merge_reference_news__when_exemples_are_shared__interleaves_and_deduplicates(
+        summarized_news_fixture: News,
+    ) -> None:
+        """Test that the merged exemples keep the most similar exemples of each news first."""
+        exemples = [summarized_news_fixture.model_copy(update={"title": str(i)}) for i in range(4)]
+        exemples[0].rubric = Rubric.DOMAINE_AGRICOLE
+
+        merged_news = SummaryGenerator.merge_reference_news([
+            [exemples[0], exemples[1], exemples[2]],
+            [exemples[3], exemples[0]],
+        ])
+
+        assert [news.title for news in merged_news] == ["0", "3", "1"]
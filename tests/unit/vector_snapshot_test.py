@@ -0,0 +1,100 @@
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import numpy as np
+
+from cpeq_infolettre_automatique.config import VectorNames, VectorSnapshotConfig, VectorstoreConfig
+from cpeq_infolettre_automatique.embedding_model import EmbeddingModel
+from cpeq_infolettre_automatique.vector_snapshot import VectorSnapshotStore
+from cpeq_infolettre_automatique.vectorstore import Vectorstore
+
+
+class TestVectorSnapshotStore:
+    @staticmethod
+    def test__load__when_snapshot_saved__memory_maps_vectors(tmp_path: Path) -> None:
+        """Test that a saved snapshot is loaded memory-mapped, and is stale once the collection changed."""
+        vector_snapshot_store = VectorSnapshotStore(VectorSnapshotConfig(directory=str(tmp_path)))
+        vectors = np.array([[0.0, 1.0], [1.0, 0.0]], dtype=np.float32)
+        other_vectors = np.array([[1.0, 1.0], [0.0, 0.0]], dtype=np.float32)
+        fingerprint = VectorSnapshotStore.fingerprint(["a", "b"], ["t0", "t0"])
+        vector_snapshot_store.save(
+            "Collection",
+            VectorNames.TITLE_CONTENT,
+            ["a", "b"],
+            vectors,
+            {"rubric": ["x", None]},
+            fingerprint,
+        )
+        vector_snapshot_store.save(
+            "Collection", VectorNames.TITLE_SUMMARY, ["a", "b"], other_vectors, {}, fingerprint
+        )
+
+        snapshot = vector_snapshot_store.load(
+            "Collection", VectorNames.TITLE_CONTENT, fingerprint, ["rubric"]
+        )
+        stale_snapshot = vector_snapshot_store.load(
+            "Collection",
+            VectorNames.TITLE_CONTENT,
+            VectorSnapshotStore.fingerprint(["a", "b"], ["t0", "t1"]),
+            ["rubric"],
+        )
+
+        assert snapshot is not None
+        ids, loaded_vectors, properties = snapshot
+        memory_mapped_vectors: object = loaded_vectors
+        assert ids == ["a", "b"]
+        assert isinstance(memory_mapped_vectors, np.memmap)
+        assert loaded_vectors.tolist() == vectors.tolist()
+        assert properties == {"rubric": ["x", None]}
+        assert stale_snapshot is None
+        assert sorted(path.suffix for path in tmp_path.iterdir()) == [
+            ".json",
+            ".json",
+            ".npy",
+            ".npy",
+        ]
+
+    @staticmethod
+    def test__fingerprint__when_object_updated__changes() -> None:
+        """Test that the fingerprint depends on the last update times, not only on the ids."""
+        fingerprint = VectorSnapshotStore.fingerprint(["a", "b"], ["t0", "t0"])
+
+        assert VectorSnapshotStore.fingerprint(["b", "a"], ["t0", "t0"]) == fingerprint
+        assert VectorSnapshotStore.fingerprint(["a", "b"], ["t0", "t1"]) != fingerprint
+        assert VectorSnapshotStore.fingerprint(["a", "c"], ["t0", "t0"]) != fingerprint
+
+    @staticmethod
+    def test__read_vectors__when_snapshot_up_to_date__does_not_read_collection(
+        tmp_path: Path,
+        embedding_model_fixture: EmbeddingModel,
+    ) -> None:
+        """Test that the Vectorstore saves a snapshot on the first read and loads it afterwards."""
+        vectorstore_client = MagicMock()
+        collection = vectorstore_client.collections.get.return_value
+        collection.__len__.return_value = 1
+        collection.iterator.return_value = [
+            MagicMock(
+                uuid="a",
+                metadata=MagicMock(last_update_time="t0"),
+                properties={"rubric": "x"},
+                vector={vector_name.value: [0.5, 0.5] for vector_name in VectorNames},
+            )
+        ]
+        vectorstore = Vectorstore(
+            embedding_model=embedding_model_fixture,
+            vectorstore_client=vectorstore_client,
+            vectorstore_config=VectorstoreConfig(),
+            vector_snapshot_store=VectorSnapshotStore(
+                VectorSnapshotConfig(directory=str(tmp_path))
+            ),
+        )
+
+        read_vectors = vectorstore.read_vectors(VectorNames.TITLE_CONTENT, ["rubric"])
+        loaded_vectors = vectorstore.read_vectors(VectorNames.TITLE_CONTENT, ["rubric"])
+
+        vector_reads = [
+            call for call in collection.iterator.call_args_list if call.kwargs["include_vector"]
+        ]
+        assert len(vector_reads) == 1
+        assert loaded_vectors.ids == read_vectors.ids
+        assert loaded_vectors.vectors.tolist() == read_vectors.vectors.tolist()
@@ -0,0 +1,190 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+from cpeq_infolettre_automatique.config import VectorNames, VectorstoreConfig
+from cpeq_infolettre_automatique.embedding_model import EmbeddingModel
+from cpeq_infolettre_automatique.vectorstore import ReferenceVectors, Vectorstore
+
+
+class TestVectorstore:
+    @staticmethod
+    @pytest.mark.asyncio()
+    async def test__hybrid_search__when_called__runs_query_outside_event_loop_thread(
+        embedding_model_fixture: EmbeddingModel,
+    ) -> None:
+        """Test that the blocking Weaviate query runs in the executor."""
+        query_threads: list[str] = []
+
+        def hybrid_query(**_: object) -> MagicMock:
+            query_threads.append(threading.current_thread().name)
+            return MagicMock(objects=[])
+
+        vectorstore_client = MagicMock()
+        collection = vectorstore_client.collections.get.return_value
+        collection.__len__.return_value = 1
+        collection.query.hybrid.side_effect = hybrid_query
+
+        with ThreadPoolExecutor(thread_name_prefix="vectorstore") as executor:
+            vectorstore = Vectorstore(
+                embedding_model=embedding_model_fixture,
+                vectorstore_client=vectorstore_client,
+                vectorstore_config=VectorstoreConfig(),
+                executor=executor,
+            )
+            news_scores = await vectorstore.hybrid_search(
+                "query", np.array([0.1, 0.2, 0.3], dtype=np.float32), VectorNames.TITLE_CONTENT
+            )
+
+        assert news_scores == []
+        assert len(query_threads) == 1
+        assert query_threads[0].startswith("vectorstore")
+
+    @staticmethod
+    @pytest.mark.asyncio()
+    async def test__hybrid_search_many__when_return_properties__requests_only_these_properties(
+        embedding_model_fixture: EmbeddingModel,
+    ) -> None:
+        """Test that only the requested properties are retrieved from Weaviate, without validation."""
+        vectorstore_client = MagicMock()
+        collection = vectorstore_client.collections.get.return_value
+        collection.__len__.return_value = 1
+        collection.query.hybrid.return_value = MagicMock(
+            objects=[
+                MagicMock(
+                    uuid="a", properties={"rubric": "Pêcheries"}, metadata=MagicMock(score=0.9)
+                )
+            ]
+        )
+        vectorstore = Vectorstore(
+            embedding_model=embedding_model_fixture,
+            vectorstore_client=vectorstore_client,
+            vectorstore_config=VectorstoreConfig(minimal_score=0.5),
+        )
+
+        [hits] = await vectorstore.hybrid_search_many(
+            ["query"],
+            np.array([[0.1, 0.2, 0.3]], dtype=np.float32),
+            VectorNames.TITLE_CONTENT,
+            return_properties=["rubric"],
+        )
+
+        assert collection.query.hybrid.call_args.kwargs["return_properties"] == ["rubric"]
+        assert hits.ids == ["a"]
+        assert hits.properties == {"rubric": ["Pêcheries"]}
+
+    @staticmethod
+    @pytest.mark.asyncio()
+    async def test__hybrid_search__when_called_many_times__counts_objects_once(
+        embedding_model_fixture: EmbeddingModel,
+    ) -> None:
+        """Test that the collection metadata is cached until it is invalidated."""
+        vectorstore_client = MagicMock()
+        collection = vectorstore_client.collections.get.return_value
+        collection.__len__.return_value = 1
+        collection.query.hybrid.return_value = MagicMock(objects=[])
+        vectorstore = Vectorstore(
+            embedding_model=embedding_model_fixture,
+            vectorstore_client=vectorstore_client,
+            vectorstore_config=VectorstoreConfig(metadata_ttl_seconds=60.0),
+        )
+
+        embedding = np.array([0.1, 0.2, 0.3], dtype=np.float32)
+        for _ in range(3):
+            await vectorstore.hybrid_search("query", embedding, VectorNames.TITLE_CONTENT)
+        vectorstore.invalidate_collection_metadata()
+        await vectorstore.hybrid_search("query", embedding, VectorNames.TITLE_CONTENT)
+
+        expected_nb_counts = 2
+        assert collection.__len__.call_count == expected_nb_counts
+        assert vectorstore_client.collections.get.call_count == expected_nb_counts
+
+    @staticmethod
+    def test__read_vectors__when_collection_grew_since_counted__reads_all_objects(
+        embedding_model_fixture: EmbeddingModel,
+    ) -> None:
+        """Test that every object is read in a float32 matrix, even past the counted objects."""
+        vectorstore_client = MagicMock()
+        collection = vectorstore_client.collections.get.return_value
+        collection.__len__.return_value = 1
+        collection.iterator.return_value = [
+            MagicMock(
+                uuid=f"id-{i}",
+                properties={"rubric": f"rubric-{i}"},
+                vector={vector_name.value: [float(i), 1.0] for vector_name in VectorNames},
+            )
+            for i in range(3)
+        ]
+        vectorstore = Vectorstore(
+            embedding_model=embedding_model_fixture,
+            vectorstore_client=vectorstore_client,
+            vectorstore_config=VectorstoreConfig(max_nb_items_retrieved=1),
+        )
+
+        reference_vectors = vectorstore.read_vectors(
+            VectorNames.TITLE_CONTENT, return_properties=["rubric"]
+        )
+
+        assert reference_vectors.ids == ["id-0", "id-1", "id-2"]
+        assert reference_vectors.vectors.dtype == np.float32
+        assert reference_vectors.vectors.tolist() == [[0.0, 1.0], [1.0, 1.0], [2.0, 1.0]]
+        assert reference_vectors.properties == {"rubric": ["rubric-0", "rubric-1", "rubric-2"]}
+
+    @staticmethod
+    def test__read_vectors__when_many_named_vectors__reads_collection_once(
+        embedding_model_fixture: EmbeddingModel,
+    ) -> None:
+        """Test that all the named vectors are read in a single pass over the collection."""
+        vectorstore_client = MagicMock()
+        collection = vectorstore_client.collections.get.return_value
+        collection.__len__.return_value = 1
+        collection.iterator.return_value = [
+            MagicMock(
+                uuid="a",
+                properties={"rubric": "x"},
+                vector={
+                    VectorNames.TITLE_CONTENT.value: [1.0, 0.0],
+                    VectorNames.TITLE_SUMMARY.value: [0.0, 1.0],
+                },
+            )
+        ]
+        vectorstore = Vectorstore(
+            embedding_model=embedding_model_fixture,
+            vectorstore_client=vectorstore_client,
+            vectorstore_config=VectorstoreConfig(),
+        )
+
+        title_content_vectors = vectorstore.read_vectors(VectorNames.TITLE_CONTENT, ["rubric"])
+        title_summary_vectors = vectorstore.read_vectors(VectorNames.TITLE_SUMMARY, ["rubric"])
+
+        assert collection.iterator.call_count == 1
+        assert title_content_vectors.vectors.tolist() == [[1.0, 0.0]]
+        assert title_summary_vectors.vectors.tolist() == [[0.0, 1.0]]
+        assert title_summary_vectors.ids is title_content_vectors.ids
+
+
+class TestReferenceVectors:
+    @staticmethod
+    def test__validate__when_object_invalid__drops_its_row_everywhere() -> None:
+        """Test that an invalid object is skipped along with its id, vector and properties."""
+        reference_vectors = ReferenceVectors(
+            ids=["a", "b", "c"],
+            vectors=np.array([[1.0, 0.0], [0.5, 0.5], [0.0, 1.0]], dtype=np.float32),
+            properties={
+                "title": ["Titre A", "Titre B", "Titre C"],
+                "content": ["Contenu A", "Contenu B", "Contenu C"],
+                "link": ["https://a.ca", "not a link", "https://c.ca"],
+                "datetime": [None, None, None],
+            },
+        )
+
+        news, valid_reference_vectors = reference_vectors.validate()
+
+        assert [news_.title for news_ in news] == ["Titre A", "Titre C"]
+        assert valid_reference_vectors.ids == ["a", "c"]
+        assert valid_reference_vectors.vectors.tolist() == [[1.0, 0.0], [0.0, 1.0]]
+        assert valid_reference_vectors.properties["link"] == ["https://a.ca", "https://c.ca"]
+        assert reference_vectors.to_news() == news